@@ -0,0 +1,280 @@
+"""Tek süreçli istemci ajanı.
+
+Tüm monitörler tek Python sürecinde çalışır: her monitör kendi thread'inde, kendi
+aralığıyla run_once() çağrılarak çalıştırılır (heartbeat istemcisi kendi döngüsüyle).
+Monitörler tek HTTP oturumunu paylaşır (bkz. monitors/uploader.py: shared_session).
+Çöken monitör kapatılıp yeniden oluşturulur; bağımlı monitörler (ör. sunucuya
+kaydı hardware monitörü yaptığı için diğerleri) bağımlılık ilk kez başarıyla
+çalıştıktan sonra başlatılır.
+
+Her monitörün ayrı bir thread'i vardır çünkü WMI (COM) nesneleri ve sqlite
+bağlantıları oluşturuldukları thread'de kullanılmalıdır.
+
+Çalıştırmak için:
+    python agent.py [sunucu_adresi] [heartbeat_portu]
+"""
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from datetime import datetime
+
+CLIENT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(CLIENT_DIR, "monitors"))
+
+# Çöken monitör bu süre sonra yeniden başlatılır; art arda çöktükçe iki katına çıkar
+RESTART_DELAY = 5  # saniye
+MAX_RESTART_DELAY = 300
+
+# Bağımlılık bu sürede hazır olmazsa monitör yine de başlatılır
+# (sunucuda kaydı olmayan bilgisayarın verisi 409 alır ve monitör tarafından tekrar denenir)
+DEPENDENCY_TIMEOUT = 300
+
+# Kapatılırken her monitörün durması için beklenen en uzun süre
+STOP_TIMEOUT = 30
+
+LOG_DIR = "logs"
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# (logger adı, dosya adı, seviye): monitörlerin kendi logger'ları ayrı dosyalara yazılır.
+# Kök logger sadece INFO ve üstünü konsola yazar; kütüphanelerin DEBUG logları dosyalara girmez.
+LOG_FILES = [
+    ('client_heartbeat', 'heartbeat.log', logging.INFO),
+    ('hardware_monitor', f"hardware_monitor_{datetime.now().strftime('%Y%m%d')}.log", logging.DEBUG),
+]
+
+def _hardware_monitor():
+    from hardware_monitor import HardwareMonitor
+    return HardwareMonitor()
+
+def _event_monitor():
+    from event_monitor import EventMonitor
+    return EventMonitor()
+
+def _defender_monitor():
+    from defender_monitor import DefenderMonitor
+    return DefenderMonitor()
+
+def _software_monitor():
+    from software_monitor import SoftwareMonitor
+    return SoftwareMonitor()
+
+def _port_monitor():
+    from port_monitor import PortMonitor
+    return PortMonitor()
+
+def _heartbeat_client(host=None, port=None):
+    import client_heartbeat
+    return client_heartbeat.HeartbeatClient(host or client_heartbeat.SERVER_HOST,
+                                            port or client_heartbeat.SERVER_PORT)
+
+# (ad, monitörü oluşturan fonksiyon, bağımlılıklar) - başlatma sırası
+MONITORS = [
+    ('hardware', _hardware_monitor, ()),
+    ('heartbeat', _heartbeat_client, ()),
+    ('events', _event_monitor, ('hardware',)),
+    ('defender', _defender_monitor, ('hardware',)),
+    ('software', _software_monitor, ('hardware',)),
+    ('ports', _port_monitor, ('hardware',)),
+]
+
+def configure_logging(log_dir=LOG_DIR):
+    """Ajan süreci için log yapılandırması (monitör modülleri import edilmeden önce)"""
+    os.makedirs(log_dir, exist_ok=True)
+    formatter = logging.Formatter(LOG_FORMAT)
+    console = logging.StreamHandler()
+    console.setLevel(logging.INFO)
+    console.setFormatter(formatter)
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    root.addHandler(console)
+    for name, filename, level in LOG_FILES:
+        handler = logging.FileHandler(os.path.join(log_dir, filename))
+        handler.setFormatter(formatter)
+        logger = logging.getLogger(name)
+        logger.setLevel(level)
+        logger.addHandler(handler)
+
+def _com_initialize():
+    # WMI kullanan monitörler için thread başına COM başlatılır (pywin32 yoksa gerekmez)
+    try:
+        import pythoncom
+    except ImportError:
+        return None
+    pythoncom.CoInitialize()
+    return pythoncom
+
+class MonitorRunner:
+    """Bir monitörü kendi thread'inde çalıştırır, çökerse yeniden oluşturur.
+
+    run_once() metodu olan monitörler interval saniyede bir çağrılır; olmayanlar
+    (heartbeat istemcisi) kendi run() döngüsüyle çalışır. run_once() ilk kez
+    başarılı (True) döndüğünde veya döngü başladığında monitör hazır sayılır.
+    """
+
+    def __init__(self, name, factory, depends_on, agent):
+        self.name = name
+        self.factory = factory
+        self.depends_on = depends_on
+        self.agent = agent
+        self.monitor = None
+        self.ready = threading.Event()
+        self.thread = None
+        self.restarts = 0
+        self.restart_delay = RESTART_DELAY
+        self.last_error = None
+        self.last_run = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name=f"monitor-{self.name}", daemon=True)
+        self.thread.start()
+        return self.thread
+
+    def _wait_for_dependencies(self):
+        deadline = time.monotonic() + DEPENDENCY_TIMEOUT
+        for name in self.depends_on:
+            dependency = self.agent.runners[name]
+            while not dependency.ready.is_set():
+                remaining = deadline - time.monotonic()
+                if self.agent.stop_event.is_set():
+                    return False
+                if remaining <= 0:
+                    print(f"[{datetime.now()}] {self.name}: {name} hazır olmadı, yine de başlatılıyor")
+                    break
+                dependency.ready.wait(min(remaining, 1))
+        return True
+
+    def _run_periodic(self):
+        monitor = self.monitor
+        interval = getattr(monitor, 'interval', 60)
+        while not self.agent.stop_event.is_set():
+            started = time.monotonic()
+            if monitor.run_once():
+                self.ready.set()
+            self.last_run = datetime.now()
+            # Başarılı tur: sonraki çöküşte bekleme süresi baştan başlar
+            self.restart_delay = RESTART_DELAY
+            self.agent.stop_event.wait(max(0, interval - (time.monotonic() - started)))
+
+    def _run(self):
+        com = _com_initialize()
+        try:
+            if not self._wait_for_dependencies():
+                return
+            while not self.agent.stop_event.is_set():
+                try:
+                    if self.monitor is None:
+                        self.monitor = self.factory()
+                        print(f"[{datetime.now()}] {self.name} başlatıldı")
+                    if hasattr(self.monitor, 'run_once'):
+                        self._run_periodic()
+                    else:
+                        self.ready.set()
+                        self.monitor.run()
+                        if not self.agent.stop_event.is_set():
+                            raise RuntimeError("döngü beklenmedik şekilde sonlandı")
+                except Exception as e:
+                    self.restarts += 1
+                    self.last_error = str(e)
+                    print(f"[{datetime.now()}] {self.name} çöktü ({self.restarts}. kez), "
+                          f"{self.restart_delay} saniye sonra yeniden başlatılacak: {e}")
+                    print(traceback.format_exc())
+                    self._stop_monitor()
+                    if self.agent.stop_event.wait(self.restart_delay):
+                        break
+                    self.restart_delay = min(self.restart_delay * 2, MAX_RESTART_DELAY)
+        finally:
+            self._stop_monitor()
+            if com:
+                com.CoUninitialize()
+
+    def _stop_monitor(self):
+        monitor, self.monitor = self.monitor, None
+        if monitor is None:
+            return
+        try:
+            monitor.stop()
+        except Exception as e:
+            print(f"[{datetime.now()}] {self.name} durdurulurken hata: {e}")
+
+    def stop(self):
+        """Kendi döngüsüyle çalışan monitörü durdur (periyodik olanlar kendi thread'inde durur)"""
+        monitor = self.monitor
+        if monitor is not None and not hasattr(monitor, 'run_once'):
+            self.monitor = None
+            monitor.stop()
+
+    def status(self):
+        return {
+            'running': bool(self.thread and self.thread.is_alive()),
+            'ready': self.ready.is_set(),
+            'restarts': self.restarts,
+            'last_error': self.last_error,
+            'last_run': self.last_run.isoformat() if self.last_run else None
+        }
+
+class Agent:
+    """Monitörleri bağımlılık sırasıyla başlatan ve denetleyen tek süreçli ajan"""
+
+    def __init__(self, monitors=MONITORS):
+        self.stop_event = threading.Event()
+        self.runners = {}
+        for name, factory, depends_on in monitors:
+            unknown = [dependency for dependency in depends_on if dependency not in self.runners]
+            if unknown:
+                raise ValueError(f"{name}: bağımlılık listede daha önce tanımlanmalı: {unknown}")
+            self.runners[name] = MonitorRunner(name, factory, depends_on, self)
+
+    def start(self):
+        print(f"[{datetime.now()}] Ajan başlatılıyor: {', '.join(self.runners)}")
+        for runner in self.runners.values():
+            runner.start()
+
+    def stop(self, timeout=STOP_TIMEOUT):
+        """Tüm monitörleri durdur; tamponlarını göndermeleri için beklenir"""
+        self.stop_event.set()
+        for runner in self.runners.values():
+            try:
+                runner.stop()
+            except Exception as e:
+                print(f"[{datetime.now()}] {runner.name} durdurulurken hata: {e}")
+        deadline = time.monotonic() + timeout
+        for runner in self.runners.values():
+            if runner.thread:
+                runner.thread.join(max(0, deadline - time.monotonic()))
+        print(f"[{datetime.now()}] Ajan durduruldu")
+
+    def status(self):
+        """Monitör başına durum, yeniden başlatma sayısı ve son hata"""
+        return {name: runner.status() for name, runner in self.runners.items()}
+
+    def wait(self):
+        """Ajan durdurulana kadar bekle (Ctrl+C ile durur)"""
+        try:
+            while not self.stop_event.wait(1):
+                pass
+        except KeyboardInterrupt:
+            print("\nAjan kapatılıyor...")
+            self.stop()
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    configure_logging()
+    monitors = MONITORS
+    if argv:
+        # Heartbeat sunucusu komut satırından verilebilir (client_heartbeat.py ile aynı)
+        host = argv[0]
+        port = int(argv[1]) if len(argv) > 1 else None
+        monitors = [
+            (name, (lambda: _heartbeat_client(host, port)) if name == 'heartbeat' else factory, depends_on)
+            for name, factory, depends_on in MONITORS
+        ]
+    agent = Agent(monitors)
+    agent.start()
+    agent.wait()
+    return agent
+
+if __name__ == "__main__":
+    main()
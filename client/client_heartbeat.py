@@ -7,25 +7,18 @@ from datetime import datetime
 import platform
 import threading
 import traceback
-from win10toast import ToastNotifier  # Windows bildirimleri için
-
-# Log klasörünü oluştur
-os.makedirs('logs', exist_ok=True)
-
-# Windows bildirimi için toaster oluştur
-toaster = ToastNotifier()
-
-# Log yapılandırması
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(os.path.join('logs', 'heartbeat.log')),
-        logging.StreamHandler()
-    ]
+import struct
+from collections import deque
+from heartbeat_protocol import (
+    FrameDecoder, encode_frame,
+    MSG_HELLO, MSG_CONNECTED, MSG_HEARTBEAT, MSG_ALIVE
 )
 
-logger = logging.getLogger(__name__)
+# Log yapılandırması tek başına çalışırken main()'de, ajan içinde agent.main()'de yapılır
+logger = logging.getLogger("client_heartbeat")
+
+# Windows bildirimi için toaster ilk bildirimde oluşturulur (bkz. notify)
+_toaster = None
 
 # Sunucu bağlantı ayarları
 SERVER_HOST = '192.168.1.33'  # Sunucunun IP adresi - buraya doğru IP girilmeli
@@ -36,6 +29,29 @@ HEARTBEAT_INTERVAL = 5     # Heartbeat gönderme aralığı (saniye)
 RECONNECT_INTERVAL = 10    # Yeniden bağlanma aralığı (saniye)
 MAX_RETRIES = 5            # Maksimum yeniden deneme sayısı
 
+# Protokol ayarı: True ise uzunluk önekli çerçeveler, False ise eski düz metin protokolü
+USE_FRAMED_PROTOCOL = True
+
+def configure_logging():
+    """Tek başına çalışırken logları logs/heartbeat.log dosyasına ve konsola yaz"""
+    os.makedirs('logs', exist_ok=True)
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(os.path.join('logs', 'heartbeat.log')),
+            logging.StreamHandler()
+        ]
+    )
+
+def notify(title, message, duration):
+    """Windows bildirimi göster"""
+    global _toaster
+    if _toaster is None:
+        from win10toast import ToastNotifier  # Windows bildirimleri için
+        _toaster = ToastNotifier()
+    _toaster.show_toast(title, message, duration=duration, threaded=True)
+
 def get_computer_name():
     """Bilgisayar adını döndürür"""
     return platform.node()
@@ -51,6 +67,12 @@ class HeartbeatClient:
         self.connected = False
         self.computer_name = get_computer_name()
         self.stop_event = threading.Event()
+        self.framed = USE_FRAMED_PROTOCOL
+        
+        # Çerçeveli protokol için tamponlu okuma
+        self.decoder = FrameDecoder()
+        self.pending_frames = deque()
+        self.heartbeat_seq = 0
         
         # İstatistik ekleyelim
         self.total_heartbeats = 0
@@ -76,12 +98,19 @@ class HeartbeatClient:
             logger.info(f"Sunucuya bağlanılıyor: {self.server_host}:{self.server_port}")
             self.socket.connect((self.server_host, self.server_port))
             
-            # Bilgisayar adını gönder
-            self.socket.send(self.computer_name.encode())
+            # Yeni bağlantı için okuma tamponunu sıfırla
+            self.decoder = FrameDecoder()
+            self.pending_frames.clear()
             
-            # Sunucudan yanıt bekle
+            # Bilgisayar adını gönder ve sunucudan yanıt bekle
             try:
-                response = self.socket.recv(1024).decode()
+                if self.framed:
+                    self.socket.sendall(encode_frame(MSG_HELLO, self.computer_name.encode()))
+                    msg_type, _ = self._read_frame()
+                    response = "CONNECTED" if msg_type == MSG_CONNECTED else f"tip {msg_type}"
+                else:
+                    self.socket.send(self.computer_name.encode())
+                    response = self.socket.recv(1024).decode()
                 logger.info(f"Sunucudan yanıt alındı: {response}")
                 
                 # Eğer özel bir yanıt bekliyorsak (CONNECTED vb.), 
@@ -113,31 +142,59 @@ class HeartbeatClient:
             return False
             
         try:
-            # Heartbeat mesajı gönder
-            heartbeat_msg = "HEARTBEAT"
-            logger.info(f"Heartbeat gönderiliyor: {heartbeat_msg}")
-            self.socket.send(heartbeat_msg.encode())
-            
             # İstatistik güncelle
             self.total_heartbeats += 1
             
-            # Yanıt bekle
-            response = self.socket.recv(1024).decode()
-            logger.info(f"Heartbeat yanıtı alındı: {response}")
-            if response == "ALIVE":
-                logger.info(f"Heartbeat başarılı, bağlantı aktif: {self.server_host}:{self.server_port}")
+            if self.framed:
+                alive = self._send_framed_heartbeat()
+            else:
+                alive = self._send_legacy_heartbeat()
+            
+            if alive:
+                logger.debug(f"Heartbeat başarılı, bağlantı aktif: {self.server_host}:{self.server_port}")
                 self.successful_heartbeats += 1
                 self.last_successful_heartbeat = datetime.now()
                 return True
-            else:
-                logger.warning(f"Heartbeat yanıtı beklenmeyen: {response}")
-                return False
+            return False
                 
         except Exception as e:
             logger.error(f"Heartbeat gönderme hatası: {str(e)}")
             self.connected = False
             return False
     
+    def _read_frame(self):
+        """Tampondan bir çerçeve döndür, gerekirse soketten okumaya devam et"""
+        while not self.pending_frames:
+            data = self.socket.recv(4096)
+            if not data:
+                raise ConnectionError("Sunucu bağlantıyı kapattı")
+            self.pending_frames.extend(self.decoder.feed(data))
+        return self.pending_frames.popleft()
+    
+    def _send_framed_heartbeat(self):
+        """Sıra numaralı HEARTBEAT çerçevesi gönder ve eşleşen ALIVE yanıtını bekle"""
+        self.heartbeat_seq = (self.heartbeat_seq + 1) & 0xFFFFFFFF
+        payload = struct.pack("!I", self.heartbeat_seq)
+        self.socket.sendall(encode_frame(MSG_HEARTBEAT, payload))
+        
+        while True:
+            msg_type, response = self._read_frame()
+            if msg_type != MSG_ALIVE:
+                logger.warning(f"Heartbeat yanıtı beklenmeyen: tip {msg_type}")
+                return False
+            if response == payload:
+                return True
+            # Önceki (zaman aşımına uğramış) heartbeat'lerin geç gelen yanıtlarını atla
+    
+    def _send_legacy_heartbeat(self):
+        """Eski düz metin protokolüyle heartbeat gönder"""
+        self.socket.send("HEARTBEAT".encode())
+        response = self.socket.recv(1024).decode()
+        if response == "ALIVE":
+            return True
+        logger.warning(f"Heartbeat yanıtı beklenmeyen: {response}")
+        return False
+    
     def log_stats(self):
         """İstatistikleri logla"""
         success_rate = 0
@@ -205,6 +262,7 @@ class HeartbeatClient:
 
 def main():
     """Ana metod"""
+    configure_logging()
     try:
         # Komut satırı argümanlarını al (varsa)
         host = SERVER_HOST
@@ -218,12 +276,7 @@ def main():
         logger.info(f"Heartbeat client başlatılıyor - Sunucu: {host}:{port}")
         
         # Başlangıç bildirimi göster
-        toaster.show_toast(
-            "Heartbeat Client",
-            "Program başlatıldı ve arkaplanda çalışıyor...",
-            duration=5,
-            threaded=True
-        )
+        notify("Heartbeat Client", "Program başlatıldı ve arkaplanda çalışıyor...", duration=5)
         
         # Client oluştur ve başlat
         client = HeartbeatClient(host, port)
@@ -237,23 +290,13 @@ def main():
             logger.info("Kullanıcı tarafından kapatılıyor...")
             client.stop()
             # Kapatma bildirimi göster
-            toaster.show_toast(
-                "Heartbeat Client",
-                "Program kapatılıyor...",
-                duration=3,
-                threaded=True
-            )
+            notify("Heartbeat Client", "Program kapatılıyor...", duration=3)
         
     except Exception as e:
         logger.error(f"Beklenmeyen hata: {str(e)}")
         traceback.print_exc()
         # Hata bildirimi göster
-        toaster.show_toast(
-            "Heartbeat Client - Hata",
-            f"Program hata ile karşılaştı: {str(e)}",
-            duration=5,
-            threaded=True
-        )
+        notify("Heartbeat Client - Hata", f"Program hata ile karşılaştı: {str(e)}", duration=5)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
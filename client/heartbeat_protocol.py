@@ -0,0 +1,119 @@
+# Heartbeat protokolü: versiyonlu, uzunluk önekli çerçeveler.
+# Sunucu (server/) ve istemci (client/) ayrı paketlendiği için bu modül iki dizinde de bulunur,
+# iki kopya aynı tutulmalıdır.
+#
+# Çerçeve düzeni (big-endian):
+#   versiyon (1 bayt) | mesaj tipi (1 bayt) | payload uzunluğu (2 bayt) | payload
+#
+# Eski istemciler düz metin gönderir (önce bilgisayar adı, sonra "HEARTBEAT").
+# Bağlantının ilk baytı PROTOCOL_VERSION ise çerçeveli, değilse eski protokol kabul edilir.
+import struct
+
+PROTOCOL_VERSION = 1
+HEADER = struct.Struct("!BBH")
+MAX_PAYLOAD = 0xFFFF
+
+# Mesaj tipleri
+MSG_HELLO = 1       # istemci -> sunucu, payload: bilgisayar adı (utf-8)
+MSG_CONNECTED = 2   # sunucu -> istemci
+MSG_HEARTBEAT = 3   # istemci -> sunucu, payload: isteğe bağlı (ör. sıra numarası)
+MSG_ALIVE = 4       # sunucu -> istemci, payload: HEARTBEAT payload'ının aynısı
+
+# Eski düz metin protokolü
+LEGACY_HEARTBEAT = b"HEARTBEAT"
+LEGACY_CONNECTED = b"CONNECTED"
+LEGACY_ALIVE = b"ALIVE"
+
+class ProtocolError(ValueError):
+    """Geçersiz çerçeve"""
+
+def encode_frame(msg_type, payload=b""):
+    """Tek bir çerçeve oluştur"""
+    if len(payload) > MAX_PAYLOAD:
+        raise ProtocolError(f"Payload çok büyük: {len(payload)} bayt")
+    return HEADER.pack(PROTOCOL_VERSION, msg_type, len(payload)) + payload
+
+def is_framed(first_chunk):
+    """Bağlantının ilk verisi çerçeveli protokole mi ait?"""
+    return bool(first_chunk) and first_chunk[0] == PROTOCOL_VERSION
+
+class FrameDecoder:
+    """Soketten gelen parçaları biriktirip tam çerçeveleri ayıklar"""
+
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def feed(self, data):
+        """Gelen veriyi ekle ve tamamlanan (tip, payload) çerçevelerini döndür"""
+        self._buffer += data
+        frames = []
+        offset = 0
+        while len(self._buffer) - offset >= HEADER.size:
+            version, msg_type, length = HEADER.unpack_from(self._buffer, offset)
+            if version != PROTOCOL_VERSION:
+                raise ProtocolError(f"Desteklenmeyen protokol versiyonu: {version}")
+            end = offset + HEADER.size + length
+            if len(self._buffer) < end:
+                break
+            frames.append((msg_type, bytes(self._buffer[offset + HEADER.size:end])))
+            offset = end
+        if offset:
+            del self._buffer[:offset]
+        return frames
+
+class HeartbeatSession:
+    """Sunucu tarafında tek bir bağlantının protokol durumu (I/O'dan bağımsız).
+
+    Thread'li ve asyncio sunucuları gelen veriyi receive()'e verir, dönen yanıtı
+    istemciye yazar. El sıkışma tamamlanınca computer_name dolar.
+    """
+
+    def __init__(self):
+        self.computer_name = None
+        self.framed = None
+        self.heartbeats = 0
+        self._decoder = FrameDecoder()
+        self._legacy_buffer = bytearray()
+
+    def receive(self, data):
+        """Gelen veriyi işle, istemciye gönderilecek yanıt baytlarını döndür"""
+        if self.framed is None:
+            self.framed = is_framed(data)
+
+        if self.framed:
+            return self._receive_framed(data)
+        return self._receive_legacy(data)
+
+    def _receive_framed(self, data):
+        reply = bytearray()
+        for msg_type, payload in self._decoder.feed(data):
+            if msg_type == MSG_HELLO:
+                self.computer_name = payload.decode("utf-8").strip()
+                reply += encode_frame(MSG_CONNECTED)
+            elif msg_type == MSG_HEARTBEAT and self.computer_name:
+                self.heartbeats += 1
+                reply += encode_frame(MSG_ALIVE, payload)
+        return bytes(reply)
+
+    def _receive_legacy(self, data):
+        if self.computer_name is None:
+            # Eski istemci ilk mesaj olarak sadece bilgisayar adını gönderir ve yanıt bekler
+            self.computer_name = data.decode().strip()
+            return LEGACY_CONNECTED
+
+        # TCP birleştirmesine karşı: "HEARTBEATHEARTBEAT" iki heartbeat sayılır,
+        # parçalanmış bir "HEART" + "BEAT" sonraki veriyle tamamlanır
+        buffer = self._legacy_buffer
+        buffer += data
+        count = buffer.count(LEGACY_HEARTBEAT)
+        if count:
+            del buffer[:buffer.rindex(LEGACY_HEARTBEAT) + len(LEGACY_HEARTBEAT)]
+        keep = 0
+        for size in range(min(len(buffer), len(LEGACY_HEARTBEAT) - 1), 0, -1):
+            if LEGACY_HEARTBEAT.startswith(bytes(buffer[-size:])):
+                keep = size
+                break
+        del buffer[:len(buffer) - keep]
+
+        self.heartbeats += count
+        return LEGACY_ALIVE * count
@@ -0,0 +1,356 @@
+import gzip
+import json
+import os
+import re
+import sqlite3
+import time
+from datetime import datetime
+from urllib.parse import urlparse
+
+import requests
+
+MONITOR_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# NVD JSON 2.0 feed dosyaları (nvdcve-2.0-*.json veya .json.gz) bu dizinden içe aktarılır
+FEED_DIR = os.environ.get('MONITOR_CVE_FEED_DIR', os.path.join(MONITOR_DIR, "cve_feeds"))
+# Ayarlanırsa TTL dolduğunda feed bu adresten FEED_DIR'e indirilir; ulaşılamazsa eldeki indeks kullanılır
+FEED_URL = os.environ.get('MONITOR_CVE_FEED_URL')
+
+# Yerel indeks; feed dosyaları değişmedikçe yeniden oluşturulmaz
+DB_PATH = os.path.join(MONITOR_DIR, "cve_index.db")
+
+# Feed dizini (ve FEED_URL) en fazla bu aralıkla kontrol edilir
+REFRESH_TTL = 24 * 3600  # saniye
+DOWNLOAD_TIMEOUT = 120
+
+# Bu tarihten önce yayımlanan CVE'ler indekse alınmaz (eski NVD sorgusundaki pubStartDate)
+MIN_PUBLISHED = '2023-01-01'
+
+# Anahtar kelime başına döndürülen en fazla CVE
+MAX_RESULTS = 3
+
+# Feed dosyası bu büyüklükte parçalar halinde okunur; dosyanın tamamı belleğe alınmaz
+FEED_READ_SIZE = 1024 * 1024
+# Tek bir CVE birkaç KB'tır; bu kadar okunup bir eleman çözülemiyorsa dosya bozuktur
+MAX_FEED_BUFFER = 16 * FEED_READ_SIZE
+
+PORT_SERVICES = {
+    80: {"name": "HTTP", "keywords": ["http", "apache", "nginx", "iis"]},
+    443: {"name": "HTTPS", "keywords": ["https", "ssl", "tls"]},
+    21: {"name": "FTP", "keywords": ["ftp", "vsftpd"]},
+    22: {"name": "SSH", "keywords": ["ssh", "openssh"]},
+    23: {"name": "Telnet", "keywords": ["telnet"]},
+    25: {"name": "SMTP", "keywords": ["smtp", "mail"]},
+    53: {"name": "DNS", "keywords": ["dns", "bind"]},
+    3306: {"name": "MySQL", "keywords": ["mysql", "mariadb"]},
+    3389: {"name": "RDP", "keywords": ["rdp", "remote desktop"]},
+    445: {"name": "SMB", "keywords": ["smb", "samba"]},
+    139: {"name": "NetBIOS", "keywords": ["netbios"]},
+    8080: {"name": "HTTP-Proxy", "keywords": ["http", "proxy"]}
+}
+
+UNKNOWN_SERVICE = {"name": "Bilinmeyen", "keywords": []}
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS cves (
+        id TEXT PRIMARY KEY,
+        published TEXT,
+        score REAL,
+        description TEXT
+    )
+    """,
+    # terim: açıklamada geçen anahtar kelime veya CPE'den "cpe:<üretici>:<ürün>"
+    """
+    CREATE TABLE IF NOT EXISTS cve_terms (
+        term TEXT NOT NULL,
+        cve_id TEXT NOT NULL,
+        score REAL,
+        published TEXT,
+        PRIMARY KEY (term, cve_id)
+    ) WITHOUT ROWID
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_cve_terms_rank ON cve_terms (term, score DESC, published DESC)",
+    "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)",
+]
+
+def service_keywords():
+    """PORT_SERVICES'teki tüm anahtar kelimeler"""
+    return sorted({keyword for service in PORT_SERVICES.values() for keyword in service["keywords"]})
+
+def cpe_term(vendor, product):
+    return f"cpe:{vendor.lower()}:{product.lower()}"
+
+def _cve_score(cve):
+    # En yeni CVSS sürümünün birincil skoru
+    metrics = cve.get('metrics') or {}
+    for key in ('cvssMetricV40', 'cvssMetricV31', 'cvssMetricV30', 'cvssMetricV2'):
+        for metric in metrics.get(key) or []:
+            score = (metric.get('cvssData') or {}).get('baseScore')
+            if score is not None:
+                return float(score)
+    return None
+
+def _cve_description(cve):
+    descriptions = cve.get('descriptions') or []
+    for description in descriptions:
+        if description.get('lang') == 'en':
+            return description.get('value')
+    return descriptions[0].get('value') if descriptions else None
+
+def _cve_products(cve):
+    """CPE eşleşmelerindeki (üretici, ürün) çiftleri"""
+    products = set()
+    for configuration in cve.get('configurations') or []:
+        for node in configuration.get('nodes') or []:
+            for match in node.get('cpeMatch') or []:
+                parts = (match.get('criteria') or '').split(':')
+                # cpe:2.3:<part>:<üretici>:<ürün>:...
+                if len(parts) > 4 and parts[3] not in ('*', '-') and parts[4] not in ('*', '-'):
+                    products.add((parts[3], parts[4]))
+    return products
+
+_WHITESPACE = re.compile(r'[\s,]*')
+
+def _iter_array(f, key, read_size=FEED_READ_SIZE):
+    """Dosyadaki key dizisinin elemanlarını okudukça tek tek çöz.
+
+    NVD feed'leri yüzlerce MB olabilir; json.load tüm dosyayı bellekte nesnelere
+    çevirirdi. Burada bellekte sadece okunan parça ve sıradaki eleman bulunur.
+    Dizinin başı metinde '"key": [' aranarak bulunur (feed'de diziden önce
+    sadece kısa üst bilgi alanları vardır).
+    """
+    decoder = json.JSONDecoder()
+    marker = re.compile(r'"' + re.escape(key) + r'"\s*:\s*\[')
+    buffer = ''
+    while True:
+        chunk = f.read(read_size)
+        buffer += chunk
+        match = marker.search(buffer)
+        if match:
+            buffer = buffer[match.end():]
+            break
+        if not chunk:
+            return
+        # İşaret iki parçaya bölünmüş olabilir; sadece sonu tutulur
+        buffer = buffer[-(len(key) + 64):]
+
+    position = 0
+    while True:
+        position = _WHITESPACE.match(buffer, position).end()
+        if position < len(buffer) and buffer[position] == ']':
+            return
+        try:
+            if position >= len(buffer):
+                raise ValueError("parça sonu")
+            item, position = decoder.raw_decode(buffer, position)
+        except ValueError:
+            # Eleman okunan parçanın sonunda kesilmiş: sonraki parçayla tekrar denenir
+            chunk = f.read(read_size)
+            if not chunk:
+                raise ValueError(f"Feed dosyası eksik: {key} dizisi tamamlanmamış")
+            buffer = buffer[position:] + chunk
+            if len(buffer) > MAX_FEED_BUFFER:
+                raise ValueError(f"Feed dosyası bozuk: {key} dizisinin elemanı çözülemedi")
+            position = 0
+            continue
+        yield item
+
+def parse_feed(path, read_size=FEED_READ_SIZE):
+    """NVD JSON 2.0 feed dosyasındaki CVE nesneleri (dosya akış halinde okunur)"""
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        for item in _iter_array(f, 'vulnerabilities', read_size):
+            cve = item.get('cve') if isinstance(item, dict) else None
+            if cve and cve.get('id'):
+                yield cve
+
+class CveIndex:
+    """NVD feed dosyalarından oluşturulan, çevrimdışı çalışan yerel CVE indeksi.
+
+    Feed'deki her CVE, açıklamasında geçen servis anahtar kelimeleri ve CPE
+    ürünleri altında sqlite'a yazılır. Sorgular (terim, skor) indeksinden en
+    yüksek skorlu birkaç satırı okur ve bellekte tutulur; indeks sadece feed
+    dosyaları veya anahtar kelimeler değişince yeniden oluşturulur.
+    """
+
+    def __init__(self, db_path=DB_PATH, feed_dir=FEED_DIR, feed_url=FEED_URL, ttl=REFRESH_TTL,
+                 keywords=None, min_published=MIN_PUBLISHED):
+        self.db_path = db_path
+        self.feed_dir = feed_dir
+        self.feed_url = feed_url
+        self.ttl = ttl
+        self.keywords = sorted(keywords) if keywords is not None else service_keywords()
+        self.min_published = min_published
+        self.checked_at = None
+        self._connection = None
+        # (terim, limit) -> sonuç listesi; indeks yenilenince temizlenir
+        self._memo = {}
+        self._keyword_pattern = re.compile(
+            r'\b(' + '|'.join(re.escape(keyword) for keyword in self.keywords) + r')\b'
+        ) if self.keywords else None
+
+    def _connect(self):
+        # Bağlantı ilk kullanımda, kullanan thread'de açılır
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.db_path)
+            for statement in SCHEMA:
+                self._connection.execute(statement)
+            self._connection.commit()
+        return self._connection
+
+    def _get_meta(self, key):
+        row = self._connect().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _feed_files(self):
+        if not os.path.isdir(self.feed_dir):
+            return []
+        return sorted(
+            os.path.join(self.feed_dir, name) for name in os.listdir(self.feed_dir)
+            if name.endswith('.json') or name.endswith('.json.gz')
+        )
+
+    def _signature(self, files):
+        # Dosya adı, boyutu ve değişme zamanı ile anahtar kelimeler; değişirse indeks yeniden oluşturulur
+        stats = [(os.path.basename(path), os.path.getsize(path), int(os.path.getmtime(path))) for path in files]
+        return json.dumps({'files': stats, 'keywords': self.keywords, 'min_published': self.min_published})
+
+    def _terms(self, cve):
+        terms = set()
+        description = (_cve_description(cve) or '').lower()
+        if self._keyword_pattern:
+            terms.update(self._keyword_pattern.findall(description))
+        for vendor, product in _cve_products(cve):
+            terms.add(cpe_term(vendor, product))
+            # Ürün veya üretici adı bir anahtar kelimeyse (ör. openssh) o terimle de bulunur
+            for name in (vendor.lower(), product.lower()):
+                if name in self.keywords:
+                    terms.add(name)
+        return terms
+
+    def import_feeds(self, files=None):
+        """Feed dosyalarından indeksi baştan oluştur, indekslenen CVE sayısını döndür"""
+        files = self._feed_files() if files is None else files
+        connection = self._connect()
+        count = 0
+        with connection:
+            connection.execute("DELETE FROM cve_terms")
+            connection.execute("DELETE FROM cves")
+            for path in files:
+                for cve in parse_feed(path):
+                    published = (cve.get('published') or '')[:19]
+                    if self.min_published and published and published < self.min_published:
+                        continue
+                    terms = self._terms(cve)
+                    if not terms:
+                        continue
+                    score = _cve_score(cve)
+                    connection.execute(
+                        "INSERT OR REPLACE INTO cves (id, published, score, description) VALUES (?, ?, ?, ?)",
+                        (cve['id'], published, score, _cve_description(cve))
+                    )
+                    connection.executemany(
+                        "INSERT OR REPLACE INTO cve_terms (term, cve_id, score, published) VALUES (?, ?, ?, ?)",
+                        [(term, cve['id'], score, published) for term in terms]
+                    )
+                    count += 1
+            connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('signature', ?)",
+                               (self._signature(files),))
+            connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('imported_at', ?)",
+                               (datetime.now().isoformat(),))
+        self._memo.clear()
+        return count
+
+    def download_feed(self):
+        """FEED_URL'deki feed'i FEED_DIR'e indir; başarısızsa False"""
+        name = os.path.basename(urlparse(self.feed_url).path) or "nvdcve.json.gz"
+        target = os.path.join(self.feed_dir, name)
+        temp_path = target + ".tmp"
+        try:
+            os.makedirs(self.feed_dir, exist_ok=True)
+            with requests.get(self.feed_url, stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
+                response.raise_for_status()
+                with open(temp_path, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=1024 * 1024):
+                        f.write(chunk)
+            os.replace(temp_path, target)
+            return True
+        except (requests.RequestException, OSError) as e:
+            print(f"[{datetime.now()}] CVE feed'i indirilemedi, mevcut indeks kullanılacak: {e}")
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            return False
+
+    def refresh(self, force=False):
+        """TTL dolduysa feed'i kontrol et (ve indir), değiştiyse indeksi yeniden oluştur.
+
+        İndeks yeniden oluşturulduysa True döner.
+        """
+        now = time.monotonic()
+        if not force and self.checked_at is not None and now - self.checked_at < self.ttl:
+            return False
+        self.checked_at = now
+
+        if self.feed_url:
+            self.download_feed()
+        files = self._feed_files()
+        if not files:
+            return False
+        if not force and self._get_meta('signature') == self._signature(files):
+            return False
+
+        started = time.perf_counter()
+        try:
+            count = self.import_feeds(files)
+        except (OSError, ValueError) as e:
+            print(f"[{datetime.now()}] CVE feed'i içe aktarılamadı, mevcut indeks kullanılacak: {e}")
+            return False
+        print(f"[{datetime.now()}] CVE indeksi oluşturuldu: {count} CVE, "
+              f"{time.perf_counter() - started:.1f} sn")
+        return True
+
+    def lookup(self, term, limit=MAX_RESULTS):
+        """Terim (anahtar kelime veya cpe_term()) için en yüksek skorlu CVE'ler"""
+        key = (term.lower(), limit)
+        if key not in self._memo:
+            rows = self._connect().execute("""
+                SELECT c.id, c.score, c.description
+                FROM cve_terms t
+                JOIN cves c ON c.id = t.cve_id
+                WHERE t.term = ?
+                ORDER BY t.score DESC, t.published DESC
+                LIMIT ?
+            """, (key[0], limit)).fetchall()
+            self._memo[key] = [
+                {
+                    'id': cve_id,
+                    'severity': score if score is not None else 'Bilinmiyor',
+                    'description': description or 'Açıklama yok'
+                }
+                for cve_id, score, description in rows
+            ]
+        return self._memo[key]
+
+    def lookup_product(self, vendor, product, limit=MAX_RESULTS):
+        """CPE üretici/ürün adı için en yüksek skorlu CVE'ler"""
+        return self.lookup(cpe_term(vendor, product), limit)
+
+    def lookup_port(self, port, limit=MAX_RESULTS):
+        """Port için (servis adı, güvenlik açıkları); anahtar kelime başına en fazla limit CVE"""
+        service = PORT_SERVICES.get(port, UNKNOWN_SERVICE)
+        vulnerabilities = []
+        seen = set()
+        for keyword in service["keywords"]:
+            for vuln in self.lookup(keyword, limit):
+                if vuln['id'] not in seen:
+                    seen.add(vuln['id'])
+                    vulnerabilities.append(vuln)
+        return service["name"], vulnerabilities
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
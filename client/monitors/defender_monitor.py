@@ -1,110 +1,117 @@
-import win32evtlog
+import json
+import os
 import time
 from datetime import datetime
 import traceback
-import mysql.connector
-from config import DB_CONFIG
+from uploader import BatchUploader
+from event_log_reader import Win32EventLogReader
+
+# Sunucuya gönderilen en yeni kaydın numarası; sonraki okumalar buradan devam eder
+BOOKMARK_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "defender_bookmark.json")
+
+# Her okumada en fazla bu kadar kayıt okunup tek batch'te gönderilir
+BATCH_SIZE = 500
+# Bir turda en fazla bu kadar batch; kalanlar sonraki turda okunur
+MAX_BATCHES_PER_CYCLE = 20
 
 class DefenderMonitor:
-    def __init__(self):
+    def __init__(self, reader=None, bookmark_file=BOOKMARK_FILE, uploader=None):
         self.running = True
         self.interval = 300  
-        self.max_events = 10  
+        self.uploader = uploader or BatchUploader('defender')
+        # Windows dışında ReplayEventLogReader verilebilir
+        self.reader = reader or Win32EventLogReader()
+        self.bookmark_file = bookmark_file
 
-    def collect_defender_logs(self):
-        """Windows Defender loglarını topla"""
+    def load_bookmark(self):
+        """Son gönderilen kaydın (numarası, zamanı); yoksa (0, None) ve günlüğün tamamı okunur"""
         try:
-            server = 'localhost'
-            log_type = 'Microsoft-Windows-Windows Defender/Operational'
-            
-            hand = win32evtlog.OpenEventLog(server, log_type)
-            flags = win32evtlog.EVENTLOG_BACKWARDS_READ | win32evtlog.EVENTLOG_SEQUENTIAL_READ
-            
-            events = []
-            event_count = 0
-            
-            while event_count < self.max_events:
-                events_batch = win32evtlog.ReadEventLog(hand, flags, 0)
-                if not events_batch:
+            with open(self.bookmark_file, 'r', encoding='utf-8') as f:
+                bookmark = json.load(f)
+            return int(bookmark['record_number']), bookmark.get('log_time')
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            return 0, None
+
+    def save_bookmark(self, event):
+        # Yarım yazılmış dosya kalmasın diye önce geçici dosyaya yazılıp yer değiştirilir
+        temp_file = self.bookmark_file + ".tmp"
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump({'record_number': event['record_number'], 'log_time': event['log_time']}, f)
+        os.replace(temp_file, self.bookmark_file)
+
+    def log_was_reset(self, record_number, log_time):
+        """Yer iminden sonra günlük temizlenmişse True.
+
+        Temizlenen günlükte kayıt numaraları 1'den başlar; günlük eski numarayı geçecek
+        kadar büyümüş olabileceği için yer imindeki kaydın hâlâ aynı kayıt olduğu
+        (numarası ve zamanı) kontrol edilir.
+        """
+        if self.reader.latest_record_number() < record_number:
+            return True
+        if self.reader.oldest_record_number() > record_number:
+            # Günlük dolunca eski kayıtların üzerine yazılmış, numaralar devam ediyor
+            print(f"[{datetime.now()}] Defender günlüğünde yer iminden sonraki bazı kayıtlar okunmadan silinmiş")
+            return False
+        events = self.reader.read_after(record_number - 1, 1)
+        if not events or events[0]['record_number'] != record_number:
+            return True
+        return log_time is not None and events[0]['log_time'] != log_time
+
+    def collect_defender_logs(self):
+        """Yer iminden sonraki Windows Defender loglarını batch'ler halinde oku ve gönder.
+
+        Yer imi sadece batch sunucuya ulaştıktan sonra ilerler; gönderilemeyen kayıtlar
+        sonraki turda tekrar okunur (sunucu aynı kaydı ikinci kez yazmaz).
+        Gönderilen kayıt sayısını döndürür.
+        """
+        bookmark, log_time = self.load_bookmark()
+        if bookmark and self.log_was_reset(bookmark, log_time):
+            # Günlük temizlenmiş, kayıt numaraları baştan başlamış
+            print(f"[{datetime.now()}] Defender günlüğü sıfırlanmış, baştan okunuyor")
+            bookmark = 0
+
+        sent = 0
+        for _ in range(MAX_BATCHES_PER_CYCLE):
+            events = self.reader.read_after(bookmark, BATCH_SIZE)
+            if not events:
+                break
+            if not self.send_to_server(events):
+                if self.uploader.last_status_code != 400:
                     break
-                    
-                for event in events_batch:
-                    if event_count >= self.max_events:
-                        break
-                        
-                    event_dict = {
-                        'log_time': event.TimeGenerated.strftime('%Y-%m-%d %H:%M:%S'),
-                        'source': event.SourceName,
-                        'event_id': event.EventID,
-                        'description': event.StringInserts if event.StringInserts else ['No description']
-                    }
-                    events.append(event_dict)
-                    event_count += 1
-            
-            return events
-            
-        except Exception as e:
-            print(f"Windows Defender logları alınırken hata: {str(e)}")
-            print(traceback.format_exc())
-            return None
+                # Sunucunun reddettiği batch tekrar gönderilmez, yer imi ilerletilir
+                print(f"[{datetime.now()}] Sunucunun reddettiği {len(events)} Defender logu atlandı")
+            else:
+                sent += len(events)
+            bookmark = events[-1]['record_number']
+            self.save_bookmark(events[-1])
+            if len(events) < BATCH_SIZE:
+                break
+        return sent
 
-    def save_to_database(self, events):
-        """Defender loglarını veritabanına kaydet"""
-        try:
-            # Veritabanı bağlantısı
-            connection = mysql.connector.connect(
-                host=DB_CONFIG['host'],
-                user=DB_CONFIG['user'],
-                password=DB_CONFIG['password'],
-                database=DB_CONFIG['database'],
-                port=DB_CONFIG['port'],
-                charset=DB_CONFIG['charset']
-            )
-            
-            cursor = connection.cursor()
-            
-            # Önce system_id'yi al
-            cursor.execute(
-                "SELECT system_id FROM hwd_system_information ORDER BY created_at DESC LIMIT 1"
-            )
-            result = cursor.fetchone()
-            
-            if not result:
-                print("Sistem bilgileri bulunamadı. Defender logları kaydedilemedi.")
-                return False
-                
-            system_id = result[0]
-            
-            for event in events:
-                # StringInserts listesini stringe çevir
-                description = ' '.join(event['description']) if isinstance(event['description'], list) else str(event['description'])
-                
-                query = """
-                    INSERT INTO defender_information 
-                    (system_id, log_time, source, event_id, description)
-                    VALUES (%s, %s, %s, %s, %s)
-                """
-                values = (
-                    system_id,
-                    event['log_time'],
-                    event['source'],
-                    event['event_id'],
-                    description
-                )
-                try:
-                    cursor.execute(query, values)
-                    print(f"[{datetime.now()}] Defender log kaydedildi: Event ID {event['event_id']}")
-                except Exception as e:
-                    print(f"Log kaydedilirken hata: {e}")
-            
-            connection.commit()
-            connection.close()
+    def send_to_server(self, events):
+        """Defender loglarını tek batch halinde sunucuya gönder"""
+        records = []
+        for event in events:
+            # Olayın metin parçalarını stringe çevir
+            description = ' '.join(event['description']) if isinstance(event['description'], list) else str(event['description'])
+            records.append({
+                'record_number': event['record_number'],
+                'log_time': event['log_time'],
+                'source': event['source'],
+                'event_id': event['event_id'],
+                'description': description
+            })
+        
+        if self.uploader.send_records(records):
+            print(f"[{datetime.now()}] {len(records)} Defender logu gönderildi")
             return True
+        print(f"[{datetime.now()}] Defender logları gönderilemedi")
+        return False
 
-        except Exception as e:
-            print(f"Veritabanına log eklerken hata: {str(e)}")
-            print(traceback.format_exc())
-            return False
+    def run_once(self):
+        """Tek tur: yer iminden sonraki logları oku ve gönder"""
+        self.collect_defender_logs()
+        return True
 
     def run(self):
         """Ana döngü"""
@@ -112,13 +119,7 @@ class DefenderMonitor:
         
         while self.running:
             try:
-                # Logları topla
-                events = self.collect_defender_logs()
-            
-                if events:
-                    self.save_to_database(events)
-                
-             
+                self.run_once()
                 time.sleep(self.interval)
                 
             except Exception as e:
@@ -129,6 +130,7 @@ class DefenderMonitor:
     def stop(self):
         """İzlemeyi durdur"""
         self.running = False
+        self.reader.close()
 
 if __name__ == "__main__":
     monitor = DefenderMonitor()
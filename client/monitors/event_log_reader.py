@@ -0,0 +1,118 @@
+import json
+from abc import ABC, abstractmethod
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+
+DEFENDER_CHANNEL = 'Microsoft-Windows-Windows Defender/Operational'
+
+EVENT_NS = {'e': 'http://schemas.microsoft.com/win/2004/08/events/event'}
+
+class EventLogReader(ABC):
+    """Olay günlüğünü kayıt numarasına göre ileri doğru okuyan arayüz.
+
+    Okunan olaylar {'record_number', 'log_time', 'source', 'event_id', 'description'}
+    sözlükleridir; description olayın metin parçalarının listesidir.
+    """
+
+    @abstractmethod
+    def latest_record_number(self):
+        """Günlükteki en yeni kaydın numarası, günlük boşsa 0"""
+
+    @abstractmethod
+    def oldest_record_number(self):
+        """Günlükteki en eski kaydın numarası, günlük boşsa 0"""
+
+    @abstractmethod
+    def read_after(self, record_number, limit):
+        """record_number'dan büyük en fazla limit kaydı eskiden yeniye döndür"""
+
+    def close(self):
+        pass
+
+def _parse_system_time(value):
+    # SystemTime UTC'dir ('2024-05-01T10:15:30.1234567Z'); eski monitör gibi yerel saat yazılır
+    created = datetime.strptime(value[:19], '%Y-%m-%dT%H:%M:%S').replace(tzinfo=timezone.utc)
+    return created.astimezone().strftime('%Y-%m-%d %H:%M:%S')
+
+def parse_event_xml(xml):
+    """EvtRender çıktısındaki olay XML'ini okuyucu sözlüğüne çevir"""
+    root = ET.fromstring(xml)
+    system = root.find('e:System', EVENT_NS)
+    data = [item.text for item in root.iterfind('e:EventData/e:Data', EVENT_NS) if item.text]
+    return {
+        'record_number': int(system.findtext('e:EventRecordID', namespaces=EVENT_NS)),
+        'log_time': _parse_system_time(system.find('e:TimeCreated', EVENT_NS).get('SystemTime')),
+        'source': system.find('e:Provider', EVENT_NS).get('Name'),
+        'event_id': int(system.findtext('e:EventID', namespaces=EVENT_NS)),
+        'description': data or ['No description']
+    }
+
+class Win32EventLogReader(EventLogReader):
+    """Windows olay kanalını EvtQuery ile okur.
+
+    Eski OpenEventLog API'si Operational kanallarını açamaz; EvtQuery ile sadece
+    EventRecordID'si yer iminden büyük kayıtlar sorgulanır.
+    """
+
+    def __init__(self, channel=DEFENDER_CHANNEL):
+        import win32evtlog
+        self.win32evtlog = win32evtlog
+        self.channel = channel
+
+    def _query(self, xpath, flags, count):
+        evt = self.win32evtlog
+        handle = evt.EvtQuery(self.channel, evt.EvtQueryChannelPath | flags, xpath)
+        events = []
+        while len(events) < count:
+            batch = evt.EvtNext(handle, min(count - len(events), 100))
+            if not batch:
+                break
+            for event in batch:
+                events.append(parse_event_xml(evt.EvtRender(event, evt.EvtRenderEventXml)))
+        return events
+
+    def latest_record_number(self):
+        events = self._query('*', self.win32evtlog.EvtQueryReverseDirection, 1)
+        return events[0]['record_number'] if events else 0
+
+    def oldest_record_number(self):
+        events = self._query('*', self.win32evtlog.EvtQueryForwardDirection, 1)
+        return events[0]['record_number'] if events else 0
+
+    def read_after(self, record_number, limit):
+        return self._query(f'*[System[EventRecordID > {int(record_number)}]]',
+                           self.win32evtlog.EvtQueryForwardDirection, limit)
+
+class ReplayEventLogReader(EventLogReader):
+    """Kaydedilmiş olayları (JSON listesi veya satır başına bir JSON) oynatan okuyucu.
+
+    Windows dışında DefenderMonitor'ü denemek için; append() ile günlüğe yeni
+    olay eklenebilir.
+    """
+
+    def __init__(self, path=None, events=None):
+        self.events = list(events or [])
+        if path:
+            with open(path, 'r', encoding='utf-8') as f:
+                content = f.read().strip()
+            if content.startswith('['):
+                self.events.extend(json.loads(content))
+            else:
+                self.events.extend(json.loads(line) for line in content.splitlines() if line.strip())
+        self.events.sort(key=lambda event: event['record_number'])
+
+    def append(self, event):
+        self.events.append(event)
+
+    def clear(self):
+        """Günlüğü temizle (Windows'ta olduğu gibi kayıt numaraları 1'den başlar)"""
+        self.events = []
+
+    def latest_record_number(self):
+        return self.events[-1]['record_number'] if self.events else 0
+
+    def oldest_record_number(self):
+        return self.events[0]['record_number'] if self.events else 0
+
+    def read_after(self, record_number, limit):
+        return [event for event in self.events if event['record_number'] > record_number][:limit]
@@ -1,83 +1,103 @@
-import psutil
 import time
 from datetime import datetime
 import traceback
-import mysql.connector
-from config import DB_CONFIG
+from collections import deque
+from itertools import islice
+from uploader import BatchUploader
+from process_tracker import ProcessTracker
+
+# Olaylar bellekte biriktirilir; bu kadar olay birikince veya bu süre dolunca tek batch'te gönderilir
+FLUSH_SIZE = 500
+FLUSH_INTERVAL = 30  # saniye
+
+# Sunucuya ulaşılamazken tutulacak en fazla olay; dolarsa en eski olaylar atılır
+MAX_BUFFERED_EVENTS = 50000
+
+# Başarısız gönderimden sonra bekleme süresi (saniye), her hatada iki katına çıkar
+RETRY_BACKOFF = 5
+MAX_RETRY_BACKOFF = 300
 
 class EventMonitor:
     def __init__(self):
         self.running = True
         self.interval = 5  
+        self.uploader = BatchUploader('events')
+        # (uygulama, olay türü, zaman) demetleri; gönderilene kadar burada kalır
+        self.buffer = deque(maxlen=MAX_BUFFERED_EVENTS)
+        self.dropped_events = 0
+        self.last_flush = time.monotonic()
+        self.retry_at = 0
+        self.backoff = RETRY_BACKOFF
+        # Süreçler (pid, başlama zamanı) ile izlenir; ad sadece yeni süreçler için okunur
+        self.tracker = ProcessTracker()
 
-    def insert_event(self, app_name, event_type):
-        try:
-            
-            connection = mysql.connector.connect(
-                host=DB_CONFIG['host'],
-                user=DB_CONFIG['user'],
-                password=DB_CONFIG['password'],
-                database=DB_CONFIG['database'],
-                port=DB_CONFIG['port'],
-                charset=DB_CONFIG['charset']
-            )
-            
-            cursor = connection.cursor()
-            
-           
-            cursor.execute(
-                "SELECT system_id FROM hwd_system_information ORDER BY created_at DESC LIMIT 1"
-            )
-            result = cursor.fetchone()
-            
-            if not result:
-                print("Sistem bilgileri bulunamadı. Event bilgisi kaydedilemedi.")
-                return
-                
-            system_id = result[0]
+    def record_event(self, app_name, event_type, timestamp):
+        """Olayı tampona ekle (gönderim flush() ile toplu yapılır)"""
+        if len(self.buffer) == self.buffer.maxlen:
+            self.dropped_events += 1
+        self.buffer.append((app_name, event_type, timestamp))
+
+    def flush(self, force=False):
+        """Tampondaki olayları FLUSH_SIZE'lık batch'ler halinde gönder.
+
+        Gönderilemeyen olaylar tamponda kalır ve bekleme süresi sonunda tekrar denenir.
+        """
+        now = time.monotonic()
+        if not self.buffer:
+            return True
+        if not force and (now < self.retry_at or
+                          (len(self.buffer) < FLUSH_SIZE and now - self.last_flush < FLUSH_INTERVAL)):
+            return True
+
+        sent = 0
+        while self.buffer:
+            batch = list(islice(self.buffer, FLUSH_SIZE))
+            records = [
+                {'app_name': app_name, 'event_type': event_type, 'timestamp': timestamp}
+                for app_name, event_type, timestamp in batch
+            ]
+            # Tekrar deneme tampon üzerinden yapılır, izleme döngüsü beklemez
+            if self.uploader.send({'records': records}, max_retries=1) is None:
+                if self.uploader.last_status_code == 400:
+                    print(f"[{datetime.now()}] Sunucunun reddettiği {len(batch)} event atıldı")
+                else:
+                    self.retry_at = now + self.backoff
+                    self.backoff = min(self.backoff * 2, MAX_RETRY_BACKOFF)
+                    print(f"[{datetime.now()}] Eventler gönderilemedi, {len(self.buffer)} event tamponda "
+                          f"bekliyor ({self.dropped_events} event kapasite aşımından atıldı)")
+                    return False
+            for _ in batch:
+                self.buffer.popleft()
+            sent += len(batch)
+
+        self.last_flush = now
+        self.retry_at = 0
+        self.backoff = RETRY_BACKOFF
+        print(f"[{datetime.now()}] {sent} event gönderildi")
+        return True
 
-            
-            query = """
-                INSERT INTO event_information (app_name, event_type, timestamp, system_id)
-                VALUES (%s, %s, %s, %s)
-            """
-            timestamp = datetime.now()
-            cursor.execute(query, (app_name, event_type, timestamp, system_id))
-            connection.commit()
-            print(f"[{timestamp}] Event kaydedildi: {app_name} - {event_type}")
-            
-            connection.close()
-            
-        except Exception as err:
-            print(f"Veritabanına event eklerken hata oluştu: {err}")
-            print(traceback.format_exc())
+    def run_once(self):
+        """Tek tur: başlayan/biten süreçleri kaydet, gerekiyorsa tamponu gönder"""
+        started, stopped = self.tracker.poll()
+
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        for _pid, create_time, name in started:
+            if name:
+                # Açılma zamanı tarama anı değil sürecin gerçek başlama zamanıdır
+                opened_at = datetime.fromtimestamp(create_time).strftime('%Y-%m-%d %H:%M:%S') if create_time else timestamp
+                self.record_event(name.lower(), "opened", opened_at)
+        for _pid, _create_time, name in stopped:
+            if name:
+                self.record_event(name.lower(), "closed", timestamp)
+        return self.flush()
 
     def monitor_events(self):
         """Uygulama olaylarını izle"""
-        running_apps = set()
         print(f"[{datetime.now()}] Olay izleme başlatıldı...")
         
         while self.running:
             try:
-                current_apps = set()
-
-                for proc in psutil.process_iter(['pid', 'name']):
-                    try:
-                        current_apps.add(proc.info['name'].lower())
-                    except (psutil.AccessDenied, psutil.NoSuchProcess):
-                        continue
-
-                
-                new_apps = current_apps - running_apps
-                for app in new_apps:
-                    self.insert_event(app, "opened")
-
-                
-                closed_apps = running_apps - current_apps
-                for app in closed_apps:
-                    self.insert_event(app, "closed")
-
-                running_apps = current_apps
+                self.run_once()
                 time.sleep(self.interval)
                 
             except Exception as e:
@@ -86,8 +106,9 @@ class EventMonitor:
                 time.sleep(60)  
 
     def stop(self):
-        """İzlemeyi durdur"""
+        """İzlemeyi durdur, tamponda kalan olayları göndermeyi dene"""
         self.running = False
+        self.flush(force=True)
 
 if __name__ == "__main__":
     monitor = EventMonitor()
@@ -3,28 +3,41 @@ import platform
 import socket
 import win32com.client
 import time
-from database import db
 import traceback
-import mysql.connector
 import uuid
+import hashlib
+import json
 from datetime import datetime
 import logging
 import os
+from uploader import BatchUploader
 
 
 log_dir = "logs"
-if not os.path.exists(log_dir):
-    os.makedirs(log_dir)
 
-log_file = os.path.join(log_dir, f"hardware_monitor_{datetime.now().strftime('%Y%m%d')}.log")
-logging.basicConfig(
-    filename=log_file,
-    level=logging.DEBUG,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+# Monitörün kendi logger'ı; kök logger'ı ajan (veya tek başına çalışırken configure_logging) ayarlar
+logger = logging.getLogger("hardware_monitor")
+
+def configure_logging():
+    """Monitör loglarını günlük dosyaya yaz (kök logger'a dokunulmaz)"""
+    os.makedirs(log_dir, exist_ok=True)
+    log_file = os.path.join(log_dir, f"hardware_monitor_{datetime.now().strftime('%Y%m%d')}.log")
+    handler = logging.FileHandler(log_file)
+    handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.DEBUG)
+
+# Değişmeyen ağ ve cihaz listeleri de bu aralıkta bir gönderilir (sunucudaki kayıt kaybolduysa düzelir)
+FULL_SYNC_INTERVAL = 3600
+
+def fingerprint(items):
+    """Bölüm içeriğinin özeti; sıra değişikliği fark sayılmaz"""
+    normalized = sorted(json.dumps(item, sort_keys=True) for item in items)
+    return hashlib.sha1(json.dumps(normalized).encode('utf-8')).hexdigest()
 
 def log_error(error):
-    logging.error(f"Hata oluştu: {str(error)}")
+    logger.error(f"Hata oluştu: {str(error)}")
+    os.makedirs(log_dir, exist_ok=True)
     with open(os.path.join(log_dir, "error.txt"), "a") as f:
         f.write(f"{datetime.now()} - {str(error)}\n")
 
@@ -33,6 +46,18 @@ class HardwareMonitor:
         self.interval = 60  
         self.system_id = None
         self.running = True
+        self.uploader = BatchUploader('hardware')
+        # WMI oturumu döngüler arasında yeniden kullanılır, hata olursa yeniden açılır
+        self._wmi = None
+        # Sunucuya en son ulaşan bölümlerin özeti: bölüm -> fingerprint
+        self.fingerprints = {}
+        self.last_full_sync = 0
+
+    def wmi(self):
+        """WMI oturumu (ilk kullanımda, kullanan thread'de açılır)"""
+        if self._wmi is None:
+            self._wmi = win32com.client.GetObject("winmgmts:\\\\.\\root\\cimv2")
+        return self._wmi
         
     def collect_system_info(self):
         """Sistem bilgilerini topla"""
@@ -47,14 +72,14 @@ class HardwareMonitor:
             system_info["disk_space"] = f"{round(psutil.disk_usage('/').total / (1024**3), 2)} GB"
             
             
-            wmi = win32com.client.GetObject('winmgmts:')
-            for item in wmi.InstancesOf("Win32_ComputerSystem"):
+            for item in self.wmi().ExecQuery("SELECT Manufacturer, Model FROM Win32_ComputerSystem"):
                 system_info["manufacturer"] = item.Manufacturer
                 system_info["model"] = item.Model
             
             return system_info
         except Exception as e:
             print(f"Sistem bilgileri toplanırken hata: {str(e)}")
+            self._wmi = None
             return None
 
     def collect_network_info(self):
@@ -80,8 +105,8 @@ class HardwareMonitor:
         """Bağlı cihaz bilgilerini topla"""
         try:
             device_info = []
-            wmi = win32com.client.GetObject("winmgmts:\\\\.\\root\\cimv2")
-            devices = wmi.InstancesOf("Win32_PnPEntity")
+            # Sadece ad kolonu istenir; InstancesOf her cihazın tüm özelliklerini getirir
+            devices = self.wmi().ExecQuery("SELECT Name FROM Win32_PnPEntity")
             
             for device in devices:
                 if device.Name:
@@ -96,130 +121,68 @@ class HardwareMonitor:
         except Exception as e:
             print(f"Cihaz bilgileri toplanırken hata: {str(e)}")
             print(traceback.format_exc())
+            self._wmi = None
             return None
 
-    def save_to_database(self):
-        try:
-          
-            connection = mysql.connector.connect(
-                host='mysql-20847602-ktun-f5b8.h.aivencloud.com',
-                user='avnadmin',
-                password='AVNS_J3Mb3cvEjKmRdkQc1DN',
-                database='defaultdb',
-                port=13447,
-                charset='utf8mb4'
-            )
-            
-            cursor = connection.cursor(dictionary=True)
-            
-            
-            cursor.execute("""
-                SELECT system_id 
-                FROM hwd_system_information 
-                WHERE computer_name = %s 
-                ORDER BY created_at DESC 
-                LIMIT 1
-            """, (self.system_info['computer_name'],))
-            
-            result = cursor.fetchone()
-            if result:
-                self.system_id = result['system_id']
-                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Mevcut System ID kullanılıyor: {self.system_id}")
-            else:
-               
-                timestamp = int(time.time()) % 1000000
-                self.system_id = timestamp
-                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Yeni System ID oluşturuldu: {self.system_id}")
-
-            
-            current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            cursor.execute("""
-                UPDATE hwd_system_information 
-                SET operating_system = %s,
-                    processor = %s,
-                    ram = %s,
-                    disk_space = %s,
-                    manufacturer = %s,
-                    model = %s,
-                    created_at = %s
-                WHERE computer_name = %s
-            """, (
-                self.system_info['operating_system'],
-                self.system_info['processor'],
-                self.system_info['ram'],
-                self.system_info['disk_space'],
-                self.system_info['manufacturer'],
-                self.system_info['model'],
-                current_time,
-                self.system_info['computer_name']
-            ))
-
-           
-            if cursor.rowcount == 0:
-                cursor.execute("""
-                    INSERT INTO hwd_system_information 
-                    (system_id, computer_name, operating_system, processor, ram, disk_space, manufacturer, model, created_at) 
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """, (
-                    self.system_id,
-                    self.system_info['computer_name'],
-                    self.system_info['operating_system'],
-                    self.system_info['processor'],
-                    self.system_info['ram'],
-                    self.system_info['disk_space'],
-                    self.system_info['manufacturer'],
-                    self.system_info['model'],
-                    current_time
-                ))
-
-            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Sistem bilgileri kaydedildi")
-
-           
-            cursor.execute("""
-                DELETE FROM hwd_network_information 
-                WHERE system_id = %s
-            """, (self.system_id,))
-
-            
-            for network in self.network_info:
-                cursor.execute("""
-                    INSERT INTO hwd_network_information 
-                    (system_id, Ag_karti, IP_adress, mac_address, created_at) 
-                    VALUES (%s, %s, %s, %s, %s)
-                """, (
-                    self.system_id,
-                    network['interface'],
-                    network['ip_address'],
-                    network['mac_address'],
-                    current_time
-                ))
-            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Ağ bilgileri kaydedildi")
-
-            cursor.execute("""
-                DELETE FROM hwd_pnp_devices 
-                WHERE system_id = %s
-            """, (self.system_id,))
-
-            # Yeni cihaz bilgilerini ekle
-            for device in self.device_info:
-                cursor.execute("""
-                    INSERT INTO hwd_pnp_devices
-                    (system_id, device_name, created_at)
-                    VALUES (%s, %s, %s)
-                """, (
-                    self.system_id,
-                    device['device_name'],
-                    current_time
-                ))
-
-            connection.commit()
-            connection.close()
-            return self.system_id
-            
-        except Exception as e:
-            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Veritabanı hatası: {str(e)}")
-            print(traceback.format_exc())
+    def send_to_server(self):
+        """Sistem bilgilerini ve değişen ağ/cihaz listelerini tek batch halinde sunucuya gönder.
+
+        Sistem bilgisi her turda gönderilir (sunucu değişmediyse sadece son görülme
+        zamanını ilerletir); ağ ve cihaz listeleri özetleri değiştiyse veya
+        FULL_SYNC_INTERVAL dolduysa eklenir, sunucu bunları farkla eşitler.
+        """
+        now = time.time()
+        full_sync = now - self.last_full_sync >= FULL_SYNC_INTERVAL
+        payload = {"system": self.system_info}
+        pending = {}
+        for section, items in (("network", self.network_info), ("devices", self.device_info)):
+            digest = fingerprint(items)
+            if full_sync or self.fingerprints.get(section) != digest:
+                payload[section] = items
+                pending[section] = digest
+
+        result = self.uploader.send(payload)
+        if not result:
             return None
+        
+        system_id = result.get('system_id')
+        if self.system_id is not None and system_id != self.system_id:
+            # Sunucu bilgisayarı yeniden kaydetmiş; bir sonraki turda tüm bölümler gönderilir
+            self.fingerprints.clear()
+        else:
+            self.fingerprints.update(pending)
+            if full_sync:
+                self.last_full_sync = now
+        self.system_id = system_id
+        sections = ", ".join(["sistem"] + [section for section in ("network", "devices") if section in pending])
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Sistem bilgileri gönderildi "
+              f"({sections}; System ID: {self.system_id})")
+        return self.system_id
+
+    def run_once(self):
+        """Tek tur: bilgileri topla ve gönder; bilgisayar sunucuya kaydedildiyse True"""
+        # Sistem bilgilerini topla
+        self.system_info = self.collect_system_info()
+        if not self.system_info:
+            print("Sistem bilgileri toplanamadı!")
+            return False
+        
+        # Ağ bilgilerini topla
+        self.network_info = self.collect_network_info()
+        if not self.network_info:
+            print("Ağ bilgileri toplanamadı!")
+            return False
+       
+        self.device_info = self.collect_device_info()
+        if not self.device_info:
+            print("Cihaz bilgileri toplanamadı!")
+            return False
+        
+        if self.send_to_server():
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Veriler başarıyla kaydedildi.")
+            return True
+        print("Veriler kaydedilemedi!")
+        return False
 
     def run(self):
         """Sürekli çalışan ana döngü"""
@@ -227,32 +190,7 @@ class HardwareMonitor:
         
         while self.running:
             try:
-                # Sistem bilgilerini topla
-                self.system_info = self.collect_system_info()
-                if not self.system_info:
-                    print("Sistem bilgileri toplanamadı!")
-                    time.sleep(self.interval)
-                    continue
-                
-                # Ağ bilgilerini topla
-                self.network_info = self.collect_network_info()
-                if not self.network_info:
-                    print("Ağ bilgileri toplanamadı!")
-                    time.sleep(self.interval)
-                    continue
-               
-                self.device_info = self.collect_device_info()
-                if not self.device_info:
-                    print("Cihaz bilgileri toplanamadı!")
-                    time.sleep(self.interval)
-                    continue
-                
-                
-                if self.save_to_database():
-                    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Veriler başarıyla kaydedildi.")
-                else:
-                    print("Veriler kaydedilemedi!")
-                
+                self.run_once()
                 time.sleep(self.interval)
                     
             except Exception as e:
@@ -265,15 +203,16 @@ class HardwareMonitor:
         self.running = False
 
 if __name__ == "__main__":
+    configure_logging()
     monitor = HardwareMonitor()
     try:
-        logging.info("Hardware monitor başlatılıyor...")
+        logger.info("Hardware monitor başlatılıyor...")
         monitor.run()
     except KeyboardInterrupt:
         print("\nMonitör durduruluyor...")
         monitor.stop()
     except Exception as e:
         log_error(e)
-        logging.error(f"Kritik hata: {e}")
+        logger.error(f"Kritik hata: {e}")
     finally:
-        logging.info("Hardware monitor tamamlandı.") 
\ No newline at end of file
+        logger.info("Hardware monitor tamamlandı.") 
\ No newline at end of file
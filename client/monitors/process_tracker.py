@@ -0,0 +1,97 @@
+import psutil
+
+class ProcessGone(Exception):
+    """Süreç sorgulanırken sonlanmış"""
+
+class PsutilProcessTable:
+    """Gerçek süreç tablosu; ProcessTracker sadece bu üç işlemi kullanır"""
+
+    def pids(self):
+        return psutil.pids()
+
+    def create_time(self, pid):
+        """Sürecin başlama zamanı (erişim reddedilirse None)"""
+        try:
+            return psutil.Process(pid).create_time()
+        except (psutil.NoSuchProcess, psutil.ZombieProcess):
+            raise ProcessGone(pid)
+        except psutil.AccessDenied:
+            return None
+
+    def describe(self, pid):
+        """Yeni görülen süreç için (başlama zamanı, ad); ad okunamazsa None"""
+        try:
+            process = psutil.Process(pid)
+            with process.oneshot():
+                create_time = process.create_time()
+                try:
+                    name = process.name()
+                except psutil.AccessDenied:
+                    name = None
+            return create_time, name
+        except (psutil.NoSuchProcess, psutil.ZombieProcess):
+            raise ProcessGone(pid)
+        except psutil.AccessDenied:
+            return None, None
+
+class ProcessTracker:
+    """Süreçleri (pid, create_time) ile takip ederek başlayan ve biten süreçleri bulur.
+
+    Her turda sadece pid listesi alınır; bilinen pid'ler için başlama zamanı kontrol
+    edilir (pid yeniden kullanıldıysa eski süreç bitmiş, yenisi başlamış sayılır),
+    ad gibi öznitelikler sadece yeni süreçler için bir kez okunur. Aynı adlı birden
+    fazla süreç ve tur arasında yeniden başlatılan süreçler ayrı ayrı görülür.
+    """
+
+    def __init__(self, table=None):
+        self.table = table or PsutilProcessTable()
+        # pid -> (create_time, ad)
+        self._processes = {}
+        self._primed = False
+
+    def poll(self):
+        """Son çağrıdan bu yana başlayan ve biten süreçler: ([(pid, create_time, ad)], [...]).
+
+        İlk çağrı o an çalışan süreçleri öğrenir ve boş döner.
+        """
+        started = []
+        stopped = []
+        current = set(self.table.pids())
+
+        for pid in [pid for pid in self._processes if pid not in current]:
+            stopped.append((pid,) + self._processes.pop(pid))
+
+        for pid in current:
+            known = self._processes.get(pid)
+            if known is not None:
+                try:
+                    create_time = self.table.create_time(pid)
+                except ProcessGone:
+                    stopped.append((pid,) + self._processes.pop(pid))
+                    continue
+                if create_time == known[0]:
+                    continue
+                if create_time is None or known[0] is None:
+                    # Başlama zamanı okunamıyor (AccessDenied): pid'in yeniden kullanıldığı
+                    # anlaşılamaz, süreç değişmemiş sayılır; okunabildiyse saklanır
+                    if create_time is not None:
+                        self._processes[pid] = (create_time, known[1])
+                    continue
+                # pid yeniden kullanılmış: eski süreç bitmiş
+                stopped.append((pid,) + self._processes.pop(pid))
+
+            try:
+                create_time, name = self.table.describe(pid)
+            except ProcessGone:
+                # İki tur arasında başlayıp bitmiş
+                continue
+            self._processes[pid] = (create_time, name)
+            started.append((pid, create_time, name))
+
+        if not self._primed:
+            self._primed = True
+            return [], []
+        return started, stopped
+
+    def __len__(self):
+        return len(self._processes)
@@ -0,0 +1,180 @@
+"""EventMonitor süreç taramasının CPU maliyeti ölçümü.
+
+Sahte bir süreç tablosu üzerinde eski yolu (her turda process_iter(['pid', 'name'])
+ile tüm süreç adlarını okuyup küme farkı almak) ve ProcessTracker'ı karşılaştırır.
+Süreç özniteliği okumalarının sistem çağrısı maliyeti --create-time-cost-us ve
+--name-cost-us kadar meşgul beklemeyle taklit edilir; süre CPU zamanıdır.
+Olay sütunları her turdaki gerçek başlama/bitme sayısıyla iki yolun bulduğunu
+karşılaştırır (eski yol aynı adlı süreçleri ve tur arasındaki yeniden başlatmaları kaçırır).
+
+Örnek:
+    python process_tracker_benchmark.py --sizes 200,500,1000 --churn 5 --ticks 200
+"""
+import argparse
+import json
+import random
+import time
+
+from process_tracker import ProcessTracker
+
+NAMES = ['svchost.exe', 'chrome.exe', 'explorer.exe', 'RuntimeBroker.exe', 'conhost.exe',
+         'Code.exe', 'OUTLOOK.EXE', 'teams.exe', 'python.exe', 'notepad.exe']
+
+def spin(microseconds):
+    """Sistem çağrısı maliyetini CPU harcayarak taklit et"""
+    if microseconds <= 0:
+        return
+    end = time.perf_counter() + microseconds / 1e6
+    while time.perf_counter() < end:
+        pass
+
+class FakeProcessTable:
+    """ProcessTracker'ın beklediği arayüzü sağlayan sahte süreç tablosu"""
+
+    def __init__(self, size, seed, create_time_cost_us, name_cost_us):
+        self.random = random.Random(seed)
+        self.create_time_cost_us = create_time_cost_us
+        self.name_cost_us = name_cost_us
+        self.clock = 1700000000.0
+        self.next_pid = 4
+        self.free_pids = []
+        # pid -> (create_time, ad)
+        self.processes = {}
+        self.create_time_calls = 0
+        self.name_calls = 0
+        for _ in range(size):
+            self._spawn()
+
+    def _spawn(self):
+        # Windows pid'leri hızla yeniden kullanır
+        if self.free_pids and self.random.random() < 0.5:
+            pid = self.free_pids.pop(self.random.randrange(len(self.free_pids)))
+        else:
+            pid = self.next_pid
+            self.next_pid += 4
+        # Çoğu süreç aynı adlı birkaç programın kopyası, kalanı farklı uygulamalar
+        if self.random.random() < 0.7:
+            name = self.random.choice(NAMES)
+        else:
+            name = f"app{self.random.randrange(1000)}.exe"
+        self.processes[pid] = (self.clock, name)
+
+    def step(self, churn):
+        """Bir tur ilerlet: churn süreç biter, churn süreç başlar"""
+        self.clock += 5
+        for pid in self.random.sample(list(self.processes), min(churn, len(self.processes))):
+            del self.processes[pid]
+            self.free_pids.append(pid)
+        for _ in range(churn):
+            self._spawn()
+        return churn, churn
+
+    def pids(self):
+        return list(self.processes)
+
+    def create_time(self, pid):
+        self.create_time_calls += 1
+        spin(self.create_time_cost_us)
+        return self.processes[pid][0]
+
+    def name(self, pid):
+        self.name_calls += 1
+        spin(self.name_cost_us)
+        return self.processes[pid][1]
+
+    def describe(self, pid):
+        return self.create_time(pid), self.name(pid)
+
+    def reset_counters(self):
+        self.create_time_calls = 0
+        self.name_calls = 0
+
+class LegacyScanner:
+    """Önceki monitor_events: her turda tüm adları okuyup küme farkı"""
+
+    def __init__(self, table):
+        self.table = table
+        self.running_apps = set()
+
+    def poll(self):
+        current_apps = set()
+        for pid in self.table.pids():
+            # process_iter her süreç için Process nesnesini doğrular, sonra adı okur
+            self.table.create_time(pid)
+            current_apps.add(self.table.name(pid).lower())
+        started = current_apps - self.running_apps
+        stopped = self.running_apps - current_apps
+        self.running_apps = current_apps
+        return started, stopped
+
+def measure(make_scanner, args, size):
+    """Aynı süreç akışında tur başına CPU süresi, öznitelik okumaları ve bulunan olaylar"""
+    table = FakeProcessTable(size, args.seed, args.create_time_cost_us, args.name_cost_us)
+    scanner = make_scanner(table)
+    scanner.poll()
+    table.reset_counters()
+
+    expected = 0
+    found = 0
+    elapsed = 0.0
+    for _ in range(args.ticks):
+        started, stopped = table.step(args.churn)
+        expected += started + stopped
+        start = time.process_time()
+        started, stopped = scanner.poll()
+        elapsed += time.process_time() - start
+        found += len(started) + len(stopped)
+    return {
+        'ms_per_tick': round(elapsed * 1000 / args.ticks, 3),
+        'create_time_per_tick': round(table.create_time_calls / args.ticks, 1),
+        'name_per_tick': round(table.name_calls / args.ticks, 1),
+        'expected_events': expected,
+        'found_events': found
+    }
+
+def run(args):
+    rows = []
+    for size in args.sizes:
+        legacy = measure(LegacyScanner, args, size)
+        tracker = measure(ProcessTracker, args, size)
+        rows.append({
+            'processes': size,
+            'churn': args.churn,
+            'legacy': legacy,
+            'tracker': tracker,
+            'speedup': round(legacy['ms_per_tick'] / tracker['ms_per_tick'], 1) if tracker['ms_per_tick'] else None
+        })
+    return rows
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Süreç takibi CPU maliyeti ölçümü")
+    parser.add_argument("--sizes", default="200,500,1000",
+                        type=lambda value: [int(v) for v in value.split(",")],
+                        help="virgülle ayrılmış süreç sayıları")
+    parser.add_argument("--churn", type=int, default=5, help="tur başına biten ve başlayan süreç sayısı")
+    parser.add_argument("--ticks", type=int, default=100)
+    parser.add_argument("--create-time-cost-us", type=float, default=5,
+                        help="başlama zamanı okumasının taklit edilen maliyeti (µs)")
+    parser.add_argument("--name-cost-us", type=float, default=20,
+                        help="ad okumasının taklit edilen maliyeti (µs)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="sonuçları JSON olarak yazdır")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    rows = run(args)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print(f"{'süreç':>6} {'eski ms/tur':>11} {'yeni ms/tur':>11} {'hızlanma':>9} "
+              f"{'eski ad/tur':>11} {'yeni ad/tur':>11} {'gerçek olay':>11} {'eski olay':>9} {'yeni olay':>9}")
+        for row in rows:
+            legacy, tracker = row['legacy'], row['tracker']
+            print(f"{row['processes']:>6} {legacy['ms_per_tick']:>11} {tracker['ms_per_tick']:>11} "
+                  f"{str(row['speedup']):>9} {legacy['name_per_tick']:>11} {tracker['name_per_tick']:>11} "
+                  f"{legacy['expected_events']:>11} {legacy['found_events']:>9} {tracker['found_events']:>9}")
+    return rows
+
+if __name__ == "__main__":
+    main()
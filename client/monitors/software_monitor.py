@@ -1,14 +1,22 @@
 import winreg
 import time
+import json
+import os
 from datetime import datetime
 import traceback
-import mysql.connector
-from config import DB_CONFIG
+from uploader import BatchUploader
+
+# Sunucuya en son başarıyla gönderilen envanter; fark bu listeye göre hesaplanır
+STATE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "software_inventory_state.json")
+
+# Bu aralıkta bir tam liste gönderilir, sunucu farkı kendisi hesaplar (kaçmış farklar düzelir)
+FULL_SYNC_INTERVAL = 24 * 3600
 
 class SoftwareMonitor:
     def __init__(self):
         self.running = True
         self.interval = 3600  
+        self.uploader = BatchUploader('software')
 
     def get_installed_software(self):
         """Yüklü yazılımları tespit et"""
@@ -76,61 +84,80 @@ class SoftwareMonitor:
                 
         return software_list
 
-    def save_to_database(self, software_list):
-        """Yazılım bilgilerini veritabanına kaydet"""
+    @staticmethod
+    def inventory_key(software):
+        """Yazılımın anahtarı (sunucudaki software_key ile aynı alanlar: ad + yayıncı)"""
+        return f"{software['name'].lower()}\x1f{(software['publisher'] or '').lower()}"
+
+    def build_inventory(self, software_list):
+        """Listeyi anahtar -> yazılım sözlüğüne çevir (aynı yazılım birden fazla kayıt anahtarında olabilir)"""
+        return {self.inventory_key(software): software for software in software_list}
+
+    @staticmethod
+    def diff_inventory(previous, current):
+        """Önceki ve güncel envanter arasındaki kurulan, güncellenen ve kaldırılan yazılımlar"""
+        installed = [software for key, software in current.items() if key not in previous]
+        updated = [
+            software for key, software in current.items()
+            if key in previous and (previous[key]['version'] != software['version']
+                                    or previous[key]['install_date'] != software['install_date'])
+        ]
+        removed = [
+            {'name': software['name'], 'publisher': software['publisher']}
+            for key, software in previous.items() if key not in current
+        ]
+        return installed, updated, removed
+
+    def load_state(self):
+        """Son gönderilen envanter ve son tam senkronizasyon zamanı, yoksa None"""
         try:
-           
-            connection = mysql.connector.connect(
-                host=DB_CONFIG['host'],
-                user=DB_CONFIG['user'],
-                password=DB_CONFIG['password'],
-                database=DB_CONFIG['database'],
-                port=DB_CONFIG['port'],
-                charset=DB_CONFIG['charset']
-            )
-            
-            cursor = connection.cursor()
-            
-           
-            cursor.execute(
-                "SELECT system_id FROM hwd_system_information ORDER BY created_at DESC LIMIT 1"
-            )
-            result = cursor.fetchone()
-            
-            if not result:
-                print("Sistem bilgileri bulunamadı. Yazılım bilgileri kaydedilemedi.")
-                return False
-                
-            system_id = result[0]
-            
-            for software in software_list:
-                query = """
-                    INSERT INTO software_information 
-                    (system_id, software_name, version, install_date, publisher)
-                    VALUES (%s, %s, %s, %s, %s)
-                """
-                values = (
-                    system_id,
-                    software['name'],
-                    software['version'],
-                    software['install_date'],
-                    software['publisher']
-                )
-                
-                try:
-                    cursor.execute(query, values)
-                    print(f"[{datetime.now()}] Yazılım bilgisi kaydedildi: {software['name']}")
-                except Exception as e:
-                    print(f"Yazılım bilgisi kaydedilirken hata: {e}")
-            
-            connection.commit()
-            connection.close()
-            return True
-            
-        except Exception as e:
-            print(f"Veritabanına yazılım bilgisi eklerken hata: {str(e)}")
-            print(traceback.format_exc())
+            with open(STATE_FILE, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            return state if 'inventory' in state and 'last_full_sync' in state else None
+        except (OSError, ValueError):
+            return None
+
+    def save_state(self, inventory, last_full_sync):
+        # Yarım yazılmış dosya kalmasın diye önce geçici dosyaya yazılıp yer değiştirilir
+        temp_file = STATE_FILE + ".tmp"
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump({'inventory': inventory, 'last_full_sync': last_full_sync}, f, ensure_ascii=False)
+        os.replace(temp_file, STATE_FILE)
+
+    def send_to_server(self, software_list):
+        """Son gönderimden bu yana değişen yazılımları (veya periyodik tam listeyi) sunucuya gönder"""
+        inventory = self.build_inventory(software_list)
+        state = self.load_state()
+        now = time.time()
+        
+        if state is None or now - state['last_full_sync'] >= FULL_SYNC_INTERVAL:
+            payload = {'full_sync': True, 'records': list(inventory.values())}
+            last_full_sync = now
+        else:
+            installed, updated, removed = self.diff_inventory(state['inventory'], inventory)
+            if not (installed or updated or removed):
+                print(f"[{datetime.now()}] Yazılım envanterinde değişiklik yok")
+                return True
+            payload = {'installed': installed, 'updated': updated, 'removed': removed}
+            last_full_sync = state['last_full_sync']
+        
+        result = self.uploader.send(payload)
+        if result is None:
+            # Durum dosyası güncellenmez, fark bir sonraki turda tekrar gönderilir
+            print(f"[{datetime.now()}] Yazılım envanteri gönderilemedi")
             return False
+        
+        self.save_state(inventory, last_full_sync)
+        print(f"[{datetime.now()}] Yazılım envanteri gönderildi: {result.get('installed', 0)} kurulan, "
+              f"{result.get('updated', 0)} güncellenen, {result.get('removed', 0)} kaldırılan")
+        return True
+
+    def run_once(self):
+        """Tek tur: envanteri oku ve farkı gönder (ajan bu metodu kendi aralığıyla çağırır)"""
+        software_list = self.get_installed_software()
+        if not software_list:
+            return False
+        return bool(self.send_to_server(software_list))
 
     def run(self):
         """Ana döngü"""
@@ -138,14 +165,7 @@ class SoftwareMonitor:
         
         while self.running:
             try:
-                
-                software_list = self.get_installed_software()
-                
-                if software_list:
-                    
-                    self.save_to_database(software_list)
-                
-               
+                self.run_once()
                 time.sleep(self.interval)
                 
             except Exception as e:
@@ -0,0 +1,102 @@
+import gzip
+import json
+import os
+import socket
+import threading
+import time
+from datetime import datetime
+
+import requests
+
+# Sunucudaki ingest API'si (server/app.py: /api/ingest/<monitör türü>)
+INGEST_URL = os.environ.get('MONITOR_INGEST_URL', 'http://192.168.1.33:5000/api/ingest')
+# Zorunlu: sunucu anahtarsız veya yanlış anahtarlı istekleri reddeder
+INGEST_TOKEN = os.environ.get('MONITOR_INGEST_TOKEN')
+if not INGEST_TOKEN:
+    print(f"[{datetime.now()}] UYARI: MONITOR_INGEST_TOKEN ayarlanmamış, sunucu monitör verilerini kabul etmeyecek")
+
+# Sunucunun batch başına kabul ettiği en fazla kayıt (server/ingest.py: MAX_BATCH_RECORDS)
+MAX_BATCH_RECORDS = 5000
+
+# Aynı süreçteki tüm BatchUploader'ların paylaştığı HTTP oturumu (keep-alive bağlantı havuzu)
+_shared_session = None
+_shared_session_lock = threading.Lock()
+
+REQUEST_TIMEOUT = 30
+MAX_RETRIES = 3
+RETRY_DELAY = 5  # saniye, her denemede iki katına çıkar
+MAX_RETRY_AFTER = 300  # sunucunun önerdiği bekleme süresi bu değerle sınırlanır
+
+def shared_session():
+    """Süreç genelindeki ortak requests oturumu (ilk kullanımda oluşturulur)"""
+    global _shared_session
+    with _shared_session_lock:
+        if _shared_session is None:
+            session = requests.Session()
+            session.headers.update({
+                'Content-Type': 'application/json',
+                'Content-Encoding': 'gzip'
+            })
+            _shared_session = session
+        return _shared_session
+
+class BatchUploader:
+    """Monitör verisini gzip'li JSON batch'leri halinde sunucuya gönderir.
+
+    Süreçteki tüm monitörler tek bir HTTP oturumunu (keep-alive) paylaşır;
+    istemciler veritabanına bağlanmaz.
+    """
+
+    def __init__(self, monitor_type, url=INGEST_URL, token=INGEST_TOKEN, session=None):
+        self.monitor_type = monitor_type
+        self.url = f"{url.rstrip('/')}/{monitor_type}"
+        self.computer_name = socket.gethostname()
+        self.session = session or shared_session()
+        self.headers = {'X-Ingest-Token': token} if token else {}
+        # Son isteğin HTTP durum kodu (bağlantı hatasında None)
+        self.last_status_code = None
+
+    def send(self, payload, max_retries=MAX_RETRIES):
+        """Tek bir batch gönder; başarılıysa sunucunun yanıtını, değilse None döndür"""
+        payload = dict(payload, computer_name=self.computer_name)
+        body = gzip.compress(json.dumps(payload, default=str).encode('utf-8'))
+
+        delay = RETRY_DELAY
+        for attempt in range(max_retries):
+            wait = delay
+            self.last_status_code = None
+            try:
+                response = self.session.post(self.url, data=body, headers=self.headers, timeout=REQUEST_TIMEOUT)
+                self.last_status_code = response.status_code
+                if response.ok:
+                    return response.json()
+                # 400: veri hatalı, tekrar göndermenin anlamı yok
+                if response.status_code == 400:
+                    print(f"[{datetime.now()}] {self.monitor_type} verisi sunucu tarafından reddedildi: {response.text}")
+                    return None
+                # 429/503: sunucu kuyruğu dolu veya veritabanı erişilemiyor, önerilen süre kadar beklenir
+                wait = max(delay, self._retry_after(response))
+                print(f"[{datetime.now()}] {self.monitor_type} verisi gönderilemedi "
+                      f"(HTTP {response.status_code}, deneme {attempt + 1}/{max_retries})")
+            except (requests.RequestException, ValueError) as e:
+                print(f"[{datetime.now()}] {self.monitor_type} verisi gönderilirken hata "
+                      f"(deneme {attempt + 1}/{max_retries}): {e}")
+            if attempt < max_retries - 1:
+                time.sleep(min(wait, MAX_RETRY_AFTER))
+                delay *= 2
+        return None
+
+    @staticmethod
+    def _retry_after(response):
+        try:
+            return int(response.headers.get('Retry-After', 0))
+        except ValueError:
+            return 0
+
+    def send_records(self, records, **fields):
+        """Kayıtları MAX_BATCH_RECORDS'luk batch'ler halinde gönder; hepsi yazıldıysa True"""
+        for start in range(0, len(records), MAX_BATCH_RECORDS):
+            batch = records[start:start + MAX_BATCH_RECORDS]
+            if self.send(dict(fields, records=batch)) is None:
+                return False
+        return True
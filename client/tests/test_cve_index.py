@@ -0,0 +1,128 @@
+"""cve_index: fixture NVD feed'lerinden indeks oluşturma ve sorgular.
+
+Çalıştırmak için (depo kökünden):
+    python -m pytest client/tests
+"""
+import functools
+import gzip
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+FEED_DIR = os.path.join(TESTS_DIR, "fixtures", "cve_feeds")
+JSON_FEED = os.path.join(FEED_DIR, "nvdcve-2.0-2024.json")
+GZ_FEED = os.path.join(FEED_DIR, "nvdcve-2.0-2023.json.gz")
+sys.path.insert(0, os.path.join(os.path.dirname(TESTS_DIR), "monitors"))
+
+import cve_index
+from cve_index import CveIndex, parse_feed
+
+# Eleman ve '"vulnerabilities": [' işareti okuma parçalarının sınırına düşsün diye küçük boyutlar
+READ_SIZES = (1, 7, 64, cve_index.FEED_READ_SIZE)
+
+def _load_feed(path):
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        return [item['cve'] for item in json.load(f)['vulnerabilities']]
+
+def _ids(vulnerabilities):
+    return [vuln['id'] for vuln in vulnerabilities]
+
+class ParseFeedTest(unittest.TestCase):
+
+    def test_matches_json_load_for_all_read_sizes(self):
+        for path in (JSON_FEED, GZ_FEED):
+            expected = _load_feed(path)
+            for read_size in READ_SIZES:
+                with self.subTest(path=os.path.basename(path), read_size=read_size):
+                    self.assertEqual(list(parse_feed(path, read_size=read_size)), expected)
+
+    def test_truncated_feed_raises(self):
+        with open(JSON_FEED, 'r', encoding='utf-8') as f:
+            content = f.read()
+        truncated = content[:content.index('CVE-2024-21096')]
+        for read_size in (7, cve_index.FEED_READ_SIZE):
+            with self.subTest(read_size=read_size):
+                with self.assertRaises(ValueError):
+                    list(cve_index._iter_array(io.StringIO(truncated), 'vulnerabilities', read_size))
+
+    def test_missing_or_empty_array(self):
+        self.assertEqual(list(cve_index._iter_array(io.StringIO('{"format": "NVD_CVE"}'), 'vulnerabilities', 3)), [])
+        self.assertEqual(list(cve_index._iter_array(io.StringIO('{"vulnerabilities" : [ ]}'), 'vulnerabilities', 3)), [])
+
+class CveIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix="cve-index-test-")
+        self.index = CveIndex(db_path=os.path.join(self.workdir, "cve_index.db"),
+                              feed_dir=FEED_DIR, feed_url=None)
+
+    def tearDown(self):
+        self.index.close()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def _import(self, read_size=cve_index.FEED_READ_SIZE):
+        with mock.patch.object(cve_index, 'parse_feed', functools.partial(parse_feed, read_size=read_size)):
+            return self.index.import_feeds()
+
+    def test_import_skips_old_and_unmatched_cves(self):
+        # CVE-2022-0778 MIN_PUBLISHED'dan eski, CVE-2024-90002 hiçbir terimle eşleşmiyor
+        self.assertEqual(self._import(), 6)
+        self.assertEqual(self.index.lookup('tls'), [])
+
+    def test_lookups_with_small_read_sizes(self):
+        for read_size in READ_SIZES:
+            with self.subTest(read_size=read_size):
+                self.assertEqual(self._import(read_size), 6)
+                name, vulnerabilities = self.index.lookup_port(22)
+                self.assertEqual(name, "SSH")
+                self.assertEqual(_ids(vulnerabilities), ["CVE-2023-38408", "CVE-2024-6387"])
+                self.assertEqual(_ids(self.index.lookup_port(80)[1]),
+                                 ["CVE-2024-38476", "CVE-2023-44487", "CVE-2024-90001"])
+
+    def test_lookup_port(self):
+        self._import()
+        name, vulnerabilities = self.index.lookup_port(3306)
+        self.assertEqual(name, "MySQL")
+        self.assertEqual(vulnerabilities, [{
+            'id': "CVE-2024-21096",
+            'severity': 4.9,
+            'description': "Vulnerability in the MySQL Server product of Oracle MySQL "
+                           "(component: Client programs: mysqldump)."
+        }])
+        self.assertEqual(self.index.lookup_port(9999), ("Bilinmeyen", []))
+
+    def test_lookup_product(self):
+        self._import()
+        self.assertEqual(_ids(self.index.lookup_product("openbsd", "openssh")),
+                         ["CVE-2023-38408", "CVE-2024-6387"])
+        self.assertEqual(_ids(self.index.lookup_product("OpenBSD", "OpenSSH", limit=1)), ["CVE-2023-38408"])
+        self.assertEqual(_ids(self.index.lookup_product("apache", "http_server")), ["CVE-2024-38476"])
+        self.assertEqual(self.index.lookup_product("microsoft", "iis"), [])
+
+    def test_refresh_keeps_index_when_feed_is_truncated(self):
+        feed_dir = os.path.join(self.workdir, "feeds")
+        shutil.copytree(FEED_DIR, feed_dir)
+        self.index.feed_dir = feed_dir
+        self.assertTrue(self.index.refresh(force=True))
+        # TTL dolsa da dosyalar değişmediyse yeniden oluşturulmaz
+        self.index.checked_at = None
+        self.assertFalse(self.index.refresh())
+
+        with open(os.path.join(feed_dir, "nvdcve-2.0-2024.json"), 'r+', encoding='utf-8') as f:
+            content = f.read()
+            f.seek(0)
+            f.write(content[:len(content) // 2])
+            f.truncate()
+        with mock.patch('builtins.print'):
+            self.assertFalse(self.index.refresh(force=True))
+        self.assertEqual(_ids(self.index.lookup_port(22)[1]), ["CVE-2023-38408", "CVE-2024-6387"])
+
+if __name__ == "__main__":
+    unittest.main()
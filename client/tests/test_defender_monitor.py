@@ -0,0 +1,140 @@
+"""defender_monitor: kaydedilmiş Defender günlüğü üzerinde yer imi ile artımlı okuma.
+
+Çalıştırmak için (depo kökünden):
+    python -m pytest client/tests
+"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+EVENTS_FIXTURE = os.path.join(TESTS_DIR, "fixtures", "defender_events.jsonl")
+sys.path.insert(0, os.path.join(os.path.dirname(TESTS_DIR), "monitors"))
+
+import defender_monitor
+from defender_monitor import DefenderMonitor
+from event_log_reader import EventLogReader, ReplayEventLogReader
+
+def make_event(record_number, log_time, event_id=1116):
+    return {
+        'record_number': record_number,
+        'log_time': log_time,
+        'source': 'Microsoft-Windows-Windows Defender',
+        'event_id': event_id,
+        'description': ['Threat detected']
+    }
+
+class RecordingUploader:
+    """Gönderilen batch'leri kaydeden BatchUploader yerine geçen nesne"""
+
+    def __init__(self):
+        self.batches = []
+        self.fail_with = None
+        self.last_status_code = None
+
+    def send_records(self, records):
+        if self.fail_with:
+            self.last_status_code = self.fail_with
+            return False
+        self.last_status_code = 202
+        self.batches.append([record['record_number'] for record in records])
+        return True
+
+    def sent(self):
+        return [number for batch in self.batches for number in batch]
+
+class DefenderMonitorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix="defender-monitor-test-")
+        self.reader = ReplayEventLogReader(EVENTS_FIXTURE)
+        self.uploader = RecordingUploader()
+        self.monitor = DefenderMonitor(reader=self.reader, uploader=self.uploader,
+                                       bookmark_file=os.path.join(self.workdir, "bookmark.json"))
+        patches = [
+            mock.patch.object(defender_monitor, 'BATCH_SIZE', 5),
+            mock.patch('builtins.print')
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def collect(self):
+        self.uploader.batches = []
+        return self.monitor.collect_defender_logs()
+
+    def test_reader_interface_is_abstract(self):
+        with self.assertRaises(TypeError):
+            EventLogReader()
+
+    def test_first_read_in_batches(self):
+        self.assertEqual(self.collect(), 12)
+        self.assertEqual(self.uploader.batches, [[1, 2, 3, 4, 5], [6, 7, 8, 9, 10], [11, 12]])
+        self.assertEqual(self.monitor.load_bookmark(), (12, "2024-05-01 10:12:00"))
+
+    def test_rerun_without_new_records(self):
+        self.collect()
+        self.assertEqual(self.collect(), 0)
+        self.assertEqual(self.uploader.batches, [])
+        self.assertEqual(self.monitor.load_bookmark(), (12, "2024-05-01 10:12:00"))
+
+        self.reader.append(make_event(13, "2024-05-01 10:13:00"))
+        self.assertEqual(self.collect(), 1)
+        self.assertEqual(self.uploader.sent(), [13])
+
+    def test_clear_then_regrow_past_bookmark(self):
+        self.collect()
+        # Günlük temizlenip eski yer iminden (12) daha fazla kayıtla yeniden dolmuş
+        self.reader.clear()
+        for number in range(1, 16):
+            self.reader.append(make_event(number, f"2024-05-02 09:{number:02d}:00"))
+        self.assertEqual(self.collect(), 15)
+        self.assertEqual(self.uploader.sent(), list(range(1, 16)))
+        self.assertEqual(self.monitor.load_bookmark(), (15, "2024-05-02 09:15:00"))
+
+    def test_clear_without_regrow(self):
+        self.collect()
+        self.reader.clear()
+        for number in range(1, 4):
+            self.reader.append(make_event(number, f"2024-05-02 09:{number:02d}:00"))
+        self.assertEqual(self.collect(), 3)
+        self.assertEqual(self.uploader.sent(), [1, 2, 3])
+
+    def test_rollover_keeps_bookmark(self):
+        self.collect()
+        # Günlük dolmuş: en eski kayıtlar (yer imi dahil) silinmiş, numaralar devam ediyor
+        for number in range(13, 21):
+            self.reader.append(make_event(number, f"2024-05-01 11:{number:02d}:00"))
+        self.reader.events = [event for event in self.reader.events if event['record_number'] > 14]
+        self.assertGreater(self.reader.oldest_record_number(), 12)
+        self.assertEqual(self.collect(), 6)
+        self.assertEqual(self.uploader.sent(), list(range(15, 21)))
+
+    def test_bookmark_without_log_time(self):
+        # Önceki sürümün yazdığı yer imi dosyası sadece kayıt numarası içerir
+        with open(self.monitor.bookmark_file, 'w', encoding='utf-8') as f:
+            f.write('{"record_number": 10}')
+        self.assertEqual(self.collect(), 2)
+        self.assertEqual(self.uploader.sent(), [11, 12])
+
+    def test_failed_send_keeps_bookmark(self):
+        self.uploader.fail_with = 503
+        self.assertEqual(self.collect(), 0)
+        self.assertEqual(self.monitor.load_bookmark(), (0, None))
+
+        self.uploader.fail_with = None
+        self.assertEqual(self.collect(), 12)
+
+    def test_rejected_batch_is_skipped(self):
+        self.uploader.fail_with = 400
+        self.assertEqual(self.collect(), 0)
+        self.assertEqual(self.monitor.load_bookmark(), (12, "2024-05-01 10:12:00"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -185,3 +185,118 @@ CREATE TABLE IF NOT EXISTS `computer_information`.`soft_update_information` (
   FOREIGN KEY (`system_id`) REFERENCES `computer_information`.`hwd_system_information`(`system_id`)
     ON DELETE CASCADE ON UPDATE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARACTER SET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- -----------------------------------------------------
+-- Table: latest_system_snapshot
+-- Her bilgisayarın en son sistem bilgisi (bilgisayar listesi bu tablodan okunur).
+-- hwd_system_information üzerindeki tetikleyicilerle güncellenir, bkz. server/migrations.py.
+-- data_version, bilgisayarın detay tablolarına (port, defender, olay, yazılım, ağ, cihaz) her yazımda artar.
+-- -----------------------------------------------------
+CREATE TABLE IF NOT EXISTS `computer_information`.`latest_system_snapshot` (
+  `computer_name` VARCHAR(255) NOT NULL,
+  `system_id` INT,
+  `operating_system` VARCHAR(255),
+  `processor` VARCHAR(255),
+  `ram` VARCHAR(255),
+  `disk_space` VARCHAR(255),
+  `manufacturer` VARCHAR(255),
+  `model` VARCHAR(255),
+  `created_at` DATETIME,
+  `data_version` BIGINT UNSIGNED NOT NULL DEFAULT 1,
+  PRIMARY KEY (`computer_name`),
+  KEY `idx_latest_system_snapshot_system_id` (`system_id`)
+) ENGINE=InnoDB DEFAULT CHARACTER SET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- -----------------------------------------------------
+-- Tables: security_totals, security_daily_counts, security_event_id_counts, security_system_counts
+-- Güvenlik sayfasının Defender özetleri. defender_information üzerindeki tetikleyicilerle
+-- güncellenir, bkz. server/security_rollups.py (yeniden hesaplama: --rebuild).
+-- -----------------------------------------------------
+CREATE TABLE IF NOT EXISTS `computer_information`.`security_totals` (
+  `id` TINYINT NOT NULL,
+  `total_events` BIGINT NOT NULL DEFAULT 0,
+  `high_events` BIGINT NOT NULL DEFAULT 0,
+  PRIMARY KEY (`id`)
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS `computer_information`.`security_daily_counts` (
+  `event_date` DATE NOT NULL,
+  `event_count` BIGINT NOT NULL DEFAULT 0,
+  PRIMARY KEY (`event_date`)
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS `computer_information`.`security_event_id_counts` (
+  `event_id` INT NOT NULL,
+  `event_count` BIGINT NOT NULL DEFAULT 0,
+  PRIMARY KEY (`event_id`),
+  KEY `idx_security_event_id_counts_count` (`event_count`)
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS `computer_information`.`security_system_counts` (
+  `system_id` INT NOT NULL,
+  `total_events` BIGINT NOT NULL DEFAULT 0,
+  `high_events` BIGINT NOT NULL DEFAULT 0,
+  `medium_events` BIGINT NOT NULL DEFAULT 0,
+  `low_events` BIGINT NOT NULL DEFAULT 0,
+  PRIMARY KEY (`system_id`)
+) ENGINE=InnoDB;
+
+-- -----------------------------------------------------
+-- defender_information.severity
+-- Olay yazılırken atanan risk seviyesi (bkz. server/defender_severity.py).
+-- Kolon ve idx_defender_information_severity (severity, created_at) indeksi
+-- server/migrations.py (migration 4) ile eklenir; bu betik tekrar çalıştırılabilir
+-- kalsın diye burada ALTER TABLE yoktur.
+-- -----------------------------------------------------
+
+-- -----------------------------------------------------
+-- Geçmiş tabloları için keyset sayfalama indeksleri
+-- /api/history sayfaları (created_at, id) sırasıyla, bilgisayar filtresinde
+-- (system_id, created_at) aralığıyla okunur (bkz. server/history.py).
+-- defender_information, event_information ve port_information için
+-- idx_<tablo>_created_at_id ve idx_<tablo>_system_created indeksleri
+-- server/migrations.py (migration 5) ile eklenir; bu betik tekrar çalıştırılabilir
+-- kalsın diye burada ALTER TABLE yoktur.
+-- -----------------------------------------------------
+
+-- -----------------------------------------------------
+-- Tables: software_inventory, software_changes
+-- Bilgisayar başına güncel yazılım envanteri ve kurulum/güncelleme/kaldırma geçmişi.
+-- İstemciler sadece farkı gönderir (bkz. server/software_inventory.py).
+-- -----------------------------------------------------
+CREATE TABLE IF NOT EXISTS `computer_information`.`software_inventory` (
+  `system_id` INT NOT NULL,
+  `software_key` CHAR(40) NOT NULL,
+  `software_name` VARCHAR(255) NOT NULL,
+  `version` VARCHAR(100),
+  `publisher` VARCHAR(255),
+  `install_date` VARCHAR(45),
+  `first_seen` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  `updated_at` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`system_id`, `software_key`)
+) ENGINE=InnoDB DEFAULT CHARACTER SET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE IF NOT EXISTS `computer_information`.`software_changes` (
+  `id` BIGINT NOT NULL AUTO_INCREMENT,
+  `system_id` INT NOT NULL,
+  `software_name` VARCHAR(255) NOT NULL,
+  `publisher` VARCHAR(255),
+  `change_type` ENUM('installed', 'updated', 'removed') NOT NULL,
+  `old_version` VARCHAR(100),
+  `new_version` VARCHAR(100),
+  `created_at` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`id`),
+  KEY `idx_software_changes_created_at_id` (`created_at`, `id`),
+  KEY `idx_software_changes_system_created` (`system_id`, `created_at`)
+) ENGINE=InnoDB DEFAULT CHARACTER SET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- -----------------------------------------------------
+-- defender_information.record_number
+-- Windows olay günlüğündeki kayıt numarası (EventRecordID). İstemci yer iminden
+-- sonraki kayıtları gönderir; tekrar gönderilen kayıt benzersiz anahtar sayesinde
+-- ikinci kez yazılmaz. log_time, günlük temizlenip numaralar baştan başladığında
+-- yeni kayıtların eskilerle çakışmaması için anahtardadır.
+-- Kolon ve uq_defender_information_record (system_id, record_number, log_time)
+-- anahtarı server/migrations.py (migration 7) ile eklenir; bu betik tekrar
+-- çalıştırılabilir kalsın diye burada ALTER TABLE yoktur.
+-- -----------------------------------------------------
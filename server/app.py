@@ -1,11 +1,24 @@
-from flask import Flask, render_template, request, jsonify
-from database import db
+from flask import Flask, render_template, request, jsonify, Response
+from database import db, ConnectionPool, PoolTimeout
 import mysql.connector
 from config import DB_CONFIG
 import json
 from datetime import datetime, timedelta
 import os
 import sys
+import threading
+import hmac
+import atexit
+from concurrent.futures import ThreadPoolExecutor, wait
+from presence_store import PresenceReader, PRESENCE_MMAP_FILE, presence_files, merge_records
+from presence_events import PresenceBroadcaster
+from migrations import run_migrations
+from fleet_status import apply_presence, build_fleet_status
+from micro_cache import MicroCache
+from data_versions import DataVersionRegistry, make_etag
+import history
+import ingest
+from ingest_queue import IngestQueue, QueueFull
 
 def get_base_path():
     if getattr(sys, 'frozen', False):
@@ -24,18 +37,35 @@ app = Flask(__name__,
 
 CONNECTION_FILE = "active_connections.json"
 
+# Socket sunucusu bu süre boyunca presence dosyasını yazmazsa durumlar bayat sayılır (saniye)
+PRESENCE_STALE_AFTER = 30
+
+# Tek bilgisayar sorguları için sabit kayıtlı presence dosyası okuyucusu
+presence_reader = PresenceReader(PRESENCE_MMAP_FILE)
+
+# Tüm route'ların ödünç aldığı MySQL bağlantı havuzu
+DB_POOL_SIZE = 10
+DB_POOL_MAX_LIFETIME = 1800      # bu süreden eski bağlantılar yenilenir (saniye)
+DB_POOL_HEALTH_CHECK_AFTER = 30  # bu süre boşta kalan bağlantı kullanılmadan önce ping'lenir (saniye)
+DB_POOL_ACQUIRE_TIMEOUT = 10     # havuz doluyken en fazla bu kadar beklenir (saniye)
+
+db_pool = ConnectionPool(
+    DB_CONFIG,
+    size=DB_POOL_SIZE,
+    max_lifetime=DB_POOL_MAX_LIFETIME,
+    health_check_after=DB_POOL_HEALTH_CHECK_AFTER,
+    acquire_timeout=DB_POOL_ACQUIRE_TIMEOUT,
+    autocommit=True
+)
+
+# JSON dosyaları sadece değiştiğinde yeniden ayrıştırılır (dosya yolu -> önbellek)
+_connections_cache = {}
+_connections_cache_lock = threading.Lock()
+
 def get_db_connection():
-    """Veritabanı bağlantısı oluştur"""
+    """Havuzdan veritabanı bağlantısı ödünç al (conn.close() bağlantıyı havuza iade eder)"""
     try:
-        print("Veritabanı bağlantısı deneniyor...")
-        print(f"Bağlantı ayarları: {DB_CONFIG}")
-        
-        conn = mysql.connector.connect(
-            **DB_CONFIG,
-            autocommit=True
-        )
-        print("Veritabanı bağlantısı başarılı!")
-        return conn
+        return db_pool.acquire()
     except mysql.connector.Error as err:
         print(f"Veritabanı bağlantı hatası: {err}")
         print(f"Hata detayı: {type(err).__name__}")
@@ -52,6 +82,7 @@ def get_db_connection():
 def execute_query_with_retry(query, params=None, max_retries=3):
     """Sorguyu yeniden deneme mekanizması ile çalıştır"""
     for attempt in range(max_retries):
+        conn = None
         try:
             print(f"Sorgu çalıştırılıyor (Deneme {attempt+1}/{max_retries})...")
             conn = get_db_connection()
@@ -67,11 +98,13 @@ def execute_query_with_retry(query, params=None, max_retries=3):
                 
             result = cursor.fetchall()
             cursor.close()
-            conn.close()
             print("Sorgu başarıyla çalıştırıldı!")
             return result
             
         except mysql.connector.Error as err:
+            # Hatalı bağlantı havuza geri konmaz, sonraki deneme yeni bağlantı alır
+            if conn:
+                conn.invalidate()
             print(f"Sorgu çalıştırılırken hata oluştu (Deneme {attempt+1}/{max_retries}): {err}")
             print(f"Hata detayı: {type(err).__name__}")
             import traceback
@@ -87,59 +120,215 @@ def execute_query_with_retry(query, params=None, max_retries=3):
             if attempt == max_retries - 1:
                 raise
             continue
+        finally:
+            if conn:
+                conn.close()
+
+def _load_connection_file(path):
+    """Tek bir presence JSON dosyasını oku (dosya değişmediyse önbellekten)"""
+    # Socket sunucusu dosyayı atomik olarak değiştirdiği için (rename) inode/mtime/boyut yeterli
+    st = os.stat(path)
+    key = (st.st_ino, st.st_mtime_ns, st.st_size)
+    with _connections_cache_lock:
+        cached = _connections_cache.get(path)
+        if cached and cached['key'] == key:
+            return cached['connections']
+        
+    with open(path, 'r') as f:
+        connections = json.load(f)
+        
+    # String tarihleri datetime nesnelerine çevir
+    snapshot_time = datetime.fromtimestamp(st.st_mtime)
+    for name, data in connections.items():
+        if 'last_seen' in data:
+            data['last_seen'] = datetime.fromisoformat(data['last_seen'])
+        data['snapshot_time'] = snapshot_time
+            
+    with _connections_cache_lock:
+        _connections_cache[path] = {'key': key, 'connections': connections}
+    
+    print(f"Bağlantılar yüklendi ({path}): {len(connections)} client")
+    return connections
 
 def get_active_connections():
-    """JSON dosyasından aktif bağlantıları oku"""
+    """Ana ve shard presence dosyalarından bağlantıları birleştirerek oku"""
     try:
-        if not os.path.exists(CONNECTION_FILE):
+        paths = presence_files(CONNECTION_FILE)
+        if not paths:
             print(f"Bağlantı dosyası bulunamadı: {CONNECTION_FILE}")
             return {}
-            
-        with open(CONNECTION_FILE, 'r') as f:
-            connections = json.load(f)
-            
-            # String tarihleri datetime nesnelerine çevir
-            for name, data in connections.items():
-                if 'last_seen' in data:
-                    data['last_seen'] = datetime.fromisoformat(data['last_seen'])
-                    
-            print(f"Bağlantılar yüklendi: {len(connections)} client")
-            return connections
+        
+        # Tek dosya (shard'sız mod) için önbellekteki sözlük doğrudan döner
+        if len(paths) == 1:
+            return _load_connection_file(paths[0])
+        
+        connections = {}
+        for path in paths:
+            for name, data in _load_connection_file(path).items():
+                connections[name] = merge_records(connections.get(name), data)
+        return connections
     except Exception as e:
         print(f"Bağlantı dosyası okunurken hata: {e}")
         return {}
 
+def get_connection_info(computer_name):
+    """Tek bir bilgisayarın bağlantı kaydını getir (JSON ayrıştırmadan)"""
+    if presence_files(PRESENCE_MMAP_FILE):
+        return presence_reader.lookup(computer_name)
+    # Eski socket sunucusu sadece JSON yazıyorsa
+    return get_active_connections().get(computer_name)
+
+def presence_status(connection):
+    """Bağlantı kaydının durumunu döndür (socket sunucusunun hazır durumu)"""
+    status = connection.get('status')
+    if status is None:
+        # Eski biçimli dosya: durumu son görülme zamanından hesapla
+        time_diff = (datetime.now() - connection['last_seen']).total_seconds()
+        return 'KAPALI' if time_diff > PRESENCE_STALE_AFTER else 'AÇIK'
+    
+    # Kaydı yazan socket sunucusu (veya shard worker'ı) durmuşsa AÇIK durumu güncel değildir
+    snapshot_time = connection.get('snapshot_time')
+    if status == 'AÇIK' and snapshot_time:
+        if (datetime.now() - snapshot_time).total_seconds() > PRESENCE_STALE_AFTER:
+            return 'KAPALI'
+    return status
+
+# Dashboard'lara durum değişikliklerini SSE ile gönderen tek izleyici
+presence_broadcaster = PresenceBroadcaster(get_active_connections, presence_status)
+
+# Sık çağrılan dashboard API'leri için kısa süreli önbellek; presence değişince temizlenir
+API_CACHE_TTL = 2
+API_CACHE_STALE_TTL = 10
+api_cache = MicroCache(ttl=API_CACHE_TTL, stale_ttl=API_CACHE_STALE_TTL)
+presence_broadcaster.add_listener(lambda changed: api_cache.invalidate())
+
+def cached(key, loader):
+    """Önbellekten oku; presence izleyicisi henüz çalışmıyorsa başlat"""
+    presence_broadcaster.start()
+    return api_cache.get(key, loader)
+
+def _load_data_versions():
+    rows = execute_query_with_retry("SELECT computer_name, data_version FROM latest_system_snapshot")
+    return {row['computer_name']: row['data_version'] for row in rows}
+
+# Detay endpoint'lerinin ETag'leri için bilgisayar başına veri versiyonları (bellekte)
+data_versions = DataVersionRegistry(_load_data_versions)
+
+def detail_etag(kind, computer_name, status_info):
+    """Veri versiyonu ve presence durumundan ETag üret; versiyon bilinmiyorsa None.
+
+    Son görülme zamanı her heartbeat'te değiştiği için ETag'e girmez; yanıtta
+    X-Last-Seen başlığıyla gönderilir (bkz. conditional_response).
+    """
+    version = data_versions.token(computer_name)
+    if version is None:
+        return None
+    return make_etag(kind, computer_name, version, status_info['status'])
+
+def conditional_response(etag, payload=None, last_seen=None):
+    """İstemcinin ETag'i güncelse 304, değilse payload'ı ETag ile döndür"""
+    if payload is None:
+        response = Response(status=304)
+    else:
+        response = jsonify(payload)
+    if last_seen:
+        # Önbelleğe alınan gövdenin dışında; 304 yanıtında da güncel değer gelir
+        response.headers['X-Last-Seen'] = last_seen.isoformat()
+    if etag:
+        response.set_etag(etag)
+        # Tarayıcı her seferinde If-None-Match ile doğrulasın
+        response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
 def check_pc_status(computer_name):
     """PC'nin durumunu kontrol et"""
     try:
-        # Aktif bağlantıları oku
-        connections = get_active_connections()
+        # Bilgisayarın bağlantı kaydını oku
+        connection = get_connection_info(computer_name)
         
-        # Bağlantıları debug için logla
-        print(f"Kontrol edilen bilgisayar: {computer_name}")
-        print(f"Aktif bağlantılar ({len(connections)}): {list(connections.keys())}")
-        
-        if computer_name in connections:
-            last_seen = connections[computer_name]['last_seen']
-            time_diff = (datetime.now() - last_seen).total_seconds()
-            print(f"Bilgisayar {computer_name} son görülme: {last_seen}, fark: {time_diff} saniye")
-            
-            if time_diff > 30:
-                print(f"Bilgisayar {computer_name} KAPALI olarak işaretlendi (30 saniyeden fazla süre)")
-                return {'status': 'KAPALI', 'last_update': last_seen}
-            
-            print(f"Bilgisayar {computer_name} AÇIK olarak işaretlendi")
-            # Burada status'ü tam olarak "AÇIK" şeklinde döndürüyoruz, Açık değil
-            return {'status': 'AÇIK', 'last_update': last_seen}
+        if connection:
+            status = presence_status(connection)
+            return {'status': status, 'last_update': connection['last_seen']}
             
-        print(f"Bilgisayar {computer_name} bağlantılar listesinde bulunamadı")
         return {'status': 'KAPALI', 'last_update': None}
     except Exception as e:
         print(f"PC durumu kontrol edilirken hata: {e}")
         return {'status': 'HATA', 'last_update': None}
 
+# get_pc_details bölümleri: her biri havuzdan ayrı bağlantıyla paralel çalışır
+PC_DETAIL_TIMEOUT = 3  # bölüm sorgularının en fazla bekleneceği süre (saniye)
+PC_DETAIL_WORKERS = 6  # detay sorgularının aynı anda kullanabileceği bağlantı sayısı
+_TIMEOUT_HINT = f"/*+ MAX_EXECUTION_TIME({PC_DETAIL_TIMEOUT * 1000}) */"
+
+# bölüm -> (sorgu, satır limiti)
+PC_DETAIL_SECTIONS = {
+    'ports': (f"""
+        SELECT {_TIMEOUT_HINT} port, process_name, pid, username, ip, created_at
+        FROM port_information
+        WHERE system_id = %s
+        ORDER BY created_at DESC
+        LIMIT %s
+    """, 500),
+    'defender': (f"""
+        SELECT {_TIMEOUT_HINT} log_time, source, event_id, description, created_at
+        FROM defender_information
+        WHERE system_id = %s
+        ORDER BY created_at DESC
+        LIMIT %s
+    """, 200),
+    'events': (f"""
+        SELECT {_TIMEOUT_HINT} app_name, event_type, timestamp, created_at
+        FROM event_information
+        WHERE system_id = %s
+        ORDER BY created_at DESC
+        LIMIT %s
+    """, 10),
+    'networks': (f"""
+        SELECT {_TIMEOUT_HINT} Ag_karti as adapter_name, IP_adress as ip_address, mac_address, created_at
+        FROM hwd_network_information
+        WHERE system_id = %s
+        ORDER BY created_at DESC
+        LIMIT %s
+    """, 100),
+    'devices': (f"""
+        SELECT {_TIMEOUT_HINT} device_name, created_at
+        FROM hwd_pnp_devices
+        WHERE system_id = %s
+        ORDER BY created_at DESC
+        LIMIT %s
+    """, 500),
+    'applications': (f"""
+        SELECT {_TIMEOUT_HINT} software_name as app_name, version, publisher, install_date,
+            updated_at as created_at
+        FROM software_inventory
+        WHERE system_id = %s
+        ORDER BY software_name
+        LIMIT %s
+    """, 1000),
+}
+
+_details_executor = ThreadPoolExecutor(max_workers=PC_DETAIL_WORKERS, thread_name_prefix="pc-details")
+
+def _fetch_detail_section(query, system_id, limit):
+    """Tek bir detay bölümünü kendi havuz bağlantısıyla çalıştır"""
+    conn = get_db_connection()
+    if not conn:
+        raise Exception("Veritabanı bağlantısı kurulamadı")
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(query, (system_id, limit))
+        rows = cursor.fetchall()
+        cursor.close()
+        return rows
+    except mysql.connector.Error:
+        conn.invalidate()
+        raise
+    finally:
+        conn.close()
+
 def get_pc_details(computer_name):
     """PC detaylarını getir"""
+    conn = None
     try:
         conn = get_db_connection()
         if not conn:
@@ -147,7 +336,6 @@ def get_pc_details(computer_name):
             
         cursor = conn.cursor(dictionary=True)
         
-        
         system_query = """
             SELECT *
             FROM hwd_system_information
@@ -157,109 +345,48 @@ def get_pc_details(computer_name):
         """
         cursor.execute(system_query, (computer_name,))
         system = cursor.fetchone()
+        cursor.close()
+        
+        # Bölüm sorguları kendi bağlantılarını alır, bu bağlantı beklerken tutulmasın
+        conn.close()
+        conn = None
         
         if not system:
             print(f"Sistem bilgisi bulunamadı: {computer_name}")
-            cursor.close()
-            conn.close()
             return None
             
         system_id = system['system_id']
         print(f"Sistem ID bulundu: {system_id}")
         
-      
-        try:
-            port_query = """
-                SELECT port, process_name, pid, username, ip, created_at
-                FROM port_information
-                WHERE system_id = %s
-                ORDER BY created_at DESC
-            """
-            cursor.execute(port_query, (system_id,))
-            ports = cursor.fetchall()
-            print(f"Port bilgileri alındı: {len(ports)} kayıt")
-        except Exception as e:
-            print(f"Port bilgileri alınırken hata: {e}")
-            ports = []
-        
-        
-        try:
-            defender_query = """
-                SELECT log_time, source, event_id, description, created_at
-                FROM defender_information
-                WHERE system_id = %s
-                ORDER BY created_at DESC
-            """
-            cursor.execute(defender_query, (system_id,))
-            defender = cursor.fetchall()
-            print(f"Defender bilgileri alındı: {len(defender)} kayıt")
-        except Exception as e:
-            print(f"Defender bilgileri alınırken hata: {e}")
-            defender = []
-        
-        
-        try:
-            event_query = """
-                SELECT app_name, event_type, timestamp, created_at
-                FROM event_information
-                WHERE system_id = %s
-                ORDER BY created_at DESC
-                LIMIT 10
-            """
-            cursor.execute(event_query, (system_id,))
-            events = cursor.fetchall()
-            print(f"Event bilgileri alındı: {len(events)} kayıt")
-        except Exception as e:
-            print(f"Event bilgileri alınırken hata: {e}")
-            events = []
-        
-      
-        try:
-            network_query = """
-                SELECT Ag_karti as adapter_name, IP_adress as ip_address, mac_address, created_at
-                FROM hwd_network_information
-                WHERE system_id = %s
-                ORDER BY created_at DESC
-            """
-            cursor.execute(network_query, (system_id,))
-            networks = cursor.fetchall()
-            print(f"Ağ bilgileri alındı: {len(networks)} kayıt")
-        except Exception as e:
-            print(f"Ağ bilgileri alınırken hata: {e}")
-            networks = []
-
-        
-        try:
-            devices_query = """
-                SELECT device_name, created_at
-                FROM hwd_pnp_devices
-                WHERE system_id = %s
-                ORDER BY created_at DESC
-            """
-            cursor.execute(devices_query, (system_id,))
-            devices = cursor.fetchall()
-            print(f"Bağlı cihazlar alındı: {len(devices)} kayıt")
-        except Exception as e:
-            print(f"Bağlı cihazlar alınırken hata: {e}")
-            devices = []
-
-        
-        try:
-            apps_query = """
-                SELECT software_name as app_name, version, publisher, install_date, created_at
-                FROM software_information
-                WHERE system_id = %s
-                ORDER BY created_at DESC
-            """
-            cursor.execute(apps_query, (system_id,))
-            applications = cursor.fetchall()
-            print(f"Yüklü uygulamalar alındı: {len(applications)} kayıt")
-        except Exception as e:
-            print(f"Yüklü uygulamalar alınırken hata: {e}")
-            applications = []
-        
-        cursor.close()
-        conn.close()
+        # Bağımsız bölümleri paralel çalıştır; süresinde bitmeyen bölüm boş döner
+        futures = {
+            _details_executor.submit(_fetch_detail_section, query, system_id, limit): section
+            for section, (query, limit) in PC_DETAIL_SECTIONS.items()
+        }
+        wait(futures, timeout=PC_DETAIL_TIMEOUT)
+        
+        sections = {}
+        timed_out = []
+        for future, section in futures.items():
+            if not future.done():
+                future.cancel()
+                timed_out.append(section)
+                print(f"{section} bilgileri {PC_DETAIL_TIMEOUT} saniyede alınamadı")
+                sections[section] = []
+                continue
+            try:
+                sections[section] = future.result()
+                print(f"{section} bilgileri alındı: {len(sections[section])} kayıt")
+            except Exception as e:
+                print(f"{section} bilgileri alınırken hata: {e}")
+                sections[section] = []
+        
+        ports = sections['ports']
+        defender = sections['defender']
+        events = sections['events']
+        networks = sections['networks']
+        devices = sections['devices']
+        applications = sections['applications']
         
         return {
             'system': {
@@ -309,15 +436,21 @@ def get_pc_details(computer_name):
                 'publisher': a['publisher'],
                 'install_date': a['install_date'],
                 'last_update': a['created_at'].isoformat() if a['created_at'] else None
-            } for a in applications]
+            } for a in applications],
+            'timed_out_sections': timed_out
         }
         
     except Exception as e:
+        if conn and isinstance(e, mysql.connector.Error):
+            conn.invalidate()
         print(f"Detay getirme hatası: {str(e)}")
         print(f"Hata detayı: {type(e).__name__}")
         import traceback
         print(f"Hata izi: {traceback.format_exc()}")
         return None
+    finally:
+        if conn:
+            conn.close()
 
 @app.route('/')
 def index():
@@ -336,12 +469,7 @@ def index():
                 si.disk_space,
                 si.manufacturer,
                 si.model
-            FROM hwd_system_information si
-            INNER JOIN (
-                SELECT computer_name, MAX(created_at) as max_date
-                FROM hwd_system_information
-                GROUP BY computer_name
-            ) latest ON si.computer_name = latest.computer_name AND si.created_at = latest.max_date
+            FROM latest_system_snapshot si
         """
         computers = execute_query_with_retry(query)
         return render_template('index.html', computers=computers)
@@ -354,16 +482,22 @@ def pc_status(computer_name):
     
     status_info = check_pc_status(computer_name)
     
+    # Veri ve durum değişmediyse MySQL'e gitmeden 304 dön
+    etag = detail_etag('pc-status', computer_name, status_info)
+    if etag and request.if_none_match.contains(etag):
+        return conditional_response(etag, last_seen=status_info['last_update'])
     
     details = None
     if status_info['status'] == 'AÇIK':
         details = get_pc_details(computer_name)
+        # Zaman aşımına uğrayan bölümleri olan eksik yanıt önbelleğe alınmasın
+        if not details or details['timed_out_sections']:
+            etag = None
     
-    return jsonify({
+    return conditional_response(etag, {
         'status': status_info['status'],
-        'last_update': status_info['last_update'].isoformat() if status_info['last_update'] else None,
         'details': details
-    })
+    }, last_seen=status_info['last_update'])
 
 @app.route('/get_system_details')
 def get_system_details():
@@ -378,18 +512,25 @@ def get_system_details():
         status_info = check_pc_status(computer_name)
         print(f"PC durumu: {status_info}")
         
+        # Veri ve durum değişmediyse MySQL'e gitmeden 304 dön
+        etag = detail_etag('system-details', computer_name, status_info)
+        if etag and request.if_none_match.contains(etag):
+            return conditional_response(etag, last_seen=status_info['last_update'])
         
         details = get_pc_details(computer_name)
         
         if not details:
             return jsonify({"error": "Bilgisayar detayları alınamadı"})
+        
+        # Zaman aşımına uğrayan bölümleri olan eksik yanıt önbelleğe alınmasın
+        if details['timed_out_sections']:
+            etag = None
             
-        return jsonify({
+        return conditional_response(etag, {
             'success': True,
             'status': status_info['status'],
-            'last_update': status_info['last_update'].isoformat() if status_info['last_update'] else None,
             'details': details
-        })
+        }, last_seen=status_info['last_update'])
         
     except Exception as err:
         print(f"Sistem detayları hatası: {str(err)}")
@@ -400,36 +541,27 @@ def get_system_details():
             "error": f"Bilgiler alınırken bir hata oluştu: {str(err)}"
         })
 
+def _load_computers():
+    query = """
+        SELECT 
+            si.computer_name,
+            si.operating_system,
+            si.processor,
+            si.ram,
+            si.disk_space,
+            si.manufacturer,
+            si.model
+        FROM latest_system_snapshot si
+    """
+    computers = execute_query_with_retry(query)
+    
+    # Presence dosyası bir kez okunur, bilgisayarlar sözlükten eşlenir
+    return apply_presence(computers, get_active_connections(), presence_status)
+
 @app.route('/get_computers')
 def get_computers():
     try:
-        query = """
-            SELECT 
-                si.computer_name,
-                si.operating_system,
-                si.processor,
-                si.ram,
-                si.disk_space,
-                si.manufacturer,
-                si.model
-            FROM hwd_system_information si
-            INNER JOIN (
-                SELECT computer_name, MAX(created_at) as max_date
-                FROM hwd_system_information
-                GROUP BY computer_name
-            ) latest ON si.computer_name = latest.computer_name 
-            AND si.created_at = latest.max_date
-        """
-        computers = execute_query_with_retry(query)
-        
-       
-        for computer in computers:
-            status_info = check_pc_status(computer['computer_name'])
-            computer['status'] = status_info['status']
-            computer['last_update'] = status_info['last_update'].isoformat() if status_info['last_update'] else None
-            
-       
-        return jsonify(computers)
+        return jsonify(cached('get_computers', _load_computers))
     except Exception as err:
         print(f"PC listesi hatası: {str(err)}")
         return jsonify([])
@@ -452,95 +584,31 @@ def status_page():
                 si.disk_space,
                 si.manufacturer,
                 si.model
-            FROM hwd_system_information si
-            INNER JOIN (
-                SELECT computer_name, MAX(created_at) as max_date
-                FROM hwd_system_information
-                GROUP BY computer_name
-            ) latest ON si.computer_name = latest.computer_name AND si.created_at = latest.max_date
+            FROM latest_system_snapshot si
         """
         computers = execute_query_with_retry(system_query)
         
-        # Soket bağlantı durumlarını kontrol et
-        for computer in computers:
-            status_info = check_pc_status(computer['computer_name'])
-            computer['status'] = status_info['status']
-            computer['last_update'] = status_info['last_update'].isoformat() if status_info['last_update'] else None
-        
-        # İstatistikleri hesapla
-        total_computers = len(computers)
-        online_computers = sum(1 for computer in computers if computer['status'] == 'AÇIK')
-        offline_computers = total_computers - online_computers
-        
-        # İşletim sistemi dağılımlarını hesapla
-        os_distribution = {}
-        for computer in computers:
-            os = computer['operating_system'] or 'Bilinmiyor'
-            if os in os_distribution:
-                os_distribution[os] += 1
-            else:
-                os_distribution[os] = 1
-        
-        # Son 24 saatteki olaylar
-        event_query = """
-            SELECT 
-                ei.app_name, 
-                ei.event_type, 
-                ei.timestamp, 
-                si.computer_name,
-                ei.created_at
-            FROM event_information ei
-            JOIN hwd_system_information si ON ei.system_id = si.system_id
-            WHERE ei.created_at >= DATE_SUB(NOW(), INTERVAL 24 HOUR)
-            ORDER BY ei.created_at DESC
-            LIMIT 50
+        # Soket bağlantı durumlarını, istatistikleri ve OS dağılımını tek geçişte hesapla
+        fleet = build_fleet_status(computers, get_active_connections(), presence_status,
+                                   include_unknown=False)
+        total_computers = fleet['total_computers']
+        online_computers = fleet['online_computers']
+        offline_computers = fleet['offline_computers']
+        os_distribution = fleet['os_distribution']
+        
+        # Olay, Defender ve port listeleri sekmeler açıldığında /api/history üzerinden sayfa sayfa yüklenir;
+        # burada sadece son 24 saatin olay sayısı (created_at indeksinden) okunur
+        recent_count_query = """
+            SELECT
+                (SELECT COUNT(*) FROM event_information WHERE created_at >= DATE_SUB(NOW(), INTERVAL 24 HOUR))
+                + (SELECT COUNT(*) FROM defender_information WHERE created_at >= DATE_SUB(NOW(), INTERVAL 24 HOUR))
+                as total
         """
         try:
-            recent_events = execute_query_with_retry(event_query)
+            recent_event_count = execute_query_with_retry(recent_count_query)[0]['total']
         except Exception as e:
-            print(f"Son olaylar alınırken hata: {e}")
-            recent_events = []
-        
-        # Windows Defender olayları
-        defender_query = """
-            SELECT 
-                di.log_time, 
-                di.source, 
-                di.event_id, 
-                di.description, 
-                si.computer_name,
-                di.created_at
-            FROM defender_information di
-            JOIN hwd_system_information si ON di.system_id = si.system_id
-            ORDER BY di.created_at DESC
-        """
-        try:
-            defender_events = execute_query_with_retry(defender_query)
-        except Exception as e:
-            print(f"Defender olayları alınırken hata: {e}")
-            defender_events = []
-            
-        # Açık portlar
-        ports_query = """
-            SELECT 
-                pi.port, 
-                pi.process_name, 
-                pi.pid, 
-                pi.username, 
-                pi.ip, 
-                si.computer_name,
-                pi.created_at
-            FROM port_information pi
-            JOIN hwd_system_information si ON pi.system_id = si.system_id
-            WHERE pi.created_at >= DATE_SUB(NOW(), INTERVAL 12 HOUR)
-            ORDER BY pi.created_at DESC
-            LIMIT 50
-        """
-        try:
-            open_ports = execute_query_with_retry(ports_query)
-        except Exception as e:
-            print(f"Açık portlar alınırken hata: {e}")
-            open_ports = []
+            print(f"Son olay sayısı alınırken hata: {e}")
+            recent_event_count = 0
         
         # Verileri şablona ilet
         return render_template('status.html', 
@@ -549,9 +617,7 @@ def status_page():
                               online_computers=online_computers,
                               offline_computers=offline_computers,
                               os_distribution=os_distribution,
-                              recent_events=recent_events,
-                              defender_events=defender_events,
-                              open_ports=open_ports)
+                              recent_event_count=recent_event_count)
     except Exception as err:
         print(f"Sistem durumu sayfası hatası: {str(err)}")
         import traceback
@@ -562,82 +628,36 @@ def status_page():
                               online_computers=0,
                               offline_computers=0,
                               os_distribution={},
-                              recent_events=[],
-                              defender_events=[],
-                              open_ports=[])
+                              recent_event_count=0)
+
+def _load_all_pc_status():
+    # En son sistem bilgilerini al
+    system_query = """
+        SELECT 
+            si.computer_name,
+            si.created_at as last_update,
+            CASE 
+                WHEN TIMESTAMPDIFF(SECOND, si.created_at, NOW()) <= 60 THEN 'Açık'
+                ELSE 'Kapalı'
+            END as status,
+            si.operating_system,
+            si.processor,
+            si.ram,
+            si.disk_space,
+            si.manufacturer,
+            si.model
+        FROM latest_system_snapshot si
+    """
+    computers = execute_query_with_retry(system_query)
+    
+    # Presence bir kez okunur; satırlar, bilinmeyen bağlantılar ve istatistikler tek geçişte
+    return build_fleet_status(computers, get_active_connections(), presence_status)
 
 @app.route('/api/get_all_pc_status')
 def get_all_pc_status():
     try:
-        # En son sistem bilgilerini al
-        system_query = """
-            SELECT 
-                si.computer_name,
-                si.created_at as last_update,
-                CASE 
-                    WHEN TIMESTAMPDIFF(SECOND, si.created_at, NOW()) <= 60 THEN 'Açık'
-                    ELSE 'Kapalı'
-                END as status,
-                si.operating_system,
-                si.processor,
-                si.ram,
-                si.disk_space,
-                si.manufacturer,
-                si.model
-            FROM hwd_system_information si
-            INNER JOIN (
-                SELECT computer_name, MAX(created_at) as max_date
-                FROM hwd_system_information
-                GROUP BY computer_name
-            ) latest ON si.computer_name = latest.computer_name AND si.created_at = latest.max_date
-        """
-        computers = execute_query_with_retry(system_query)
-        
-        # Aktif bağlantıları oku
-        connections = get_active_connections()
-        
-        # Soket bağlantı durumlarını kontrol et
-        for computer in computers:
-            status_info = check_pc_status(computer['computer_name'])
-            computer['status'] = status_info['status']
-            computer['last_update'] = status_info['last_update'].isoformat() if status_info['last_update'] else None
-        
-        # Aktif bağlantıda olup veritabanında olmayan bilgisayarları ekle
-        for computer_name in connections:
-            if not any(c['computer_name'] == computer_name for c in computers):
-                computers.append({
-                    'computer_name': computer_name,
-                    'status': 'AÇIK',
-                    'last_update': connections[computer_name]['last_seen'].isoformat(),
-                    'operating_system': 'Bilinmiyor',
-                    'processor': 'Bilinmiyor',
-                    'ram': 'Bilinmiyor',
-                    'disk_space': 'Bilinmiyor',
-                    'manufacturer': 'Bilinmiyor',
-                    'model': 'Bilinmiyor'
-                })
-        
-        # İstatistikleri hesapla
-        total_computers = len(computers)
-        online_computers = sum(1 for computer in computers if computer['status'] == 'AÇIK')
-        offline_computers = total_computers - online_computers
-        
-        # İşletim sistemi dağılımlarını hesapla
-        os_distribution = {}
-        for computer in computers:
-            os = computer['operating_system'] or 'Bilinmiyor'
-            if os in os_distribution:
-                os_distribution[os] += 1
-            else:
-                os_distribution[os] = 1
-                
-        return jsonify({
-            'computers': computers,
-            'total_computers': total_computers,
-            'online_computers': online_computers,
-            'offline_computers': offline_computers,
-            'os_distribution': os_distribution
-        })
+        # Eşzamanlı aynı istekler tek sorguyu paylaşır
+        return jsonify(cached('all_pc_status', _load_all_pc_status))
         
     except Exception as err:
         print(f"API hatası: {str(err)}")
@@ -652,73 +672,238 @@ def get_all_pc_status():
             'os_distribution': {}
         }), 500
 
-# Sadece aktif bağlantıları görüntüleyen basit bir API
-@app.route('/api/active_connections')
-def active_connections():
+def _load_active_connections():
     connections = get_active_connections()
     
     active = []
     for name, info in connections.items():
+        # Socket sunucusu KAPALI kayıtları da tutar, burada sadece açık olanlar listelenir
+        if presence_status(info) != 'AÇIK':
+            continue
         active.append({
             'name': name,
             'last_seen': info['last_seen'].isoformat(),
             'address': str(info['address'])
         })
     
-    return jsonify({
+    return {
         'count': len(active),
         'connections': active
+    }
+
+# Sadece aktif bağlantıları görüntüleyen basit bir API
+@app.route('/api/active_connections')
+def active_connections():
+    return jsonify(cached('active_connections', _load_active_connections))
+
+# Dashboard API önbelleği ve veri versiyonu sayaçları
+@app.route('/api/cache_stats')
+def cache_stats():
+    stats = api_cache.stats()
+    stats['data_versions'] = data_versions.stats()
+    return jsonify(stats)
+
+# Dashboard'lar için durum değişikliği akışı (Server-Sent Events)
+@app.route('/api/presence/stream')
+def presence_stream():
+    subscriber = presence_broadcaster.subscribe()
+    response = Response(
+        presence_broadcaster.stream(subscriber),
+        mimetype='text/event-stream'
+    )
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/api/presence/stats')
+def presence_stream_stats():
+    return jsonify({
+        'subscribers': presence_broadcaster.subscriber_count,
+        'published': presence_broadcaster.published,
+        'dropped': presence_broadcaster.dropped
     })
 
+# Bağlantı havuzu doluluğu ve bekleme metrikleri
+@app.route('/api/db_pool_stats')
+def db_pool_stats():
+    return jsonify(db_pool.stats())
+
+@app.route('/api/history/<kind>')
+def history_page(kind):
+    """Defender, olay veya port geçmişinin bir sayfası (keyset sayfalama, bkz. history.py)"""
+    if kind not in history.HISTORY_SOURCES:
+        return jsonify({"error": f"Bilinmeyen geçmiş türü: {kind}"}), 404
+    
+    try:
+        since = history.parse_datetime(request.args.get('since'))
+        hours = request.args.get('hours')
+        if hours:
+            # Son N saat; since verilmişse daha yeni olan sınır geçerlidir
+            window_start = datetime.now() - timedelta(hours=float(hours))
+            since = max(since, window_start) if since else window_start
+        page = history.fetch_page(
+            kind,
+            execute_query_with_retry,
+            computer_name=request.args.get('computer_name'),
+            since=since,
+            until=history.parse_datetime(request.args.get('until')),
+            cursor=request.args.get('cursor'),
+            limit=history.parse_limit(request.args.get('limit')),
+            severity=request.args.get('severity')
+        )
+    except ValueError as err:
+        return jsonify({"error": str(err)}), 400
+    except Exception as err:
+        print(f"Geçmiş sorgusu hatası ({kind}): {str(err)}")
+        return jsonify({"error": "Kayıtlar alınamadı"}), 500
+    
+    return jsonify(page)
+
+def _flush_ingest_rows(table, items):
+    """Kuyruktan gelen, farklı bilgisayarlara ait satırları tek işlemde yaz"""
+    conn = db_pool.acquire()
+    try:
+        result = ingest.write_rows(conn, table, ingest.TABLE_COLUMNS[table], items)
+    except mysql.connector.Error:
+        conn.invalidate()
+        raise
+    finally:
+        conn.close()
+    # Detay ETag'leri yazılan bilgisayarlar için değişsin (tablo yeniden okunmadan)
+    if result[0]:
+        data_versions.bump(name for name, _row in items)
+    return result
+
+# Tekrar denenince geçebilecek MySQL hataları: bağlantı kurulamadı/koptu, çok fazla bağlantı,
+# kilit bekleme zaman aşımı, deadlock. Diğerleri (ör. 1406 veri çok uzun) satırdaki veri hatasıdır.
+TRANSIENT_DB_ERRORS = (1040, 1205, 1213, 2002, 2003, 2006, 2013, 2055)
+
+def _is_transient_ingest_error(err):
+    """Kuyruk yazma hatası tekrar denenmeli mi (satırlar atılmamalı mı)"""
+    if isinstance(err, PoolTimeout):
+        return True
+    if isinstance(err, (mysql.connector.InterfaceError, mysql.connector.OperationalError)):
+        # Bağlantı düzeyindeki hatalar (errno'su olmayanlar dahil)
+        return True
+    if isinstance(err, mysql.connector.Error):
+        return err.errno in TRANSIENT_DB_ERRORS
+    return False
+
+# Ekleme türündeki ingest batch'leri tablo başına birleştirilip arka planda yazılır (bkz. ingest_queue.py)
+ingest_queue = IngestQueue(_flush_ingest_rows, is_transient=_is_transient_ingest_error)
+atexit.register(ingest_queue.stop)
+
+if not ingest.INGEST_TOKEN:
+    print("!" * 72)
+    print("UYARI: MONITOR_INGEST_TOKEN ayarlanmamış. /api/ingest istekleri 503 ile reddedilecek;")
+    print("sunucuda ve istemcilerde aynı MONITOR_INGEST_TOKEN değerini ayarlayın.")
+    print("!" * 72)
+
+@app.route('/api/ingest/<monitor_type>', methods=['POST'])
+def ingest_batch(monitor_type):
+    """İstemci monitörlerinden gelen gzip'li JSON batch'ini kuyruğa al veya yaz (bkz. ingest.py)"""
+    if monitor_type not in ingest.MONITOR_TYPES:
+        return jsonify({"error": f"Bilinmeyen monitör türü: {monitor_type}"}), 404
+    if not ingest.INGEST_TOKEN:
+        # Anahtarsız ingest ağdaki herkese bilgisayar kaydettirip veri yazdırırdı
+        return jsonify({"error": "Ingest devre dışı: sunucuda MONITOR_INGEST_TOKEN ayarlanmamış"}), 503
+    if not hmac.compare_digest(request.headers.get('X-Ingest-Token', ''), ingest.INGEST_TOKEN):
+        return jsonify({"error": "Yetkisiz"}), 401
+    
+    try:
+        payload = ingest.decode_payload(request.get_data(), request.headers.get('Content-Encoding'))
+    except ingest.IngestError as err:
+        return jsonify({"error": str(err)}), 400
+    
+    if monitor_type in ingest.APPEND_TABLES:
+        return _enqueue_batch(monitor_type, payload)
+    
+    # Hardware (bilgisayarı kaydeder, system_id döndürür) ve yazılım envanteri farkı doğrudan yazılır
+    conn = None
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({"error": "Veritabanı bağlantısı kurulamadı"}), 503
+        result = ingest.write_batch(conn, monitor_type, payload)
+    except ingest.UnknownComputerError as err:
+        return jsonify({"error": str(err)}), 409
+    except ingest.IngestError as err:
+        return jsonify({"error": str(err)}), 400
+    except mysql.connector.Error as err:
+        if conn:
+            conn.invalidate()
+        print(f"Ingest yazılırken veritabanı hatası ({monitor_type}): {err}")
+        return jsonify({"error": "Veritabanı hatası"}), 503
+    finally:
+        if conn:
+            conn.close()
+    
+    # Değişmeyen hardware gönderimi sadece son görülme zamanını ilerletir, data_version artmaz
+    if result.get('changed', True):
+        data_versions.bump([payload['computer_name']])
+    if monitor_type == 'hardware':
+        api_cache.invalidate()
+    
+    return jsonify(dict(result, success=True))
+
+def _enqueue_batch(monitor_type, payload):
+    computer_name = payload['computer_name']
+    try:
+        rows = ingest.prepare_rows(monitor_type, payload)
+    except ingest.IngestError as err:
+        return jsonify({"error": str(err)}), 400
+    
+    # Kayıtlı olmayan bilgisayarın satırları yazıcıda atlanacağı için baştan reddedilir
+    if data_versions.get(computer_name) is None:
+        if not data_versions.available():
+            # Versiyonlar okunamadı (veritabanı erişilemiyor): bilgisayarın kaydı bilinmiyor
+            response = jsonify({"error": "Bilgisayar kayıtları okunamadı"})
+            response.status_code = 503
+            response.headers['Retry-After'] = str(max(1, int(data_versions.refresh_interval)))
+            return response
+        return jsonify({"error": f"Bilgisayar kayıtlı değil: {computer_name}"}), 409
+    
+    table = ingest.APPEND_TABLES[monitor_type][0]
+    ingest_queue.start()
+    try:
+        ingest_queue.put(table, [(computer_name, row) for row in rows])
+    except QueueFull as err:
+        response = jsonify({"error": str(err)})
+        response.status_code = 429
+        response.headers['Retry-After'] = str(err.retry_after)
+        return response
+    
+    return jsonify({'success': True, 'queued': len(rows)}), 202
+
+@app.route('/api/ingest_stats')
+def ingest_stats():
+    return jsonify(ingest_queue.stats())
+
 @app.route('/security')
 def security_page():
     try:
-        # Windows Defender olayları
-        defender_query = """
-            SELECT 
-                di.log_time, 
-                di.source, 
-                di.event_id, 
-                di.description, 
-                si.computer_name,
-                di.created_at
-            FROM defender_information di
-            JOIN hwd_system_information si ON di.system_id = si.system_id
-            ORDER BY di.created_at DESC
-        """
-        try:
-            defender_events = execute_query_with_retry(defender_query)
-        except Exception as e:
-            print(f"Defender olayları alınırken hata: {e}")
-            defender_events = []
+        # Defender olay listesi sayfada /api/history/defender üzerinden sayfa sayfa yüklenir
         
-        # İstatistikleri hesapla
-        total_computers_query = "SELECT COUNT(DISTINCT computer_name) as total FROM hwd_system_information"
-        total_events_query = "SELECT COUNT(*) as total FROM defender_information"
-        total_warnings_query = """
-            SELECT COUNT(*) as total FROM defender_information 
-            WHERE event_id IN (1006, 1007, 1008, 1009, 1116, 1117, 1073758208, -1073725430) 
-            OR description LIKE '%tehdit%' OR description LIKE '%virüs%' OR description LIKE '%malware%'
-        """
+        # İstatistikler tetikleyicilerle güncellenen özet tablolarından okunur (bkz. security_rollups.py)
+        total_computers_query = "SELECT COUNT(*) as total FROM latest_system_snapshot"
+        totals_query = "SELECT total_events, high_events FROM security_totals WHERE id = 1"
         
         try:
             total_computers = execute_query_with_retry(total_computers_query)[0]['total']
-            total_events = execute_query_with_retry(total_events_query)[0]['total']
-            total_warnings = execute_query_with_retry(total_warnings_query)[0]['total']
+            totals = execute_query_with_retry(totals_query)
+            total_events = totals[0]['total_events'] if totals else 0
+            total_warnings = totals[0]['high_events'] if totals else 0
         except Exception as e:
             print(f"İstatistikler alınırken hata: {e}")
             total_computers = 0
             total_events = 0
             total_warnings = 0
         
-        # Günlük olay sayısını hesapla (son 30 gün)
+        # Günlük olay sayısı (son 30 gün)
         daily_events_query = """
-            SELECT 
-                DATE(created_at) as event_date,
-                COUNT(*) as event_count
-            FROM defender_information
-            WHERE created_at >= DATE_SUB(NOW(), INTERVAL 30 DAY)
-            GROUP BY DATE(created_at)
+            SELECT event_date, event_count
+            FROM security_daily_counts
+            WHERE event_date >= DATE_SUB(CURDATE(), INTERVAL 30 DAY)
             ORDER BY event_date
         """
         try:
@@ -729,12 +914,10 @@ def security_page():
         
         # Olay türleri dağılımı
         event_types_query = """
-            SELECT 
-                event_id,
-                COUNT(*) as count
-            FROM defender_information
-            GROUP BY event_id
-            ORDER BY count DESC
+            SELECT event_id, event_count as count
+            FROM security_event_id_counts
+            WHERE event_count > 0
+            ORDER BY event_count DESC
             LIMIT 10
         """
         try:
@@ -747,20 +930,13 @@ def security_page():
         computer_risks_query = """
             SELECT 
                 si.computer_name,
-                COUNT(*) as total_events,
-                SUM(CASE 
-                    WHEN di.event_id IN (1006, 1007, 1008, 1009, 1116, 1117, 1073758208, -1073725430) 
-                         OR di.description LIKE '%tehdit%' OR di.description LIKE '%virüs%' OR di.description LIKE '%malware%' 
-                    THEN 1 ELSE 0 END) as high_events,
-                SUM(CASE 
-                    WHEN di.event_id IN (1005, 1010, 1118, 1119, -1073725430, 1073742724, 1013, 1015, 1121, 1122, 1123, 8004) 
-                    THEN 1 ELSE 0 END) as medium_events,
-                SUM(CASE 
-                    WHEN di.event_id NOT IN (1005, 1006, 1007, 1008, 1009, 1010, 1116, 1117, 1118, 1119, 1073758208, -1073725430, 1073742724, 1013, 1015, 1121, 1122, 1123, 8004)
-                         AND di.description NOT LIKE '%tehdit%' AND di.description NOT LIKE '%virüs%' AND di.description NOT LIKE '%malware%'
-                    THEN 1 ELSE 0 END) as low_events
-            FROM defender_information di
-            JOIN hwd_system_information si ON di.system_id = si.system_id
+                SUM(sc.total_events) as total_events,
+                SUM(sc.high_events) as high_events,
+                SUM(sc.medium_events) as medium_events,
+                SUM(sc.low_events) as low_events
+            FROM security_system_counts sc
+            JOIN latest_system_snapshot si ON sc.system_id = si.system_id
+            WHERE sc.total_events > 0
             GROUP BY si.computer_name
             ORDER BY high_events DESC, medium_events DESC
         """
@@ -797,7 +973,6 @@ def security_page():
         critical_events = sum(c['high_events'] for c in computer_risks) if computer_risks else 0
             
         return render_template('security.html',
-                              defender_events=defender_events,
                               total_computers=total_computers,
                               total_events=total_events,
                               total_warnings=total_warnings,
@@ -811,7 +986,6 @@ def security_page():
         import traceback
         print(f"Hata izi: {traceback.format_exc()}")
         return render_template('security.html',
-                              defender_events=[],
                               total_computers=0,
                               total_events=0,
                               total_warnings=0,
@@ -821,5 +995,12 @@ def security_page():
                               computer_risks=[])
 
 if __name__ == '__main__':
+    # Şema değişikliklerini uygula (latest_system_snapshot vb.)
+    try:
+        run_migrations()
+    except Exception as e:
+        print(f"Migration'lar çalıştırılırken hata: {e}")
+    
     # Flask uygulamasını başlat
-    app.run(debug=True, host='0.0.0.0', port=5000)  # Debug modunu açık bırakabiliriz
\ No newline at end of file
+    # threaded=True: her SSE aboneliği kendi thread'inde açık kalır
+    app.run(debug=True, host='0.0.0.0', port=5000, threaded=True)  # Debug modunu açık bırakabiliriz
\ No newline at end of file
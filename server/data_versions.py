@@ -0,0 +1,110 @@
+import hashlib
+import threading
+import time
+
+# Versiyon tablosunun veritabanından yeniden okunma aralığı (saniye). Aynı süreçteki
+# yazımlar bump() ile bellekte işlenir; yeniden okuma başka yollardan gelen
+# değişiklikler için güvenlik ağıdır.
+REFRESH_INTERVAL = 30.0
+
+def make_etag(*parts):
+    """Parçalardan güçlü (strong) bir ETag değeri üret (tırnaksız)"""
+    digest = hashlib.sha1("\x1f".join(str(part) for part in parts).encode("utf-8"))
+    return digest.hexdigest()[:24]
+
+class DataVersionRegistry:
+    """Bilgisayar başına data_version değerlerinin bellekteki kopyası.
+
+    Tüm versiyonlar tek sorguyla en fazla refresh_interval saniyede bir yenilenir,
+    böylece bir istek için versiyon kontrolü sadece sözlük aramasıdır. Aynı süreçteki
+    ingest, yazdığı bilgisayarlar için bump() çağırır; yerel sayaç veritabanı
+    versiyonuyla birlikte token() içinde döner ve yeniden okumada sıfırlanmaz, böylece
+    aynı token farklı veri için tekrar üretilmez.
+    """
+
+    def __init__(self, load_fn, refresh_interval=REFRESH_INTERVAL, clock=time.monotonic):
+        self.load_fn = load_fn
+        self.refresh_interval = refresh_interval
+        self.clock = clock
+        self._versions = None
+        # bilgisayar adı -> bu süreçte yapılan yazım sayısı
+        self._bumps = {}
+        self._loaded_at = None
+        self._load_failed = False
+        self._refresh_lock = threading.Lock()
+        self._bump_lock = threading.Lock()
+
+        # İstatistikler
+        self.lookups = 0
+        self.bumps = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+
+    def _is_fresh(self):
+        return self._loaded_at is not None and self.clock() - self._loaded_at < self.refresh_interval
+
+    def _refresh(self):
+        # Aynı anda sadece bir thread yeniler, diğerleri elindeki (en fazla bir aralık eski) kopyayı kullanır
+        if not self._refresh_lock.acquire(blocking=self._versions is None):
+            return
+        try:
+            if self._is_fresh():
+                return
+            try:
+                self._versions = self.load_fn()
+                self._load_failed = False
+                self.refreshes += 1
+            except Exception as e:
+                self._load_failed = True
+                self.refresh_errors += 1
+                print(f"Veri versiyonları okunurken hata: {e}")
+            # Hata durumunda da bir aralık beklenir, veritabanı her istekte denenmez
+            self._loaded_at = self.clock()
+        finally:
+            self._refresh_lock.release()
+
+    def get(self, computer_name):
+        """Bilgisayarın data_version değeri, bilinmiyorsa None"""
+        self.lookups += 1
+        if not self._is_fresh():
+            self._refresh()
+        versions = self._versions
+        return versions.get(computer_name) if versions else None
+
+    def token(self, computer_name):
+        """ETag'e girecek versiyon değeri (veritabanı versiyonu ve yerel yazım sayısı), bilinmiyorsa None"""
+        version = self.get(computer_name)
+        if version is None:
+            return None
+        return f"{version}.{self._bumps.get(computer_name, 0)}"
+
+    def bump(self, computer_names):
+        """Verileri yazılan bilgisayarların versiyonunu bellekte ilerlet.
+
+        Kayıtta olmayan bir bilgisayar (ör. yeni kaydedilen) varsa bir sonraki get()
+        çağrısında versiyonlar yeniden okunur.
+        """
+        versions = self._versions
+        with self._bump_lock:
+            for name in set(computer_names):
+                self._bumps[name] = self._bumps.get(name, 0) + 1
+                self.bumps += 1
+                if versions is None or name not in versions:
+                    self._loaded_at = None
+
+    def available(self):
+        """Son yenileme başarılıysa True; değilse get()'in None'ı 'kayıtlı değil' anlamına gelmez"""
+        return self._versions is not None and not self._load_failed
+
+    def invalidate(self):
+        """Bir sonraki get() çağrısında versiyonları yeniden oku"""
+        self._loaded_at = None
+
+    def stats(self):
+        return {
+            'computers': len(self._versions) if self._versions else 0,
+            'lookups': self.lookups,
+            'bumps': self.bumps,
+            'refreshes': self.refreshes,
+            'refresh_errors': self.refresh_errors
+        }
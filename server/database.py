@@ -1,7 +1,196 @@
+import threading
+import time
+from collections import deque
+
 import mysql.connector
 from mysql.connector import Error
 from config import DB_CONFIG
 
+class PoolTimeout(Exception):
+    """Havuzdan belirtilen sürede bağlantı alınamadı"""
+
+class PooledConnection:
+    """Havuzdan ödünç alınan bağlantı; close() bağlantıyı kapatmak yerine havuza iade eder"""
+
+    def __init__(self, pool, connection, created_at):
+        self._pool = pool
+        self._connection = connection
+        self.created_at = created_at
+        self.broken = False
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def invalidate(self):
+        """Bağlantı hatalı: iade edildiğinde havuza geri konmaz"""
+        self.broken = True
+
+    def close(self):
+        if self._connection is not None:
+            connection, self._connection = self._connection, None
+            self._pool._release(connection, self.created_at, self.broken)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if isinstance(exc, Error):
+            self.invalidate()
+        self.close()
+
+class ConnectionPool:
+    """Sınırlı boyutlu, thread-safe MySQL bağlantı havuzu.
+
+    Bir süredir boşta duran bağlantılar ödünç verilmeden önce ping ile kontrol edilir,
+    max_lifetime'ı aşan bağlantılar kapatılıp yenisi açılır. Havuz doluysa istek
+    acquire_timeout saniyeye kadar bekler; bekleme süreleri stats() ile izlenir.
+    """
+
+    def __init__(self, config, size=10, max_lifetime=1800, health_check_after=30,
+                 acquire_timeout=10, **connect_args):
+        self.config = dict(config, **connect_args)
+        self.size = size
+        self.max_lifetime = max_lifetime
+        self.health_check_after = health_check_after
+        self.acquire_timeout = acquire_timeout
+        self._idle = deque()          # (bağlantı, oluşturulma, son kullanım)
+        self._open = 0                # havuzdaki + ödünç verilmiş bağlantı sayısı
+        self._condition = threading.Condition()
+
+        # İstatistikler
+        self.acquired = 0
+        self.created = 0
+        self.recycled = 0
+        self.discarded = 0
+        self.waits = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+        self.timeouts = 0
+
+    def _connect(self):
+        connection = mysql.connector.connect(**self.config)
+        self.created += 1
+        return connection
+
+    @staticmethod
+    def _close_quietly(connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def _healthy(self, connection, last_used):
+        if time.monotonic() - last_used < self.health_check_after:
+            return True
+        try:
+            connection.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def acquire(self, timeout=None):
+        """Havuzdan bir bağlantı ödünç al (close() ile iade edilir)"""
+        timeout = self.acquire_timeout if timeout is None else timeout
+        started = time.monotonic()
+        waited = False
+
+        with self._condition:
+            while True:
+                if self._idle:
+                    connection, created_at, last_used = self._idle.pop()
+                    break
+                if self._open < self.size:
+                    self._open += 1
+                    connection = None
+                    break
+                remaining = timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeout(f"Havuzdan {timeout} saniyede bağlantı alınamadı ({self.size} bağlantı kullanımda)")
+                waited = True
+                self._condition.wait(remaining)
+
+            if waited:
+                wait_time = time.monotonic() - started
+                self.waits += 1
+                self.wait_time_total += wait_time
+                self.wait_time_max = max(self.wait_time_max, wait_time)
+            self.acquired += 1
+
+        # Ağ işlemleri kilit dışında yapılır
+        try:
+            if connection is not None:
+                if time.monotonic() - created_at > self.max_lifetime:
+                    self.recycled += 1
+                    self._close_quietly(connection)
+                    connection = None
+                elif not self._healthy(connection, last_used):
+                    self.discarded += 1
+                    self._close_quietly(connection)
+                    connection = None
+            if connection is None:
+                connection = self._connect()
+                created_at = time.monotonic()
+        except Exception:
+            with self._condition:
+                self._open -= 1
+                self._condition.notify()
+            raise
+
+        return PooledConnection(self, connection, created_at)
+
+    def _release(self, connection, created_at, broken):
+        if not broken:
+            try:
+                # Yarım kalmış işlem bir sonraki kullanıcıya geçmesin
+                if connection.in_transaction:
+                    connection.rollback()
+            except Exception:
+                broken = True
+
+        if broken or time.monotonic() - created_at > self.max_lifetime:
+            if broken:
+                self.discarded += 1
+            else:
+                self.recycled += 1
+            self._close_quietly(connection)
+            with self._condition:
+                self._open -= 1
+                self._condition.notify()
+            return
+
+        with self._condition:
+            self._idle.append((connection, created_at, time.monotonic()))
+            self._condition.notify()
+
+    def close_all(self):
+        """Boştaki tüm bağlantıları kapat"""
+        with self._condition:
+            idle, self._idle = list(self._idle), deque()
+            self._open -= len(idle)
+        for connection, _, _ in idle:
+            self._close_quietly(connection)
+
+    def stats(self):
+        """Havuz doluluğu ve bekleme metrikleri"""
+        with self._condition:
+            idle = len(self._idle)
+            in_use = self._open - idle
+        return {
+            'size': self.size,
+            'open': idle + in_use,
+            'idle': idle,
+            'in_use': in_use,
+            'acquired': self.acquired,
+            'created': self.created,
+            'recycled': self.recycled,
+            'discarded': self.discarded,
+            'waits': self.waits,
+            'wait_time_avg_ms': round(self.wait_time_total / self.waits * 1000, 3) if self.waits else 0,
+            'wait_time_max_ms': round(self.wait_time_max * 1000, 3),
+            'timeouts': self.timeouts
+        }
+
 class Database:
     _instance = None
     _connection = None
@@ -0,0 +1,66 @@
+"""Defender olaylarının risk seviyesi sınıflandırması.
+
+Kurallar tek yerde tutulur; olay yazılırken defender_information.severity kolonuna
+tetikleyici (severity_case_sql) ile, sunucu tarafında Python'da classify() ile atanır.
+Sorgular metin taramak yerine indeksli severity kolonunu filtreler.
+"""
+import unicodedata
+
+SEVERITY_HIGH = 'high'
+SEVERITY_MEDIUM = 'medium'
+SEVERITY_LOW = 'low'
+SEVERITIES = (SEVERITY_HIGH, SEVERITY_MEDIUM, SEVERITY_LOW)
+
+# Yüksek öncelik: tehdit algılama/temizleme olayları veya açıklamada tehdit kelimesi
+HIGH_EVENT_IDS = (1006, 1007, 1008, 1009, 1116, 1117, 1073758208, -1073725430)
+THREAT_KEYWORDS = ('tehdit', 'virüs', 'malware')
+
+# Orta öncelik: tarama/koruma hataları ve yapılandırma değişiklikleri
+MEDIUM_EVENT_IDS = (1005, 1010, 1118, 1119, 1073742724, 1013, 1015, 1121, 1122, 1123, 8004)
+
+def _fold(text):
+    """MySQL'in utf8mb4_0900_ai_ci karşılaştırmasına yakın: büyük/küçük harf ve aksan duyarsız"""
+    decomposed = unicodedata.normalize('NFKD', text.casefold())
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+_FOLDED_KEYWORDS = tuple(_fold(keyword) for keyword in THREAT_KEYWORDS)
+
+def classify(event_id, description):
+    """Olayın risk seviyesini döndür ('high', 'medium' veya 'low')"""
+    if event_id in HIGH_EVENT_IDS:
+        return SEVERITY_HIGH
+    if description:
+        folded = _fold(str(description))
+        if any(keyword in folded for keyword in _FOLDED_KEYWORDS):
+            return SEVERITY_HIGH
+    if event_id in MEDIUM_EVENT_IDS:
+        return SEVERITY_MEDIUM
+    return SEVERITY_LOW
+
+def _id_list(ids):
+    return ", ".join(str(i) for i in ids)
+
+def severity_case_sql(row):
+    """classify() ile aynı kuralı uygulayan SQL CASE ifadesi (row: tablo takma adı veya NEW)"""
+    keywords = " OR ".join(f"{row}.description LIKE '%{keyword}%'" for keyword in THREAT_KEYWORDS)
+    return (
+        f"CASE WHEN {row}.event_id IN ({_id_list(HIGH_EVENT_IDS)}) OR {keywords} THEN '{SEVERITY_HIGH}' "
+        f"WHEN {row}.event_id IN ({_id_list(MEDIUM_EVENT_IDS)}) THEN '{SEVERITY_MEDIUM}' "
+        f"ELSE '{SEVERITY_LOW}' END"
+    )
+
+def column_conditions(row):
+    """severity kolonuna göre (yüksek, orta, düşük) 0/1 ifadeleri"""
+    return tuple(f"COALESCE({row}.severity = '{severity}', 0)" for severity in SEVERITIES)
+
+def keyword_conditions(row):
+    """severity kolonu eklenmeden önceki sorgu zamanı kuralları (sadece migration 3 için)"""
+    high_ids = HIGH_EVENT_IDS
+    medium_ids = MEDIUM_EVENT_IDS + (-1073725430,)
+    high = " OR ".join(f"{row}.description LIKE '%{keyword}%'" for keyword in THREAT_KEYWORDS)
+    low = " AND ".join(f"{row}.description NOT LIKE '%{keyword}%'" for keyword in THREAT_KEYWORDS)
+    return (
+        f"COALESCE({row}.event_id IN ({_id_list(high_ids)}) OR {high}, 0)",
+        f"COALESCE({row}.event_id IN ({_id_list(medium_ids)}), 0)",
+        f"COALESCE({row}.event_id NOT IN ({_id_list(high_ids + medium_ids)}) AND {low}, 0)",
+    )
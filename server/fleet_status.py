@@ -0,0 +1,66 @@
+from presence_store import STATUS_ONLINE, STATUS_OFFLINE
+
+UNKNOWN = 'Bilinmiyor'
+HARDWARE_FIELDS = ('operating_system', 'processor', 'ram', 'disk_space', 'manufacturer', 'model')
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+def _apply(computer, connection, status_fn):
+    if connection:
+        computer['status'] = status_fn(connection)
+        computer['last_update'] = _isoformat(connection['last_seen'])
+    else:
+        computer['status'] = STATUS_OFFLINE
+        computer['last_update'] = None
+
+def apply_presence(computers, connections, status_fn):
+    """Veritabanı satırlarına presence durumunu yaz (bilgisayar başına tek sözlük araması)"""
+    for computer in computers:
+        _apply(computer, connections.get(computer['computer_name']), status_fn)
+    return computers
+
+def build_fleet_status(computers, connections, status_fn, include_unknown=True):
+    """Satırları presence ile birleştir, toplamları ve OS dağılımını tek geçişte hesapla.
+
+    computers: latest_system_snapshot satırları, connections: get_active_connections() sonucu.
+    include_unknown ise veritabanında henüz kaydı olmayan bağlı bilgisayarlar da eklenir.
+    """
+    seen = set()
+    online = 0
+    os_distribution = {}
+
+    def count(computer):
+        nonlocal online
+        if computer['status'] == STATUS_ONLINE:
+            online += 1
+        os_name = computer.get('operating_system') or UNKNOWN
+        os_distribution[os_name] = os_distribution.get(os_name, 0) + 1
+
+    for computer in computers:
+        name = computer['computer_name']
+        seen.add(name)
+        _apply(computer, connections.get(name), status_fn)
+        count(computer)
+
+    if include_unknown:
+        for name, connection in connections.items():
+            if name in seen:
+                continue
+            computer = {
+                'computer_name': name,
+                'status': status_fn(connection),
+                'last_update': _isoformat(connection['last_seen'])
+            }
+            for field in HARDWARE_FIELDS:
+                computer[field] = UNKNOWN
+            computers.append(computer)
+            count(computer)
+
+    return {
+        'computers': computers,
+        'total_computers': len(computers),
+        'online_computers': online,
+        'offline_computers': len(computers) - online,
+        'os_distribution': os_distribution
+    }
@@ -0,0 +1,191 @@
+"""/api/get_all_pc_status birleştirme adımının ölçümü.
+
+Sentetik latest_system_snapshot satırları ve presence dosyaları üretip eski yolu
+(bilgisayar başına check_pc_status + any() ile bilinmeyen bağlantı araması) ve
+fleet_status.build_fleet_status'u farklı filo boyutlarında karşılaştırır.
+
+Örnek:
+    python fleet_status_benchmark.py --sizes 1000,5000,20000 --legacy-max 5000
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from fleet_status import build_fleet_status
+from presence_store import (
+    MappedPresenceFile, build_mmap_image, STATUS_ONLINE, STATUS_OFFLINE
+)
+
+OS_NAMES = ['Windows 10 Pro', 'Windows 11 Pro', 'Windows 10 Enterprise', 'Windows Server 2019']
+
+def make_fleet(size, online_ratio, unknown_ratio):
+    """Veritabanı satırları ve presence kayıtları üret"""
+    now = datetime.now()
+    computers = []
+    clients = {}
+    for i in range(size):
+        name = f"PC-{i:06d}"
+        computers.append({
+            'computer_name': name,
+            'operating_system': OS_NAMES[i % len(OS_NAMES)],
+            'processor': 'Intel Core i5',
+            'ram': '16 GB',
+            'disk_space': '512 GB',
+            'manufacturer': 'Dell',
+            'model': 'OptiPlex'
+        })
+        # Her bilgisayarın presence kaydı yok, bir kısmı hiç bağlanmamış
+        if i % 10 < 9:
+            online = (i % 100) < online_ratio * 100
+            clients[name] = {
+                'last_seen': now - timedelta(seconds=2 if online else 600),
+                'address': f"10.0.{i // 256 % 256}.{i % 256}:50000",
+                'status': STATUS_ONLINE if online else STATUS_OFFLINE,
+                'status_changed': now - timedelta(minutes=5)
+            }
+    # Veritabanında henüz kaydı olmayan bağlı bilgisayarlar
+    for i in range(int(size * unknown_ratio)):
+        clients[f"NEW-{i:06d}"] = {
+            'last_seen': now,
+            'address': f"10.1.0.{i % 256}:50000",
+            'status': STATUS_ONLINE,
+            'status_changed': now
+        }
+    return computers, clients
+
+def write_presence(clients, directory):
+    """Socket sunucusunun yazdığı JSON ve mmap dosyalarını oluştur"""
+    json_path = os.path.join(directory, "active_connections.json")
+    mmap_path = os.path.join(directory, "active_connections.dat")
+    data = {
+        name: {
+            'last_seen': info['last_seen'].isoformat(),
+            'address': info['address'],
+            'status': info['status'],
+            'status_changed': info['status_changed'].isoformat()
+        }
+        for name, info in clients.items()
+    }
+    with open(json_path, "w") as f:
+        json.dump(data, f)
+    with open(mmap_path, "wb") as f:
+        f.write(build_mmap_image(clients))
+    return json_path, mmap_path
+
+def load_connections(json_path):
+    """app.get_active_connections ile aynı ayrıştırma"""
+    with open(json_path) as f:
+        connections = json.load(f)
+    for data in connections.values():
+        data['last_seen'] = datetime.fromisoformat(data['last_seen'])
+    return connections
+
+def status_of(connection):
+    return connection.get('status', STATUS_ONLINE)
+
+def legacy_fleet_status(computers, json_path, mmap_path):
+    """Önceki get_all_pc_status: bilgisayar başına mmap araması ve O(n·m) bilinmeyen bağlantı taraması"""
+    reader = MappedPresenceFile(mmap_path)
+    connections = load_connections(json_path)
+    for computer in computers:
+        connection = reader.lookup(computer['computer_name'])
+        if connection:
+            computer['status'] = status_of(connection)
+            computer['last_update'] = connection['last_seen'].isoformat()
+        else:
+            computer['status'] = STATUS_OFFLINE
+            computer['last_update'] = None
+    for computer_name in connections:
+        if not any(c['computer_name'] == computer_name for c in computers):
+            computers.append({
+                'computer_name': computer_name,
+                'status': status_of(connections[computer_name]),
+                'last_update': connections[computer_name]['last_seen'].isoformat(),
+                'operating_system': 'Bilinmiyor'
+            })
+    online = sum(1 for c in computers if c['status'] == STATUS_ONLINE)
+    os_distribution = {}
+    for computer in computers:
+        os_name = computer['operating_system'] or 'Bilinmiyor'
+        os_distribution[os_name] = os_distribution.get(os_name, 0) + 1
+    return {'total_computers': len(computers), 'online_computers': online, 'os_distribution': os_distribution}
+
+def new_fleet_status(computers, json_path):
+    return build_fleet_status(computers, load_connections(json_path), status_of)
+
+def measure(fn, repeat):
+    """En iyi süreyi (saniye) ve son sonucu döndür"""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def run(args):
+    rows = []
+    workdir = tempfile.mkdtemp(prefix="fleet-bench-")
+    try:
+        for size in args.sizes:
+            computers, clients = make_fleet(size, args.online_ratio, args.unknown_ratio)
+            json_path, mmap_path = write_presence(clients, workdir)
+
+            new_time, new_result = measure(
+                lambda: new_fleet_status([dict(c) for c in computers], json_path), args.repeat)
+            row = {
+                'computers': size,
+                'connections': len(clients),
+                'new_ms': round(new_time * 1000, 2),
+                'new_us_per_computer': round(new_time * 1e6 / size, 3),
+                'legacy_ms': None,
+                'speedup': None
+            }
+
+            if size <= args.legacy_max:
+                legacy_time, legacy_result = measure(
+                    lambda: legacy_fleet_status([dict(c) for c in computers], json_path, mmap_path), args.repeat)
+                # İki yol aynı sonucu vermeli
+                assert legacy_result['total_computers'] == new_result['total_computers']
+                assert legacy_result['online_computers'] == new_result['online_computers']
+                assert legacy_result['os_distribution'] == new_result['os_distribution']
+                row['legacy_ms'] = round(legacy_time * 1000, 2)
+                row['speedup'] = round(legacy_time / new_time, 1)
+            rows.append(row)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return rows
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Filo durumu birleştirme ölçümü")
+    parser.add_argument("--sizes", default="1000,5000,10000,20000",
+                        type=lambda value: [int(v) for v in value.split(",")],
+                        help="virgülle ayrılmış filo boyutları")
+    parser.add_argument("--online-ratio", type=float, default=0.8)
+    parser.add_argument("--unknown-ratio", type=float, default=0.02,
+                        help="veritabanında kaydı olmayan bağlantıların oranı")
+    parser.add_argument("--legacy-max", type=int, default=5000,
+                        help="eski yolun ölçüleceği en büyük filo boyutu (O(n·m) olduğu için)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", action="store_true", help="sonuçları JSON olarak yazdır")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    rows = run(args)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print(f"{'bilgisayar':>10} {'bağlantı':>9} {'yeni (ms)':>10} {'µs/bilg.':>9} {'eski (ms)':>10} {'hızlanma':>9}")
+        for row in rows:
+            print(f"{row['computers']:>10} {row['connections']:>9} {row['new_ms']:>10} "
+                  f"{row['new_us_per_computer']:>9} {str(row['legacy_ms']):>10} {str(row['speedup']):>9}")
+    return rows
+
+if __name__ == "__main__":
+    main()
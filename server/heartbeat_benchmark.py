@@ -0,0 +1,401 @@
+"""Heartbeat yük üreticisi ve gecikme ölçümü.
+
+Tek bir süreçten N sanal ajan oluşturup socket_server.py'ye bağlanır ve
+bağlantı/saniye, heartbeat RTT p50/p99, sunucu RSS/CPU ve
+active_connections.json dosyasının bayatlığını raporlar. Shard modunda RSS/CPU
+ana süreç ve worker'larının toplamıdır, bayatlık shard dosyalarından ölçülür.
+
+Örnekler:
+    python heartbeat_benchmark.py --spawn-server asyncio --agents 5000 --duration 60
+    python heartbeat_benchmark.py --port 5002 --server-pid 1234 --agents 2000 --churn 0.01
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import signal
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+
+from heartbeat_protocol import (
+    FrameDecoder, encode_frame,
+    MSG_HELLO, MSG_CONNECTED, MSG_HEARTBEAT, MSG_ALIVE
+)
+from presence_store import presence_files
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+SERVER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "socket_server.py")
+
+def percentile(values, pct):
+    """Sıralı olmayan listeden yüzdelik değer"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def _raise_fd_limit():
+    try:
+        import resource  # Windows'ta yok
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if hard == resource.RLIM_INFINITY or hard > soft:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    except (ImportError, ValueError, OSError):
+        pass
+
+class BenchmarkStats:
+    """Ajanların ve örnekleyicinin topladığı ölçümler"""
+
+    def __init__(self):
+        self.connect_times = []     # bağlantı + el sıkışma süresi (saniye)
+        self.connect_errors = 0
+        self.connect_timeouts = 0   # el sıkışma zaman aşımları (connect_errors'a dahil değil)
+        self.connected_at = []      # başarılı el sıkışmaların zamanı (perf_counter)
+        self.rtts = []              # heartbeat RTT (saniye)
+        self.heartbeat_errors = 0
+        self.heartbeat_timeouts = 0 # yanıt zaman aşımları (heartbeat_errors'a dahil değil)
+        self.reconnects = 0
+        self.server_rss = []        # bayt
+        self.server_cpu = []        # yüzde
+        self.file_age = []          # active_connections.json (shard modunda en eski shard dosyası) yaşı (saniye)
+
+class VirtualAgent:
+    """Tek bir HeartbeatClient'ı taklit eden asyncio görevi"""
+
+    def __init__(self, name, args, stats):
+        self.name = name
+        self.args = args
+        self.stats = stats
+        self.reader = None
+        self.writer = None
+        self.decoder = FrameDecoder()
+        self.pending = []
+        self.seq = 0
+
+    def _timeout(self, deadline):
+        # Bağlantıyı kabul edip yanıt vermeyen sunucu testi --duration'dan uzun bekletmesin
+        return max(0, min(deadline - time.monotonic(), self.args.interval * 2))
+
+    async def _read_frame(self):
+        while not self.pending:
+            data = await self.reader.read(4096)
+            if not data:
+                raise ConnectionError("Sunucu bağlantıyı kapattı")
+            self.pending.extend(self.decoder.feed(data))
+        return self.pending.pop(0)
+
+    async def connect(self, deadline):
+        start = time.perf_counter()
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(self.args.host, self.args.port), self._timeout(deadline))
+        await asyncio.wait_for(self._handshake(), self._timeout(deadline))
+        now = time.perf_counter()
+        self.stats.connect_times.append(now - start)
+        self.stats.connected_at.append(now)
+
+    async def _handshake(self):
+        self.decoder = FrameDecoder()
+        self.pending = []
+        if self.args.legacy:
+            self.writer.write(self.name.encode())
+            await self.writer.drain()
+            response = await self.reader.read(1024)
+            if response != b"CONNECTED":
+                raise ConnectionError(f"Beklenmeyen yanıt: {response!r}")
+        else:
+            self.writer.write(encode_frame(MSG_HELLO, self.name.encode()))
+            await self.writer.drain()
+            msg_type, _ = await self._read_frame()
+            if msg_type != MSG_CONNECTED:
+                raise ConnectionError(f"Beklenmeyen çerçeve tipi: {msg_type}")
+
+    async def heartbeat(self, deadline):
+        start = time.perf_counter()
+        await asyncio.wait_for(self._exchange_heartbeat(), self._timeout(deadline))
+        self.stats.rtts.append(time.perf_counter() - start)
+
+    async def _exchange_heartbeat(self):
+        if self.args.legacy:
+            self.writer.write(b"HEARTBEAT")
+            await self.writer.drain()
+            response = await self.reader.read(1024)
+            if response != b"ALIVE":
+                raise ConnectionError(f"Beklenmeyen yanıt: {response!r}")
+        else:
+            self.seq += 1
+            payload = struct.pack("!I", self.seq & 0xFFFFFFFF)
+            self.writer.write(encode_frame(MSG_HEARTBEAT, payload))
+            await self.writer.drain()
+            while True:
+                msg_type, response = await self._read_frame()
+                if msg_type == MSG_ALIVE and response == payload:
+                    break
+
+    def close(self):
+        if self.writer:
+            self.writer.close()
+            self.writer = None
+
+    async def run(self, deadline):
+        first = True
+        while time.monotonic() < deadline:
+            try:
+                await self.connect(deadline)
+            except asyncio.TimeoutError:
+                # TimeoutError, OSError'ın alt sınıfı olduğu için önce yakalanır
+                self.stats.connect_timeouts += 1
+                self.close()
+                continue
+            except (OSError, ConnectionError):
+                self.stats.connect_errors += 1
+                self.close()
+                await asyncio.sleep(min(1.0, self.args.interval))
+                continue
+
+            # İlk heartbeat'leri aralık içine yay, aksi halde tüm ajanlar aynı anda gönderir
+            if first:
+                await asyncio.sleep(random.uniform(0, self.args.interval))
+                first = False
+
+            try:
+                while time.monotonic() < deadline:
+                    await self.heartbeat(deadline)
+                    if self.args.churn and random.random() < self.args.churn:
+                        self.stats.reconnects += 1
+                        break
+                    await asyncio.sleep(self.args.interval)
+            except asyncio.TimeoutError:
+                self.stats.heartbeat_timeouts += 1
+            except (OSError, ConnectionError):
+                self.stats.heartbeat_errors += 1
+            finally:
+                self.close()
+
+def connections_file_age(path):
+    """Bağlantı dosyasının yaşı; shard dosyaları varsa en eski shard dosyasınınki.
+
+    Shard modunda ana dosya başlangıçta bir kez boşaltılır ve bir daha yazılmaz.
+    """
+    files = presence_files(path)
+    shards = [p for p in files if p != path]
+    ages = []
+    for p in shards or files:
+        try:
+            ages.append(time.time() - os.path.getmtime(p))
+        except OSError:
+            pass
+    return max(ages) if ages else None
+
+def _process_tree(root, known):
+    """Sunucu süreci ve (shard modunda) worker'ları; cpu_percent için nesneler saklanır"""
+    current = {}
+    for process in [root] + root.children(recursive=True):
+        if process.pid not in known:
+            # İlk cpu_percent çağrısı 0 döner, ölçüm bir sonraki örnekte başlar
+            process.cpu_percent(interval=None)
+            known[process.pid] = process
+        current[process.pid] = known[process.pid]
+    known.clear()
+    known.update(current)
+    return list(current.values())
+
+async def sample_server(args, stats, deadline, pid):
+    """Sunucu süreç ağacını ve bağlantı dosyalarını saniyede bir örnekle"""
+    root = None
+    known = {}
+    if pid and psutil:
+        root = psutil.Process(pid)
+        _process_tree(root, known)
+
+    while time.monotonic() < deadline:
+        await asyncio.sleep(1)
+        if root:
+            rss = cpu = 0
+            try:
+                for process in _process_tree(root, known):
+                    try:
+                        rss += process.memory_info().rss
+                        cpu += process.cpu_percent(interval=None)
+                    except psutil.NoSuchProcess:
+                        # Yeniden başlatılan worker; sonraki örnekte yenisi sayılır
+                        pass
+                stats.server_rss.append(rss)
+                stats.server_cpu.append(cpu)
+            except psutil.Error:
+                root = None
+        if args.connections_file:
+            age = connections_file_age(args.connections_file)
+            if age is not None:
+                stats.file_age.append(age)
+
+async def run_benchmark(args, pid):
+    stats = BenchmarkStats()
+    started = time.perf_counter()
+    deadline = time.monotonic() + args.duration
+    tasks = [asyncio.ensure_future(sample_server(args, stats, deadline, pid))]
+
+    # connect_rate 0 ise tüm ajanlar aynı anda bağlanır (bağlantı fırtınası)
+    for i in range(args.agents):
+        agent = VirtualAgent(f"{args.prefix}-{i:05d}", args, stats)
+        tasks.append(asyncio.ensure_future(agent.run(deadline)))
+        if args.connect_rate:
+            await asyncio.sleep(1 / args.connect_rate)
+
+    await asyncio.gather(*tasks)
+    return stats, started
+
+def build_report(args, stats, started):
+    """Ölçümleri tek bir sözlükte özetle"""
+    def ms(value):
+        return round(value * 1000, 3) if value is not None else None
+
+    first_round = stats.connected_at[:args.agents]
+    first_round_window = (max(first_round) - started) if first_round else None
+
+    return {
+        'agents': args.agents,
+        'duration': args.duration,
+        'interval': args.interval,
+        'protocol': 'legacy' if args.legacy else 'framed',
+        'connections': len(stats.connect_times),
+        'connect_errors': stats.connect_errors,
+        'connect_timeouts': stats.connect_timeouts,
+        'connections_per_sec': round(len(first_round) / first_round_window, 1) if first_round_window else None,
+        'connect_p50_ms': ms(percentile(stats.connect_times, 50)),
+        'connect_p99_ms': ms(percentile(stats.connect_times, 99)),
+        'heartbeats': len(stats.rtts),
+        'heartbeat_errors': stats.heartbeat_errors,
+        'heartbeat_timeouts': stats.heartbeat_timeouts,
+        'reconnects': stats.reconnects,
+        'rtt_p50_ms': ms(percentile(stats.rtts, 50)),
+        'rtt_p99_ms': ms(percentile(stats.rtts, 99)),
+        'rtt_max_ms': ms(max(stats.rtts) if stats.rtts else None),
+        'server_rss_max_mb': round(max(stats.server_rss) / (1024 ** 2), 1) if stats.server_rss else None,
+        'server_cpu_avg_pct': round(sum(stats.server_cpu) / len(stats.server_cpu), 1) if stats.server_cpu else None,
+        'server_cpu_max_pct': round(max(stats.server_cpu), 1) if stats.server_cpu else None,
+        'file_age_p50_s': round(percentile(stats.file_age, 50), 3) if stats.file_age else None,
+        'file_age_max_s': round(max(stats.file_age), 3) if stats.file_age else None,
+    }
+
+def spawn_server(mode, port, workdir, workers=1):
+    """socket_server.py'yi geçici bir dizinde ayrı süreç olarak başlat"""
+    env = dict(os.environ, PYTHONUNBUFFERED="1")
+    command = [sys.executable, SERVER_SCRIPT, "--mode", mode]
+    if port != 5002:
+        command += ["--port", str(port)]
+    if workers > 1:
+        command += ["--workers", str(workers)]
+    server = subprocess.Popen(
+        command,
+        cwd=workdir,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        # POSIX'te ayrı süreç grubu: worker'lar dahil tüm ağaç birlikte sonlandırılabilir
+        start_new_session=hasattr(os, "killpg")
+    )
+    # Port dinlemeye başlayana kadar bekle
+    for _ in range(50):
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return server
+        except OSError:
+            time.sleep(0.1)
+    stop_server(server)
+    raise RuntimeError("Soket sunucusu başlatılamadı")
+
+def stop_server(server, timeout=10):
+    """Başlatılan sunucuyu worker süreçleriyle birlikte durdur"""
+    children = []
+    if psutil:
+        try:
+            children = psutil.Process(server.pid).children(recursive=True)
+        except psutil.Error:
+            pass
+    # SIGTERM: sunucu shard worker'larını kendisi durdurur ve shard dosyalarını siler
+    server.terminate()
+    try:
+        server.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        server.wait()
+    # Kapanmayan worker kaldıysa öldür
+    if hasattr(os, "killpg"):
+        try:
+            os.killpg(server.pid, signal.SIGKILL)
+        except OSError:
+            pass
+    for child in children:
+        try:
+            child.kill()
+        except psutil.Error:
+            pass
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Heartbeat sunucusu yük testi")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5002)
+    parser.add_argument("--agents", type=int, default=1000, help="sanal ajan sayısı")
+    parser.add_argument("--interval", type=float, default=5.0, help="heartbeat aralığı (saniye)")
+    parser.add_argument("--duration", type=float, default=30.0, help="test süresi (saniye)")
+    parser.add_argument("--connect-rate", type=float, default=0,
+                        help="saniyedeki yeni bağlantı sayısı (0: hepsi aynı anda, bağlantı fırtınası)")
+    parser.add_argument("--churn", type=float, default=0.0,
+                        help="her heartbeat sonrası bağlantıyı kesip yeniden bağlanma olasılığı")
+    parser.add_argument("--legacy", action="store_true", help="eski düz metin protokolünü kullan")
+    parser.add_argument("--prefix", default="BENCH", help="sanal bilgisayar adı öneki")
+    parser.add_argument("--spawn-server", choices=["thread", "asyncio"],
+                        help="sunucuyu bu modda geçici bir dizinde başlat")
+    parser.add_argument("--server-workers", type=int, default=1,
+                        help="--spawn-server ile başlatılan sunucunun SO_REUSEPORT worker sayısı")
+    parser.add_argument("--server-pid", type=int, help="RSS/CPU ölçümü için çalışan sunucunun PID'i")
+    parser.add_argument("--connections-file", help="bayatlığı ölçülecek active_connections.json yolu")
+    parser.add_argument("--json", action="store_true", help="raporu JSON olarak yazdır")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    _raise_fd_limit()
+
+    server = None
+    workdir = None
+    pid = args.server_pid
+    try:
+        if args.spawn_server:
+            workdir = tempfile.mkdtemp(prefix="heartbeat-bench-")
+            server = spawn_server(args.spawn_server, args.port, workdir, args.server_workers)
+            pid = server.pid
+            if not args.connections_file:
+                args.connections_file = os.path.join(workdir, "active_connections.json")
+
+        if pid and not psutil:
+            print("psutil yüklü değil, sunucu RSS/CPU ölçülmeyecek")
+
+        stats, started = asyncio.run(run_benchmark(args, pid))
+        report = build_report(args, stats, started)
+
+        if args.json:
+            print(json.dumps(report, indent=2))
+        else:
+            print("Heartbeat benchmark sonuçları")
+            for key, value in report.items():
+                print(f"  {key:<22} {value}")
+        return report
+    finally:
+        if server:
+            stop_server(server)
+        if workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
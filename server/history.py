@@ -0,0 +1,126 @@
+"""Defender, olay, port ve yazılım değişikliği geçmişi için keyset (imleç) sayfalama.
+
+Sayfalar (created_at, id) sırasına göre yeniden eskiye okunur. İmleç son satırın
+(created_at, id) değeridir; bir sonraki sayfa OFFSET yerine bu değerden küçük
+satırlarla başlar, böylece derin sayfalar da indeksten (created_at, id) veya
+bilgisayar filtresinde (system_id, created_at) aralık taramasıyla okunur.
+"""
+import base64
+from datetime import datetime
+
+from defender_severity import SEVERITIES, classify
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Tarih parametreleri ve imleç içindeki zaman biçimi
+DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# tür -> (tablo, takma ad, seçilen kolonlar)
+HISTORY_SOURCES = {
+    'defender': ('defender_information', 'di', ('log_time', 'source', 'event_id', 'description', 'severity')),
+    'events': ('event_information', 'ei', ('app_name', 'event_type', 'timestamp')),
+    'ports': ('port_information', 'pi', ('port', 'process_name', 'pid', 'username', 'ip')),
+    'software': ('software_changes', 'sc', ('software_name', 'publisher', 'change_type', 'old_version', 'new_version')),
+}
+
+def encode_cursor(created_at, row_id):
+    """Satırın (created_at, id) değerinden opak imleç üret"""
+    raw = f"{created_at.strftime(DATETIME_FORMAT)}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """İmleci (created_at, id) değerine çevir, geçersizse ValueError"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, row_id = base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8').split('|')
+        return datetime.strptime(created_at, DATETIME_FORMAT), int(row_id)
+    except (ValueError, UnicodeError) as e:
+        raise ValueError(f"Geçersiz imleç: {cursor}") from e
+
+def parse_datetime(value):
+    """'YYYY-MM-DD HH:MM:SS' veya ISO biçimindeki tarihi çevir, boşsa None"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('T', ' ').rstrip('Z'))
+    except ValueError as e:
+        raise ValueError(f"Geçersiz tarih: {value}") from e
+
+def parse_limit(value):
+    """Sayfa boyutunu 1..MAX_PAGE_SIZE aralığına sıkıştır"""
+    if value in (None, ''):
+        return DEFAULT_PAGE_SIZE
+    try:
+        return max(1, min(int(value), MAX_PAGE_SIZE))
+    except ValueError as e:
+        raise ValueError(f"Geçersiz sayfa boyutu: {value}") from e
+
+def build_query(kind, computer_name=None, since=None, until=None, after=None, limit=DEFAULT_PAGE_SIZE,
+                severity=None):
+    """Bir sayfa için (sorgu, parametreler); bir sonraki sayfanın varlığı için limit + 1 satır okunur"""
+    if kind not in HISTORY_SOURCES:
+        raise ValueError(f"Bilinmeyen geçmiş türü: {kind}")
+    table, alias, columns = HISTORY_SOURCES[kind]
+
+    conditions = []
+    params = []
+    if computer_name:
+        conditions.append("si.computer_name = %s")
+        params.append(computer_name)
+    if since:
+        conditions.append(f"{alias}.created_at >= %s")
+        params.append(since)
+    if until:
+        conditions.append(f"{alias}.created_at < %s")
+        params.append(until)
+    if severity:
+        if kind != 'defender' or severity not in SEVERITIES:
+            raise ValueError(f"Geçersiz risk seviyesi filtresi: {severity}")
+        conditions.append(f"{alias}.severity = %s")
+        params.append(severity)
+    if after:
+        created_at, row_id = after
+        conditions.append(f"({alias}.created_at < %s OR ({alias}.created_at = %s AND {alias}.id < %s))")
+        params.extend((created_at, created_at, row_id))
+
+    select = ", ".join(f"{alias}.{column}" for column in columns)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    query = f"""
+        SELECT {alias}.id, {select}, si.computer_name, {alias}.created_at
+        FROM {table} {alias}
+        JOIN latest_system_snapshot si ON {alias}.system_id = si.system_id
+        {where}
+        ORDER BY {alias}.created_at DESC, {alias}.id DESC
+        LIMIT %s
+    """
+    params.append(limit + 1)
+    return query, tuple(params)
+
+def _serialize(row):
+    return {
+        key: value.strftime(DATETIME_FORMAT) if isinstance(value, datetime) else value
+        for key, value in row.items()
+    }
+
+def fetch_page(kind, query_fn, computer_name=None, since=None, until=None, cursor=None,
+               limit=DEFAULT_PAGE_SIZE, severity=None):
+    """Bir sayfa satır ve sonraki sayfanın imlecini döndür (son sayfada None)"""
+    after = decode_cursor(cursor) if cursor else None
+    query, params = build_query(kind, computer_name, since, until, after, limit, severity)
+    rows = query_fn(query, params)
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(rows[-1]['created_at'], rows[-1]['id']) if has_more else None
+
+    if kind == 'defender':
+        # Migration'dan önce yazılmış ve henüz sınıflandırılmamış satırlar
+        for row in rows:
+            if not row['severity']:
+                row['severity'] = classify(row['event_id'], row['description'])
+
+    return {
+        'items': [_serialize(row) for row in rows],
+        'next_cursor': next_cursor
+    }
@@ -0,0 +1,297 @@
+"""İstemci monitörlerinden gelen toplu (batch) verinin veritabanına yazılması.
+
+Monitörler MySQL'e doğrudan bağlanmak yerine /api/ingest/<monitör türü> adresine
+gzip'li JSON gönderir:
+    {"computer_name": "...", "records": [{...}, ...]}
+(hardware için "system" ve sadece değiştiyse "network" ve "devices" alanları). Her batch sunucunun
+bağlantı havuzundan alınan bağlantıyla, tek işlem içinde executemany ile yazılır;
+veritabanı bağlantı sayısı filodaki bilgisayar sayısından bağımsız olur. Ekleme
+türündeki batch'ler önce ingest_queue.py'deki kuyrukta tablo başına birleştirilir;
+yazılım envanteri fark olarak gelir (bkz. software_inventory.py).
+"""
+import json
+import os
+import time
+import zlib
+from collections import Counter
+
+from defender_severity import classify
+import software_inventory
+
+# İstemcilerin X-Ingest-Token başlığında göndermesi gereken paylaşılan anahtar. Zorunludur:
+# ayarlanmamışsa /api/ingest istekleri reddedilir (ağdaki herkes bilgisayar kaydedip veri yazabilirdi)
+INGEST_TOKEN = os.environ.get('MONITOR_INGEST_TOKEN')
+
+# Açılmış gövde boyutu ve batch başına kayıt sınırı
+MAX_BODY_BYTES = 8 * 1024 * 1024
+MAX_BATCH_RECORDS = 5000
+
+class IngestError(ValueError):
+    """Geçersiz batch; istemci aynı veriyi tekrar göndermemeli (400)"""
+
+class UnknownComputerError(IngestError):
+    """Bilgisayar henüz kayıtlı değil (hardware verisi gelmemiş); daha sonra tekrar denenebilir (409)"""
+
+def decode_payload(body, content_encoding=None):
+    """İstek gövdesini (gerekirse gzip'i açarak) JSON nesnesine çevir"""
+    if content_encoding and content_encoding.lower() == 'gzip':
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        try:
+            body = decompressor.decompress(body, MAX_BODY_BYTES + 1)
+        except zlib.error as e:
+            raise IngestError(f"gzip gövdesi açılamadı: {e}") from e
+        if decompressor.unconsumed_tail:
+            raise IngestError("Gövde boyutu sınırı aşıldı")
+    if len(body) > MAX_BODY_BYTES:
+        raise IngestError("Gövde boyutu sınırı aşıldı")
+
+    try:
+        payload = json.loads(body)
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise IngestError(f"Geçersiz JSON: {e}") from e
+    if not isinstance(payload, dict) or not payload.get('computer_name'):
+        raise IngestError("computer_name alanı zorunludur")
+    return payload
+
+def _records(payload, key='records'):
+    records = payload.get(key) or []
+    if not isinstance(records, list):
+        raise IngestError(f"{key} bir liste olmalıdır")
+    if len(records) > MAX_BATCH_RECORDS:
+        raise IngestError(f"Batch başına en fazla {MAX_BATCH_RECORDS} kayıt gönderilebilir")
+    return records
+
+def _defender_row(r):
+    # Risk seviyesi yazılırken atanır, tetikleyici tekrar hesaplamaz.
+    # record_number göndermeyen eski istemcilerin satırları tekilleştirilmez
+    return (r['log_time'], r['source'], r['event_id'], r['description'],
+            classify(r['event_id'], r['description']), r.get('record_number'))
+
+# Sadece ekleme yapılan monitör türleri: tür -> (tablo, kolonlar, kayıt -> satır)
+# system_id kolonu her satırın başına eklenir
+APPEND_TABLES = {
+    'defender': ('defender_information',
+                 ('log_time', 'source', 'event_id', 'description', 'severity', 'record_number'),
+                 _defender_row),
+    'events': ('event_information', ('app_name', 'event_type', 'timestamp'),
+               lambda r: (r['app_name'], r['event_type'], r['timestamp'])),
+    'ports': ('port_information', ('port', 'process_name', 'pid', 'username', 'ip'),
+              lambda r: (r['port'], r['process_name'], r['pid'], r['username'], r['ip'])),
+}
+
+# tablo -> kolonlar (kuyruktan yazarken)
+TABLE_COLUMNS = {table: columns for table, columns, _make_row in APPEND_TABLES.values()}
+
+# Doğal anahtarı (benzersiz indeks) olan tablolar: aynı satır tekrar gelirse yok sayılır.
+# defender_information: (system_id, record_number, log_time), migration 7
+IDEMPOTENT_TABLES = ('defender_information',)
+
+def prepare_rows(monitor_type, payload):
+    """Batch kayıtlarını (system_id'siz) satırlara çevir; hatalıysa IngestError"""
+    _table, _columns, make_row = APPEND_TABLES[monitor_type]
+    try:
+        return [make_row(record) for record in _records(payload)]
+    except (KeyError, TypeError) as e:
+        raise IngestError(f"Eksik veya geçersiz alan: {e}") from e
+
+def insert_statement(table, columns):
+    """system_id + kolonlar için çok satırlı INSERT (executemany tek komuta çevirir)"""
+    placeholders = ", ".join(["%s"] * (len(columns) + 1))
+    statement = f"INSERT INTO {table} (system_id, {', '.join(columns)}) VALUES ({placeholders})"
+    if table in IDEMPOTENT_TABLES:
+        # INSERT IGNORE diğer hataları da uyarıya çevirdiği için kullanılmaz;
+        # değişiklik yapmayan güncelleme etkilenen satır sayısına girmez
+        statement += " ON DUPLICATE KEY UPDATE id = id"
+    return statement
+
+def _system_ids(cursor, computer_names):
+    """Bilgisayar adı -> system_id (tek sorguda)"""
+    names = list(computer_names)
+    if not names:
+        return {}
+    cursor.execute(
+        f"SELECT computer_name, system_id FROM latest_system_snapshot "
+        f"WHERE computer_name IN ({', '.join(['%s'] * len(names))})",
+        tuple(names)
+    )
+    return {name: system_id for name, system_id in cursor.fetchall() if system_id is not None}
+
+def _system_id(cursor, computer_name):
+    """Bilgisayarın system_id değeri; kayıtlı değilse UnknownComputerError"""
+    system_id = _system_ids(cursor, [computer_name]).get(computer_name)
+    if system_id is None:
+        raise UnknownComputerError(f"Bilgisayar kayıtlı değil: {computer_name}")
+    return system_id
+
+def write_rows(connection, table, columns, items):
+    """Farklı bilgisayarlardan gelen (computer_name, satır) çiftlerini tek işlemde yaz.
+
+    Yazılan ve bilgisayarı kayıtlı olmadığı için atlanan satır sayısını döndürür;
+    IDEMPOTENT_TABLES'ta daha önce yazılmış satırlar yazılan sayısına girmez.
+    """
+    cursor = connection.cursor()
+    try:
+        system_ids = _system_ids(cursor, {name for name, _row in items})
+        rows = [(system_ids[name],) + row for name, row in items if name in system_ids]
+        written = 0
+        if rows:
+            connection.start_transaction()
+            cursor.executemany(insert_statement(table, columns), rows)
+            written = cursor.rowcount if table in IDEMPOTENT_TABLES else len(rows)
+            connection.commit()
+        return written, len(items) - len(rows)
+    except Exception:
+        if connection.in_transaction:
+            connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+def _sync_rows(cursor, table, columns, system_id, incoming, current_time):
+    """Bilgisayarın satırlarını gelen listeye farkla eşitle (değişmeyen satıra dokunulmaz).
+
+    incoming: kolon değerleri demetleri; aynı demet birden fazla olabilir (ör. aynı adlı cihazlar).
+    (eklenen, silinen) sayılarını döndürür.
+    """
+    cursor.execute(
+        f"SELECT id, {', '.join(columns)} FROM {table} WHERE system_id = %s ORDER BY id", (system_id,)
+    )
+    wanted = Counter(incoming)
+    stale = []
+    for row in cursor.fetchall():
+        key = tuple(row[1:])
+        if wanted[key] > 0:
+            wanted[key] -= 1
+        else:
+            stale.append((row[0],))
+    added = [(system_id,) + key + (current_time,) for key, count in wanted.items() for _ in range(count)]
+
+    if stale:
+        cursor.executemany(f"DELETE FROM {table} WHERE id = %s", stale)
+    if added:
+        cursor.executemany(f"""
+            INSERT INTO {table}
+            (system_id, {', '.join(columns)}, created_at)
+            VALUES ({', '.join(['%s'] * (len(columns) + 2))})
+        """, added)
+    return len(added), len(stale)
+
+def _write_hardware(cursor, computer_name, payload):
+    # İstemci ağ ve cihaz listelerini sadece değiştiklerinde (veya saatlik tam gönderimde) yollar;
+    # gönderilmeyen bölüm değişmemiş kabul edilir
+    system = payload.get('system')
+    if not isinstance(system, dict):
+        raise IngestError("system alanı zorunludur")
+    networks = _records(payload, 'network') if payload.get('network') is not None else None
+    devices = _records(payload, 'devices') if payload.get('devices') is not None else None
+
+    cursor.execute("""
+        SELECT system_id, operating_system, processor, ram, disk_space, manufacturer, model
+        FROM hwd_system_information
+        WHERE computer_name = %s
+        ORDER BY created_at DESC
+        LIMIT 1
+    """, (computer_name,))
+    row = cursor.fetchone()
+    system_id = row[0] if row else int(time.time()) % 1000000
+
+    current_time = time.strftime('%Y-%m-%d %H:%M:%S')
+    values = (
+        system['operating_system'],
+        system['processor'],
+        system['ram'],
+        system['disk_space'],
+        system.get('manufacturer'),
+        system.get('model'),
+    )
+    written = 0
+    if row is None:
+        cursor.execute("""
+            INSERT INTO hwd_system_information
+            (system_id, computer_name, operating_system, processor, ram, disk_space, manufacturer, model, created_at)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, (system_id, computer_name) + values + (current_time,))
+        written += 1
+    elif tuple(row[1:]) != values:
+        cursor.execute("""
+            UPDATE hwd_system_information
+            SET operating_system = %s,
+                processor = %s,
+                ram = %s,
+                disk_space = %s,
+                manufacturer = %s,
+                model = %s,
+                created_at = %s
+            WHERE computer_name = %s
+        """, values + (current_time, computer_name))
+        written += 1
+    else:
+        # Değişiklik yok: sadece çevrimiçi durumu için son görülme zamanı ilerletilir.
+        # data_version artmaz, detay sayfası önbellekleri geçerli kalır
+        cursor.execute("""
+            UPDATE latest_system_snapshot
+            SET created_at = GREATEST(created_at, %s)
+            WHERE computer_name = %s
+        """, (current_time, computer_name))
+
+    if networks is not None:
+        added, removed = _sync_rows(
+            cursor, 'hwd_network_information', ('Ag_karti', 'IP_adress', 'mac_address'), system_id,
+            [(n['interface'], n['ip_address'], n['mac_address']) for n in networks], current_time
+        )
+        written += added + removed
+    if devices is not None:
+        added, removed = _sync_rows(
+            cursor, 'hwd_pnp_devices', ('device_name',), system_id,
+            [(d['device_name'],) for d in devices], current_time
+        )
+        written += added + removed
+
+    return {'written': written, 'changed': written > 0, 'system_id': system_id}
+
+def _write_software(cursor, computer_name, payload):
+    # Tam liste veya fark; envanter tablosu güncellenir, değişiklikler geçmişe yazılır
+    if payload.get('full_sync'):
+        _records(payload)
+    else:
+        for key in ('installed', 'updated', 'removed'):
+            _records(payload, key)
+    return software_inventory.apply_sync(cursor, _system_id(cursor, computer_name), payload)
+
+# Doğrudan (kuyruksuz) yazılan monitör türleri: tür -> (cursor, computer_name, payload) -> sonuç
+SYNC_HANDLERS = {
+    'hardware': _write_hardware,
+    'software': _write_software,
+}
+
+def write_batch(connection, monitor_type, payload):
+    """Batch'i doğrudan, tek işlemde yaz; hata olursa hiçbir kayıt yazılmaz"""
+    computer_name = payload['computer_name']
+    if monitor_type in APPEND_TABLES:
+        table, columns, _make_row = APPEND_TABLES[monitor_type]
+        rows = prepare_rows(monitor_type, payload)
+        written, skipped = write_rows(connection, table, columns, [(computer_name, row) for row in rows])
+        if skipped:
+            raise UnknownComputerError(f"Bilgisayar kayıtlı değil: {computer_name}")
+        return {'written': written}
+    handler = SYNC_HANDLERS.get(monitor_type)
+    if handler is None:
+        raise IngestError(f"Bilinmeyen monitör türü: {monitor_type}")
+
+    cursor = connection.cursor()
+    try:
+        connection.start_transaction()
+        try:
+            result = handler(cursor, computer_name, payload)
+        except (KeyError, TypeError) as e:
+            raise IngestError(f"Eksik veya geçersiz alan: {e}") from e
+        connection.commit()
+        return result
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+# Kabul edilen monitör türleri
+MONITOR_TYPES = tuple(SYNC_HANDLERS) + tuple(APPEND_TABLES)
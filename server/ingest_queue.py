@@ -0,0 +1,258 @@
+"""Sunucu içi write-behind ingest kuyruğu.
+
+/api/ingest'e gelen ekleme türündeki batch'ler (defender, events, ports)
+doğrulanıp hedef tabloya göre kuyrukta birleştirilir; arka plandaki tek yazıcı
+thread farklı istemcilerden gelen satırları tablo başına tek işlemde yazar. Bir
+tablonun bekleyen satırları flush_rows'a ulaşınca veya en eskisi flush_interval
+saniyeyi geçince yazılır. Kuyruk max_rows satırla sınırlıdır; doluysa put()
+QueueFull fırlatır ve istemciye Retry-After ile 429 döner.
+
+Geçici yazma hatalarında (bağlantı kopması, kilit zaman aşımı, deadlock) satırlar
+kuyruğa geri konur. Diğer hatalarda batch ikiye bölünerek hatalı satırlar bulunur;
+bunlar dead-letter listesine alınıp atılır, böylece tek bozuk satır tabloyu tıkamaz.
+
+Kuyruk bellektedir: kabul edilip (202) henüz yazılmamış satırlar süreç çökerse
+kaybolur. stop() bekleyenleri yazmayı dener.
+"""
+import threading
+import time
+from collections import deque
+
+# Kuyrukta bekleyebilecek en fazla satır (tüm tablolar)
+MAX_QUEUED_ROWS = 100000
+
+# Bir tablonun bu kadar satırı birikince veya en eskisi bu kadar beklediyse yazılır
+FLUSH_ROWS = 2000
+FLUSH_INTERVAL = 1.0  # saniye
+
+# Yazma hatasında tekrar denemeden önce beklenen süre (saniye)
+RETRY_DELAY = 2.0
+
+# stats() içinde gösterilen en son atılan satır sayısı
+DEAD_LETTER_LIMIT = 50
+
+class QueueFull(Exception):
+    """Kuyruk dolu; istemci retry_after saniye sonra tekrar denemeli"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Ingest kuyruğu dolu, {retry_after} saniye sonra tekrar deneyin")
+        self.retry_after = retry_after
+
+class IngestQueue:
+    """Tablo başına birleştiren, sınırlı boyutlu write-behind kuyruğu.
+
+    flush_fn(table, items) bir tablonun (anahtar, satır) listesini tek işlemde yazar ve
+    (yazılan, atlanan) sayılarını döndürür. is_transient(hata) True dönen hatalarda
+    yazılamayan satırlar kuyruğun başına geri konur ve RETRY_DELAY sonra tekrar
+    denenir; diğer hatalarda batch bölünür ve tek başına yazılamayan satırlar atılır.
+    """
+
+    def __init__(self, flush_fn, max_rows=MAX_QUEUED_ROWS, flush_rows=FLUSH_ROWS,
+                 flush_interval=FLUSH_INTERVAL, retry_delay=RETRY_DELAY, clock=time.monotonic,
+                 is_transient=lambda error: True):
+        self.flush_fn = flush_fn
+        self.is_transient = is_transient
+        self.max_rows = max_rows
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.retry_delay = retry_delay
+        self.clock = clock
+
+        # tablo -> deque((eklenme zamanı, anahtar, satır))
+        self._pending = {}
+        # Yazılmakta olanlar dahil kuyruktaki satır sayısı
+        self._depth = 0
+        self._condition = threading.Condition()
+        self._thread = None
+        self._running = False
+
+        # İstatistikler
+        self.enqueued_rows = 0
+        self.enqueued_batches = 0
+        self.rejected_batches = 0
+        self.written_rows = 0
+        self.skipped_rows = 0
+        self.flushes = 0
+        self.flush_errors = 0
+        self.flush_time_total = 0.0
+        self.flush_time_max = 0.0
+        self.last_flush_rows = 0
+        self.dead_letter_rows = 0
+        # Son atılan satırlar: (tablo, anahtar, satır, hata)
+        self.dead_letters = deque(maxlen=DEAD_LETTER_LIMIT)
+
+    def put(self, table, items):
+        """(anahtar, satır) listesini kuyruğa ekle; kuyruk doluysa QueueFull"""
+        if not items:
+            return
+        now = self.clock()
+        with self._condition:
+            if self._depth + len(items) > self.max_rows:
+                self.rejected_batches += 1
+                raise QueueFull(self._retry_after())
+            queue = self._pending.setdefault(table, deque())
+            queue.extend((now, key, row) for key, row in items)
+            self._depth += len(items)
+            self.enqueued_rows += len(items)
+            self.enqueued_batches += 1
+            if len(queue) >= self.flush_rows:
+                self._condition.notify()
+
+    def _retry_after(self):
+        # Kuyruğun yarısının boşalması için gereken tahmini süre (en az 1 saniye)
+        if not self.flushes or not self.flush_time_total:
+            return max(1, int(self.flush_interval * 2))
+        rows_per_second = self.written_rows / self.flush_time_total
+        return max(1, int(self._depth / 2 / rows_per_second) + 1) if rows_per_second else 5
+
+    def _due_table(self):
+        """Yazılma zamanı gelen tablo ve bir sonrakine kadar beklenecek süre (kilit tutulurken)"""
+        now = self.clock()
+        wait_for = self.flush_interval
+        due, due_since = None, None
+        for table, queue in self._pending.items():
+            if not queue:
+                continue
+            queued_at = queue[0][0]
+            age = now - queued_at
+            if len(queue) >= self.flush_rows or age >= self.flush_interval or not self._running:
+                # Sürekli dolan bir tablo diğerlerini bekletmesin: en eski satırı olan önce yazılır
+                if due is None or queued_at < due_since:
+                    due, due_since = table, queued_at
+            else:
+                wait_for = min(wait_for, self.flush_interval - age)
+        return due, (0 if due else wait_for)
+
+    def _take(self, table):
+        queue = self._pending[table]
+        count = min(len(queue), self.flush_rows)
+        return [queue.popleft() for _ in range(count)]
+
+    def _run(self):
+        while True:
+            with self._condition:
+                table, wait_for = self._due_table()
+                while table is None:
+                    if not self._running:
+                        return
+                    self._condition.wait(wait_for)
+                    table, wait_for = self._due_table()
+                entries = self._take(table)
+
+            if not self._flush(table, entries):
+                if not self._running:
+                    print(f"Ingest kuyruğu durduruluyor, {self.depth()} satır yazılamadı")
+                    return
+                time.sleep(self.retry_delay)
+
+    def _write(self, table, entries):
+        """Satırları yaz; veri hatası veren parçayı ikiye bölerek hatalı satırları ayıkla.
+
+        (yazılan, atlanan, yazılamayan girdiler, geçici hata) döndürür;
+        geçici hatada yazılamayan girdiler sırası korunarak döner.
+        """
+        written = skipped = 0
+        # Yığının tepesindeki parça önce yazılır, böylece sıra korunur
+        stack = [entries]
+        while stack:
+            chunk = stack.pop()
+            try:
+                chunk_written, chunk_skipped = self.flush_fn(
+                    table, [(key, row) for _queued_at, key, row in chunk])
+            except Exception as e:
+                if self.is_transient(e):
+                    remaining = list(chunk)
+                    for rest in reversed(stack):
+                        remaining.extend(rest)
+                    return written, skipped, remaining, e
+                if len(chunk) > 1:
+                    middle = len(chunk) // 2
+                    stack.append(chunk[middle:])
+                    stack.append(chunk[:middle])
+                    continue
+                _queued_at, key, row = chunk[0]
+                with self._condition:
+                    self.dead_letter_rows += 1
+                    self.dead_letters.append((table, key, row, str(e)))
+                print(f"Ingest kuyruğu: {table} için {key} satırı yazılamadı, atıldı: {e}")
+                continue
+            written += chunk_written
+            skipped += chunk_skipped
+        return written, skipped, [], None
+
+    def _flush(self, table, entries):
+        started = self.clock()
+        written, skipped, remaining, error = self._write(table, entries)
+        elapsed = self.clock() - started
+
+        with self._condition:
+            # Yazılamayanlar sıra korunarak kuyruğun başına geri konur; derinlikte kalır
+            self._pending[table].extendleft(reversed(remaining))
+            self._depth -= len(entries) - len(remaining)
+            self.written_rows += written
+            self.skipped_rows += skipped
+            if error is not None:
+                self.flush_errors += 1
+            if len(remaining) < len(entries):
+                self.flushes += 1
+                self.flush_time_total += elapsed
+                self.flush_time_max = max(self.flush_time_max, elapsed)
+                self.last_flush_rows = len(entries) - len(remaining)
+        if skipped:
+            print(f"Ingest kuyruğu: {table} için kayıtlı olmayan bilgisayarlardan {skipped} satır atlandı")
+        if error is not None:
+            print(f"Ingest kuyruğu yazılırken hata ({table}, {len(remaining)} satır tekrar denenecek): {error}")
+            return False
+        return True
+
+    def start(self):
+        """Yazıcı thread'ini (bir kez) başlat"""
+        with self._condition:
+            if self._thread and self._thread.is_alive():
+                return self._thread
+            self._running = True
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+            return self._thread
+
+    def stop(self, timeout=10):
+        """Bekleyen satırları yazmayı dene ve yazıcıyı durdur"""
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+            thread = self._thread
+        if thread:
+            thread.join(timeout)
+
+    def depth(self):
+        """Kuyruktaki (yazılmakta olanlar dahil) satır sayısı"""
+        with self._condition:
+            return self._depth
+
+    def stats(self):
+        """Kuyruk derinliği ve yazma gecikmesi sayaçları"""
+        now = self.clock()
+        with self._condition:
+            tables = {table: len(queue) for table, queue in self._pending.items() if queue}
+            oldest = min((queue[0][0] for queue in self._pending.values() if queue), default=None)
+            return {
+                'depth': self._depth,
+                'max_rows': self.max_rows,
+                'tables': tables,
+                'oldest_pending_s': round(now - oldest, 3) if oldest is not None else None,
+                'enqueued_rows': self.enqueued_rows,
+                'enqueued_batches': self.enqueued_batches,
+                'rejected_batches': self.rejected_batches,
+                'written_rows': self.written_rows,
+                'skipped_rows': self.skipped_rows,
+                'flushes': self.flushes,
+                'flush_errors': self.flush_errors,
+                'dead_letter_rows': self.dead_letter_rows,
+                'recent_dead_letters': [
+                    {'table': table, 'key': key, 'error': error}
+                    for table, key, _row, error in self.dead_letters
+                ],
+                'flush_time_avg_ms': round(self.flush_time_total / self.flushes * 1000, 3) if self.flushes else 0,
+                'flush_time_max_ms': round(self.flush_time_max * 1000, 3),
+                'last_flush_rows': self.last_flush_rows
+            }
@@ -0,0 +1,148 @@
+import threading
+import time
+
+# Sonucun taze sayıldığı süre (saniye)
+DEFAULT_TTL = 2.0
+
+# TTL dolduktan sonra arka planda yenilenirken eski sonucun sunulabileceği ek süre (saniye)
+DEFAULT_STALE_TTL = 10.0
+
+class _Entry:
+    __slots__ = ('value', 'fresh_until', 'stale_until')
+
+    def __init__(self, value, fresh_until, stale_until):
+        self.value = value
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+
+class _Flight:
+    """Devam eden tek bir yükleme; aynı anahtarı isteyenler bunun sonucunu bekler"""
+    __slots__ = ('event', 'value', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+class MicroCache:
+    """Kısa süreli sonuç önbelleği (stale-while-revalidate + single-flight).
+
+    Aynı anahtar için eşzamanlı istekler tek bir yüklemeyi paylaşır. TTL dolmuş ama
+    stale_ttl içindeki sonuç hemen döner ve arka planda yenilenir. invalidate()
+    sonrasında ilk istek yeniden yükler.
+    """
+
+    def __init__(self, ttl=DEFAULT_TTL, stale_ttl=DEFAULT_STALE_TTL, clock=time.monotonic):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.clock = clock
+        self._entries = {}
+        self._inflight = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+        # İstatistikler
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.refreshes = 0
+        self.invalidations = 0
+        self.errors = 0
+
+    def get(self, key, loader):
+        """Anahtarın değerini döndür, gerekirse loader() ile yükle"""
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and now < entry.fresh_until:
+                self.hits += 1
+                return entry.value
+            if entry and now < entry.stale_until:
+                self.stale_hits += 1
+                if key not in self._inflight:
+                    self._start_refresh(key, loader)
+                return entry.value
+
+            flight = self._inflight.get(key)
+            if flight:
+                self.coalesced += 1
+                leader = False
+            else:
+                self.misses += 1
+                flight = self._inflight[key] = _Flight()
+                leader = True
+            generation = self._generation
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+        return self._load(key, loader, flight, generation)
+
+    def _start_refresh(self, key, loader):
+        # Kilit tutulurken çağrılır
+        flight = self._inflight[key] = _Flight()
+        self.refreshes += 1
+        threading.Thread(
+            target=self._refresh, args=(key, loader, flight, self._generation), daemon=True
+        ).start()
+
+    def _refresh(self, key, loader, flight, generation):
+        try:
+            self._load(key, loader, flight, generation)
+        except Exception as e:
+            print(f"Önbellek yenilenirken hata ({key}): {e}")
+
+    def _load(self, key, loader, flight, generation):
+        try:
+            value = loader()
+        except Exception as e:
+            flight.error = e
+            with self._lock:
+                self.errors += 1
+            raise
+        else:
+            flight.value = value
+            now = self.clock()
+            with self._lock:
+                # Yükleme sürerken invalidate() çağrıldıysa sonuç saklanmaz
+                if generation == self._generation:
+                    self._entries[key] = _Entry(value, now + self.ttl, now + self.ttl + self.stale_ttl)
+            return value
+        finally:
+            with self._lock:
+                if self._inflight.get(key) is flight:
+                    del self._inflight[key]
+            flight.event.set()
+
+    def invalidate(self, key=None):
+        """Anahtarı (veya tüm önbelleği) geçersiz kıl"""
+        with self._lock:
+            # Devam eden yüklemeler eski veriyi okuyor olabilir; yeni istekler onları beklemez
+            if key is None:
+                self._entries.clear()
+                self._inflight.clear()
+            else:
+                self._entries.pop(key, None)
+                self._inflight.pop(key, None)
+            self._generation += 1
+            self.invalidations += 1
+
+    def stats(self):
+        """Önbellek sayaçları"""
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses + self.coalesced
+            return {
+                'entries': len(self._entries),
+                'in_flight': len(self._inflight),
+                'hits': self.hits,
+                'stale_hits': self.stale_hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'refreshes': self.refreshes,
+                'invalidations': self.invalidations,
+                'errors': self.errors,
+                'hit_ratio': round((self.hits + self.stale_hits + self.coalesced) / lookups, 3) if lookups else None
+            }
@@ -0,0 +1,307 @@
+"""Veritabanı şema değişiklikleri (migration).
+
+Her migration bir kez çalışır; uygulananlar schema_migrations tablosunda tutulur.
+Flask uygulaması başlarken run_migrations() çağrılır, elle çalıştırmak için:
+    python migrations.py
+"""
+import mysql.connector
+from config import DB_CONFIG
+
+import defender_severity
+import security_rollups
+import software_inventory
+
+# Aynı anda iki sürecin migration çalıştırmasını engelleyen MySQL kilidi
+MIGRATION_LOCK = "monitoring_schema_migrations"
+
+# Yarıda kalmış bir migration tekrar çalıştırılırsa yok sayılan hatalar
+# (1060: kolon zaten var, 1061: indeks zaten var)
+IGNORED_ERRORS = (1060, 1061)
+
+# (versiyon, açıklama, SQL komutları veya cursor alan fonksiyonlar) - yeni migration'lar sona eklenir,
+# eskileri değiştirilmez
+MIGRATIONS = [
+    (1, "latest_system_snapshot tablosu", [
+        """
+        CREATE TABLE IF NOT EXISTS latest_system_snapshot (
+            computer_name VARCHAR(255) NOT NULL,
+            system_id INT,
+            operating_system VARCHAR(255),
+            processor VARCHAR(255),
+            ram VARCHAR(255),
+            disk_space VARCHAR(255),
+            manufacturer VARCHAR(255),
+            model VARCHAR(255),
+            created_at DATETIME,
+            data_version BIGINT UNSIGNED NOT NULL DEFAULT 1,
+            PRIMARY KEY (computer_name)
+        ) ENGINE=InnoDB DEFAULT CHARACTER SET=utf8mb4
+        """,
+        # Hardware monitor mevcut satırı UPDATE eder, yoksa INSERT eder; iki durum da tetikleyiciyle yansır.
+        # ON DUPLICATE KEY UPDATE atamaları soldan sağa işlendiği için created_at en sonda güncellenir.
+        "DROP TRIGGER IF EXISTS trg_hwd_system_information_ai",
+        """
+        CREATE TRIGGER trg_hwd_system_information_ai
+        AFTER INSERT ON hwd_system_information
+        FOR EACH ROW
+            INSERT INTO latest_system_snapshot
+                (computer_name, system_id, operating_system, processor, ram, disk_space,
+                 manufacturer, model, created_at)
+            VALUES
+                (NEW.computer_name, NEW.system_id, NEW.operating_system, NEW.processor, NEW.ram,
+                 NEW.disk_space, NEW.manufacturer, NEW.model, NEW.created_at)
+            ON DUPLICATE KEY UPDATE
+                system_id = IF(NEW.created_at >= created_at, NEW.system_id, system_id),
+                operating_system = IF(NEW.created_at >= created_at, NEW.operating_system, operating_system),
+                processor = IF(NEW.created_at >= created_at, NEW.processor, processor),
+                ram = IF(NEW.created_at >= created_at, NEW.ram, ram),
+                disk_space = IF(NEW.created_at >= created_at, NEW.disk_space, disk_space),
+                manufacturer = IF(NEW.created_at >= created_at, NEW.manufacturer, manufacturer),
+                model = IF(NEW.created_at >= created_at, NEW.model, model),
+                data_version = IF(NEW.created_at >= created_at, data_version + 1, data_version),
+                created_at = GREATEST(created_at, NEW.created_at)
+        """,
+        "DROP TRIGGER IF EXISTS trg_hwd_system_information_au",
+        """
+        CREATE TRIGGER trg_hwd_system_information_au
+        AFTER UPDATE ON hwd_system_information
+        FOR EACH ROW
+            INSERT INTO latest_system_snapshot
+                (computer_name, system_id, operating_system, processor, ram, disk_space,
+                 manufacturer, model, created_at)
+            VALUES
+                (NEW.computer_name, NEW.system_id, NEW.operating_system, NEW.processor, NEW.ram,
+                 NEW.disk_space, NEW.manufacturer, NEW.model, NEW.created_at)
+            ON DUPLICATE KEY UPDATE
+                system_id = IF(NEW.created_at >= created_at, NEW.system_id, system_id),
+                operating_system = IF(NEW.created_at >= created_at, NEW.operating_system, operating_system),
+                processor = IF(NEW.created_at >= created_at, NEW.processor, processor),
+                ram = IF(NEW.created_at >= created_at, NEW.ram, ram),
+                disk_space = IF(NEW.created_at >= created_at, NEW.disk_space, disk_space),
+                manufacturer = IF(NEW.created_at >= created_at, NEW.manufacturer, manufacturer),
+                model = IF(NEW.created_at >= created_at, NEW.model, model),
+                data_version = IF(NEW.created_at >= created_at, data_version + 1, data_version),
+                created_at = GREATEST(created_at, NEW.created_at)
+        """,
+        # Tetikleyiciler kurulduktan sonra geçmişten doldur; bu arada gelen yeni kayıtlar ezilmez
+        """
+        INSERT INTO latest_system_snapshot
+            (computer_name, system_id, operating_system, processor, ram, disk_space,
+             manufacturer, model, created_at)
+        SELECT
+            si.computer_name, si.system_id, si.operating_system, si.processor, si.ram,
+            si.disk_space, si.manufacturer, si.model, si.created_at
+        FROM hwd_system_information si
+        INNER JOIN (
+            SELECT computer_name, MAX(created_at) as max_date
+            FROM hwd_system_information
+            GROUP BY computer_name
+        ) latest ON si.computer_name = latest.computer_name AND si.created_at = latest.max_date
+        ON DUPLICATE KEY UPDATE
+            system_id = IF(VALUES(created_at) > latest_system_snapshot.created_at, VALUES(system_id), latest_system_snapshot.system_id),
+            operating_system = IF(VALUES(created_at) > latest_system_snapshot.created_at, VALUES(operating_system), latest_system_snapshot.operating_system),
+            processor = IF(VALUES(created_at) > latest_system_snapshot.created_at, VALUES(processor), latest_system_snapshot.processor),
+            ram = IF(VALUES(created_at) > latest_system_snapshot.created_at, VALUES(ram), latest_system_snapshot.ram),
+            disk_space = IF(VALUES(created_at) > latest_system_snapshot.created_at, VALUES(disk_space), latest_system_snapshot.disk_space),
+            manufacturer = IF(VALUES(created_at) > latest_system_snapshot.created_at, VALUES(manufacturer), latest_system_snapshot.manufacturer),
+            model = IF(VALUES(created_at) > latest_system_snapshot.created_at, VALUES(model), latest_system_snapshot.model),
+            created_at = GREATEST(latest_system_snapshot.created_at, VALUES(created_at))
+        """,
+    ]),
+]
+
+# Detay sayfasında gösterilen tablolar: her değişiklik bilgisayarın data_version'ını artırır
+VERSIONED_TABLES = [
+    ('port_information', ('INSERT',)),
+    ('defender_information', ('INSERT',)),
+    ('event_information', ('INSERT',)),
+    ('software_information', ('INSERT',)),
+    ('hwd_network_information', ('INSERT', 'DELETE')),
+    ('hwd_pnp_devices', ('INSERT', 'DELETE')),
+]
+
+def _version_bump_triggers(tables=VERSIONED_TABLES):
+    """Verilen tablolar için data_version artıran tetikleyici komutları"""
+    statements = []
+    for table, events in tables:
+        for event in events:
+            row = 'OLD' if event == 'DELETE' else 'NEW'
+            name = f"trg_{table}_version_{event[0].lower()}"
+            statements.append(f"DROP TRIGGER IF EXISTS {name}")
+            statements.append(f"""
+                CREATE TRIGGER {name}
+                AFTER {event} ON {table}
+                FOR EACH ROW
+                    UPDATE latest_system_snapshot
+                    SET data_version = data_version + 1
+                    WHERE system_id = {row}.system_id
+            """)
+    return statements
+
+MIGRATIONS.append(
+    (2, "detay tabloları için data_version tetikleyicileri", [
+        "ALTER TABLE latest_system_snapshot ADD INDEX idx_latest_system_snapshot_system_id (system_id)",
+    ] + _version_bump_triggers())
+)
+
+def _rebuild_rollups(conditions=defender_severity.column_conditions):
+    """Özetleri tek işlemde baştan hesaplayan migration adımı (bkz. security_rollups.rebuild).
+
+    Migration bağlantısı autocommit'tir ve tetikleyiciler bu adımda zaten çalışır:
+    işlem dışında DELETE ile INSERT ... SELECT arasına giren bir ekleme özet
+    satırında çakışmaya veya iki kez sayılmaya yol açardı.
+    """
+    statements = security_rollups.rebuild_statements(conditions)
+
+    def rebuild(cursor):
+        cursor.execute("START TRANSACTION")
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+            cursor.execute("COMMIT")
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
+    return rebuild
+
+MIGRATIONS.append(
+    (3, "Defender güvenlik özet tabloları",
+     security_rollups.CREATE_TABLES
+     + security_rollups.rollup_triggers(defender_severity.keyword_conditions)
+     + [_rebuild_rollups(defender_severity.keyword_conditions)])
+)
+
+# Büyük tabloyu tek UPDATE ile kilitlememek için geri doldurma bu boyutta parçalarla yapılır
+BACKFILL_BATCH_SIZE = 10000
+
+def _backfill_severity(cursor):
+    """Mevcut Defender olaylarının severity değerini parça parça doldur"""
+    total = 0
+    while True:
+        cursor.execute(f"""
+            UPDATE defender_information
+            SET severity = {defender_severity.severity_case_sql('defender_information')}
+            WHERE severity IS NULL
+            LIMIT {BACKFILL_BATCH_SIZE}
+        """)
+        total += cursor.rowcount
+        if cursor.rowcount < BACKFILL_BATCH_SIZE:
+            break
+    print(f"severity geri dolduruldu: {total} satır")
+
+MIGRATIONS.append(
+    (4, "Defender olaylarına indeksli severity kolonu", [
+        "ALTER TABLE defender_information ADD COLUMN severity ENUM('high', 'medium', 'low') NULL",
+        "ALTER TABLE defender_information ADD INDEX idx_defender_information_severity (severity, created_at)",
+        # Yazılırken atanmamışsa (ör. doğrudan veritabanına yazan eski istemciler) tetikleyici atar
+        "DROP TRIGGER IF EXISTS trg_defender_information_severity_bi",
+        f"""
+        CREATE TRIGGER trg_defender_information_severity_bi
+        BEFORE INSERT ON defender_information
+        FOR EACH ROW
+            SET NEW.severity = COALESCE(NEW.severity, {defender_severity.severity_case_sql('NEW')})
+        """,
+        _backfill_severity,
+    ] + security_rollups.rollup_triggers() + [_rebuild_rollups()])
+)
+
+# Keyset sayfalanan geçmiş tabloları (bkz. history.py): (created_at, id) sırası ve bilgisayar filtresi için
+HISTORY_TABLES = ('defender_information', 'event_information', 'port_information')
+
+MIGRATIONS.append(
+    (5, "geçmiş tabloları için keyset sayfalama indeksleri", [
+        # Her indeks ayrı komut: yarıda kalmışsa var olan indeks (1061) diğerini atlatmaz
+        statement
+        for table in HISTORY_TABLES
+        for statement in (
+            f"ALTER TABLE {table} ADD INDEX idx_{table}_created_at_id (created_at, id)",
+            f"ALTER TABLE {table} ADD INDEX idx_{table}_system_created (system_id, created_at)",
+        )
+    ])
+)
+
+MIGRATIONS.append(
+    (6, "fark tabanlı yazılım envanteri (software_inventory, software_changes)",
+     software_inventory.CREATE_TABLES
+     + [software_inventory.BACKFILL_STATEMENT]
+     # Envanterdeki her değişiklik software_changes'a yazıldığı için tek tetikleyici yeterli
+     + _version_bump_triggers([('software_changes', ('INSERT',))]))
+)
+
+MIGRATIONS.append(
+    (7, "Defender olayları için kayıt numarası ve tekrar yazmayı önleyen benzersiz anahtar", [
+        "ALTER TABLE defender_information ADD COLUMN record_number BIGINT UNSIGNED NULL",
+        # Eski satırlarda record_number NULL olduğu için anahtar çakışmaz
+        "ALTER TABLE defender_information ADD UNIQUE INDEX uq_defender_information_record "
+        "(system_id, record_number, log_time)",
+    ])
+)
+
+def _ensure_migrations_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT NOT NULL,
+            description VARCHAR(255) NOT NULL,
+            applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (version)
+        ) ENGINE=InnoDB DEFAULT CHARACTER SET=utf8mb4
+    """)
+
+def applied_versions(cursor):
+    """Uygulanmış migration versiyonları"""
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cursor.fetchall()}
+
+def run_migrations(connection=None):
+    """Uygulanmamış migration'ları sırayla çalıştır, uygulanan versiyonları döndür"""
+    own_connection = connection is None
+    if own_connection:
+        connection = mysql.connector.connect(**DB_CONFIG, autocommit=True)
+
+    cursor = connection.cursor()
+    applied = []
+    try:
+        cursor.execute("SELECT GET_LOCK(%s, 60)", (MIGRATION_LOCK,))
+        if cursor.fetchone()[0] != 1:
+            raise RuntimeError("Migration kilidi alınamadı, başka bir süreç migration çalıştırıyor olabilir")
+        try:
+            _ensure_migrations_table(cursor)
+            done = applied_versions(cursor)
+            for version, description, statements in MIGRATIONS:
+                if version in done:
+                    continue
+                print(f"Migration {version} uygulanıyor: {description}")
+                # DDL MySQL'de örtük commit yapar; komutlar tekrar çalıştırılabilir yazılmıştır
+                for statement in statements:
+                    try:
+                        # Uzun veri işlemleri fonksiyon olarak verilir
+                        if callable(statement):
+                            statement(cursor)
+                        else:
+                            cursor.execute(statement)
+                    except mysql.connector.Error as err:
+                        if err.errno not in IGNORED_ERRORS:
+                            raise
+                        print(f"Migration {version}: zaten uygulanmış, atlanıyor ({err.msg})")
+                cursor.execute(
+                    "INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                    (version, description)
+                )
+                connection.commit()
+                applied.append(version)
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (MIGRATION_LOCK,))
+            cursor.fetchall()
+    finally:
+        cursor.close()
+        if own_connection:
+            connection.close()
+
+    if applied:
+        print(f"Uygulanan migration'lar: {applied}")
+    else:
+        print("Veritabanı şeması güncel")
+    return applied
+
+if __name__ == "__main__":
+    run_migrations()
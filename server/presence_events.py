@@ -0,0 +1,158 @@
+import json
+import queue
+import threading
+import time
+
+# Presence dosyalarının değişiklik için kontrol edilme aralığı (saniye)
+POLL_INTERVAL = 1.0
+
+# Olay gelmediğinde bağlantının açık kalması için gönderilen yorum satırı aralığı (saniye)
+KEEPALIVE_INTERVAL = 15
+
+# Abone kuyruğu bu kadar olayı tüketmezse abone düşürülür (tarayıcı yeniden bağlanıp snapshot alır)
+SUBSCRIBER_QUEUE_SIZE = 256
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+def format_sse(event, data):
+    """Tek bir Server-Sent Events mesajı oluştur"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+class PresenceBroadcaster:
+    """Presence dosyalarını tek bir thread'de izler, durum değişikliklerini abonelere dağıtır.
+
+    Açık sekme sayısı ne olursa olsun presence dosyaları saniyede en fazla bir kez
+    okunur; her abone sadece değişen satırları alır.
+    """
+
+    def __init__(self, load_fn, status_fn, interval=POLL_INTERVAL):
+        self.load_fn = load_fn
+        self.status_fn = status_fn
+        self.interval = interval
+        self._rows = {}
+        self._subscribers = set()
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._thread = None
+
+        # İstatistikler
+        self.published = 0
+        self.dropped = 0
+
+    def _current_rows(self):
+        rows = {}
+        for name, connection in self.load_fn().items():
+            rows[name] = {
+                'computer_name': name,
+                'status': self.status_fn(connection),
+                'last_update': _isoformat(connection.get('last_seen'))
+            }
+        return rows
+
+    def poll(self):
+        """Presence durumunu bir kez oku ve değişen satırları abonelere gönder"""
+        rows = self._current_rows()
+        with self._lock:
+            # Sadece durum değişimleri yayınlanır; her heartbeat'te değişen last_update tek başına
+            # olay üretmez, aksi halde büyük filolarda her saniye binlerce satır gönderilirdi
+            changed = []
+            for name, row in rows.items():
+                previous = self._rows.get(name)
+                if previous is None or previous['status'] != row['status']:
+                    changed.append(row)
+            # Temizlenen (purge) kayıtlar çevrimdışı olarak bildirilir
+            for name, row in self._rows.items():
+                if name not in rows and row['status'] != 'KAPALI':
+                    changed.append(dict(row, status='KAPALI'))
+            self._rows = rows
+
+            if changed:
+                self._publish('presence', changed)
+
+        for listener in self._listeners if changed else ():
+            try:
+                listener(changed)
+            except Exception as e:
+                print(f"Presence dinleyicisi hatası: {e}")
+        return changed
+
+    def add_listener(self, listener):
+        """Durum değiştiğinde değişen satırlarla çağrılacak fonksiyonu ekle (ör. önbellek temizleme)"""
+        self._listeners.append(listener)
+
+    def _publish(self, event, data):
+        for subscriber in list(self._subscribers):
+            try:
+                subscriber.put_nowait((event, data))
+            except queue.Full:
+                # Yavaş abone tüm yayını bekletmesin
+                self._subscribers.discard(subscriber)
+                self.dropped += 1
+                try:
+                    subscriber.get_nowait()
+                    subscriber.put_nowait((None, None))
+                except (queue.Empty, queue.Full):
+                    pass
+        self.published += 1
+
+    def snapshot(self):
+        """Yeni abonenin ilk olarak alacağı tüm satırlar"""
+        with self._lock:
+            return list(self._rows.values())
+
+    def subscribe(self):
+        """Yeni bir abone kuyruğu oluştur (izleme thread'i gerekirse başlatılır)"""
+        self.start()
+        subscriber = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def stream(self, subscriber):
+        """Abone kuyruğundan SSE metnini üreten generator"""
+        try:
+            yield "retry: 3000\n\n"
+            yield format_sse('snapshot', self.snapshot())
+            while True:
+                try:
+                    event, data = subscriber.get(timeout=KEEPALIVE_INTERVAL)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                if event is None:
+                    # Abone düşürüldü, tarayıcı yeniden bağlanıp güncel snapshot'ı alacak
+                    break
+                yield format_sse(event, data)
+        finally:
+            self.unsubscribe(subscriber)
+
+    def _run(self):
+        while True:
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"Presence değişiklikleri okunurken hata: {e}")
+            time.sleep(self.interval)
+
+    def start(self):
+        """İzleme thread'ini (bir kez) başlat"""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return self._thread
+            # İlk snapshot thread'den önce alınır ki ilk abone boş liste görmesin
+            try:
+                self._rows = self._current_rows()
+            except Exception as e:
+                print(f"Presence durumu okunurken hata: {e}")
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+            return self._thread
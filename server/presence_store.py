@@ -0,0 +1,298 @@
+import glob
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from datetime import datetime
+
+# Varsayılan dosyalar (socket_server.py ve app.py aynı dizinden çalışır)
+CONNECTION_FILE = "active_connections.json"
+PRESENCE_MMAP_FILE = "active_connections.dat"
+
+# Anlık görüntünün diske yazılma aralığı (saniye)
+FLUSH_INTERVAL = 1.0
+
+# Sabit kayıtlı dosya düzeni:
+#   başlık : magic, versiyon, slot sayısı, kayıt boyutu, kayıt sayısı, oluşturulma zamanı
+#   kayıt  : durum (0 boş, 1 AÇIK, 2 KAPALI), bilgisayar adı, son görülme (epoch), adres
+# Slotlar bilgisayar adının crc32 değerine göre açık adresleme (linear probing) ile yerleşir,
+# böylece tek bir bilgisayar JSON ayrıştırmadan O(1) bulunur.
+MMAP_MAGIC = b"PRESNC01"
+MMAP_VERSION = 2
+HEADER = struct.Struct("<8sIIIId")
+RECORD = struct.Struct("<B64sd47s")
+NAME_SIZE = 64
+ADDRESS_SIZE = 47
+MIN_SLOTS = 64
+
+# Socket sunucusunun yazdığı hazır durum değerleri
+STATUS_ONLINE = 'AÇIK'
+STATUS_OFFLINE = 'KAPALI'
+_STATUS_CODES = {STATUS_ONLINE: 1, STATUS_OFFLINE: 2}
+_STATUS_NAMES = {1: STATUS_ONLINE, 2: STATUS_OFFLINE}
+
+def _slot_count(record_count):
+    """Doluluk oranı %50'nin altında kalacak şekilde 2'nin kuvveti slot sayısı"""
+    slots = MIN_SLOTS
+    while slots < record_count * 2:
+        slots *= 2
+    return slots
+
+def _encode_name(computer_name):
+    return computer_name.encode("utf-8")[:NAME_SIZE]
+
+def _slot_of(encoded_name, slots):
+    return zlib.crc32(encoded_name) & (slots - 1)
+
+def _atomic_write(path, data):
+    """Geçici dosyaya yaz ve rename et - okuyucular ya eski ya yeni dosyayı görür"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".presence-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        # Windows'ta okuyucu dosyayı o an açık tutuyorsa rename kısa süreli başarısız olabilir
+        for attempt in range(5):
+            try:
+                os.replace(tmp_path, path)
+                return
+            except PermissionError:
+                if attempt == 4:
+                    raise
+                time.sleep(0.01)
+    except Exception:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+def build_mmap_image(clients):
+    """{isim: {'last_seen': datetime, 'address': ..., 'status': ...}} sözlüğünden sabit kayıtlı dosya içeriği üret"""
+    slots = _slot_count(len(clients))
+    buffer = bytearray(HEADER.size + slots * RECORD.size)
+    HEADER.pack_into(buffer, 0, MMAP_MAGIC, MMAP_VERSION, slots, RECORD.size, len(clients), time.time())
+
+    for name, data in clients.items():
+        encoded = _encode_name(name)
+        slot = _slot_of(encoded, slots)
+        while buffer[HEADER.size + slot * RECORD.size]:
+            slot = (slot + 1) & (slots - 1)
+        RECORD.pack_into(
+            buffer,
+            HEADER.size + slot * RECORD.size,
+            _STATUS_CODES.get(data.get('status'), 1),
+            encoded,
+            data['last_seen'].timestamp(),
+            str(data['address']).encode("utf-8")[:ADDRESS_SIZE]
+        )
+    return bytes(buffer)
+
+def shard_path(path, index):
+    """Shard worker'ının presence dosyası: active_connections.json -> active_connections.shard-0.json"""
+    root, ext = os.path.splitext(path)
+    return f"{root}.shard-{index}{ext}"
+
+def presence_files(path):
+    """Ana dosya ve varsa shard dosyaları (var olanlar)"""
+    root, ext = os.path.splitext(path)
+    paths = [path] + sorted(glob.glob(f"{glob.escape(root)}.shard-*{ext}"))
+    return [p for p in paths if os.path.exists(p)]
+
+def remove_shard_files(path):
+    """Önceki çalıştırmalardan kalan shard dosyalarını sil"""
+    root, ext = os.path.splitext(path)
+    for shard in glob.glob(f"{glob.escape(root)}.shard-*{ext}"):
+        try:
+            os.remove(shard)
+        except OSError:
+            pass
+
+def merge_records(current, candidate):
+    """Aynı bilgisayar birden fazla shard'da görünürse tercih edilecek kaydı seç.
+
+    Yeniden bağlanan istemci başka bir worker'a düşmüş olabilir: AÇIK kayıt KAPALI'ya,
+    eşitlikte son görülme zamanı daha yeni olan tercih edilir.
+    """
+    if current is None:
+        return candidate
+    if candidate is None:
+        return current
+    current_online = current.get('status', STATUS_ONLINE) == STATUS_ONLINE
+    candidate_online = candidate.get('status', STATUS_ONLINE) == STATUS_ONLINE
+    if current_online != candidate_online:
+        return current if current_online else candidate
+    return candidate if candidate['last_seen'] > current['last_seen'] else current
+
+class PresenceStore:
+    """Bağlantı anlık görüntüsünü kirli (dirty) bayrağıyla sınırlı hızda diske yazar.
+
+    Heartbeat'ler sadece mark_dirty() çağırır; diske yazma en fazla flush_interval
+    saniyede bir, arka plan thread'inde yapılır.
+    """
+
+    def __init__(self, snapshot_fn, json_path=CONNECTION_FILE, mmap_path=PRESENCE_MMAP_FILE,
+                 flush_interval=FLUSH_INTERVAL):
+        self.snapshot_fn = snapshot_fn
+        self.json_path = json_path
+        self.mmap_path = mmap_path
+        self.flush_interval = flush_interval
+        self._dirty = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        # İstatistikler
+        self.flush_count = 0
+        self.last_flush = None
+
+    def mark_dirty(self):
+        """Anlık görüntünün yeniden yazılması gerektiğini işaretle"""
+        self._dirty.set()
+
+    def flush(self, force=False):
+        """Değişiklik varsa (veya force ise) JSON ve mmap dosyalarını atomik olarak yaz"""
+        with self._flush_lock:
+            if not force and not self._dirty.is_set():
+                return False
+            self._dirty.clear()
+
+            clients = self.snapshot_fn()
+            serializable_data = {}
+            for name, data in clients.items():
+                serializable_data[name] = {
+                    'last_seen': data['last_seen'].isoformat(),
+                    'address': str(data['address'])
+                }
+                if 'status' in data:
+                    serializable_data[name]['status'] = data['status']
+                if data.get('status_changed'):
+                    serializable_data[name]['status_changed'] = data['status_changed'].isoformat()
+
+            _atomic_write(self.json_path, json.dumps(serializable_data).encode("utf-8"))
+            if self.mmap_path:
+                _atomic_write(self.mmap_path, build_mmap_image(clients))
+
+            self.flush_count += 1
+            self.last_flush = datetime.now()
+            return True
+
+    def _run(self):
+        while not self._stop_event.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Bağlantı anlık görüntüsü yazılırken hata: {e}")
+
+    def start(self):
+        """Arka plan yazma thread'ini başlat"""
+        if self._thread and self._thread.is_alive():
+            return self._thread
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self):
+        """Yazma thread'ini durdur ve son durumu diske yaz"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        self.flush(force=True)
+
+class MappedPresenceFile:
+    """Tek bir sabit kayıtlı presence dosyasından bilgisayar arar"""
+
+    def __init__(self, mmap_path=PRESENCE_MMAP_FILE):
+        self.mmap_path = mmap_path
+        self._mapping = None
+        self._file_key = None
+        self._lock = threading.Lock()
+
+    def _open(self):
+        """Dosyayı eşle; POSIX'te dosya değişmediği sürece eşlemeyi yeniden kullan"""
+        st = os.stat(self.mmap_path)
+        key = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if self._mapping is not None and key == self._file_key:
+            return self._mapping
+
+        with open(self.mmap_path, "rb") as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        # Windows'ta açık eşleme rename'i engeller, bu yüzden orada önbelleğe almıyoruz
+        if os.name != "nt":
+            if self._mapping is not None:
+                self._mapping.close()
+            self._mapping = mapping
+            self._file_key = key
+        return mapping
+
+    def _release(self, mapping):
+        if mapping is not self._mapping:
+            mapping.close()
+
+    def lookup(self, computer_name):
+        """Bilgisayarın kaydını döndür, yoksa None"""
+        with self._lock:
+            try:
+                mapping = self._open()
+            except FileNotFoundError:
+                return None
+            try:
+                magic, version, slots, record_size, count, generated_at = HEADER.unpack_from(mapping, 0)
+                if magic != MMAP_MAGIC or version != MMAP_VERSION or record_size != RECORD.size:
+                    return None
+
+                encoded = _encode_name(computer_name)
+                slot = _slot_of(encoded, slots)
+                for _ in range(slots):
+                    status, name, last_seen, address = RECORD.unpack_from(mapping, HEADER.size + slot * RECORD.size)
+                    if not status:
+                        return None
+                    if name.rstrip(b"\0") == encoded:
+                        return {
+                            'last_seen': datetime.fromtimestamp(last_seen),
+                            'address': address.rstrip(b"\0").decode("utf-8", "replace"),
+                            'status': _STATUS_NAMES.get(status, STATUS_ONLINE),
+                            'snapshot_time': datetime.fromtimestamp(generated_at)
+                        }
+                    slot = (slot + 1) & (slots - 1)
+                return None
+            finally:
+                self._release(mapping)
+
+class PresenceReader:
+    """Ana ve shard presence dosyalarından tek bir bilgisayarın durumunu okur (Flask tarafı)"""
+
+    def __init__(self, mmap_path=PRESENCE_MMAP_FILE):
+        self.mmap_path = mmap_path
+        self._files = {}
+        self._paths = []
+        self._paths_checked = 0
+        self._lock = threading.Lock()
+
+    def _current_paths(self):
+        # Shard listesi saniyede en fazla bir kez taranır
+        with self._lock:
+            now = time.monotonic()
+            if now - self._paths_checked >= 1.0:
+                self._paths = presence_files(self.mmap_path)
+                self._paths_checked = now
+                for path in list(self._files):
+                    if path not in self._paths:
+                        del self._files[path]
+                for path in self._paths:
+                    if path not in self._files:
+                        self._files[path] = MappedPresenceFile(path)
+            return [self._files[path] for path in self._paths]
+
+    def lookup(self, computer_name):
+        """Bilgisayarın birleştirilmiş kaydını döndür, yoksa None"""
+        result = None
+        for presence_file in self._current_paths():
+            result = merge_records(result, presence_file.lookup(computer_name))
+        return result
@@ -7,7 +7,7 @@ echo -------------------------------------------------
 echo.
 
 echo Soket sunucusu başlatılıyor...
-start "Socket Server - Port 5002" cmd /k "python socket_server.py"
+start "Socket Server - Port 5002" cmd /k "python socket_server.py --mode asyncio"
 
 echo Flask web uygulaması başlatılıyor...
 python app.py
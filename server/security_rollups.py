@@ -0,0 +1,181 @@
+"""Güvenlik sayfası için önceden hesaplanmış Defender özet tabloları.
+
+defender_information'a her ekleme/silme tetikleyicilerle özet tablolarına yansır
+(risk seviyesi severity kolonundan okunur, bkz. defender_severity.py):
+    security_totals           : toplam olay ve yüksek öncelikli olay sayısı (tek satır)
+    security_daily_counts     : günlük olay sayısı
+    security_event_id_counts  : event_id başına olay sayısı
+    security_system_counts    : bilgisayar (system_id) başına toplam/yüksek/orta/düşük olay sayısı
+
+Özetler bozulursa veya tetikleyiciler sonradan kurulduysa baştan hesaplamak için:
+    python security_rollups.py --rebuild
+"""
+import argparse
+
+import mysql.connector
+from config import DB_CONFIG
+
+from defender_severity import column_conditions
+
+ROLLUP_TABLES = (
+    'security_totals',
+    'security_daily_counts',
+    'security_event_id_counts',
+    'security_system_counts',
+)
+
+CREATE_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS security_totals (
+        id TINYINT NOT NULL,
+        total_events BIGINT NOT NULL DEFAULT 0,
+        high_events BIGINT NOT NULL DEFAULT 0,
+        PRIMARY KEY (id)
+    ) ENGINE=InnoDB
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS security_daily_counts (
+        event_date DATE NOT NULL,
+        event_count BIGINT NOT NULL DEFAULT 0,
+        PRIMARY KEY (event_date)
+    ) ENGINE=InnoDB
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS security_event_id_counts (
+        event_id INT NOT NULL,
+        event_count BIGINT NOT NULL DEFAULT 0,
+        PRIMARY KEY (event_id),
+        KEY idx_security_event_id_counts_count (event_count)
+    ) ENGINE=InnoDB
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS security_system_counts (
+        system_id INT NOT NULL,
+        total_events BIGINT NOT NULL DEFAULT 0,
+        high_events BIGINT NOT NULL DEFAULT 0,
+        medium_events BIGINT NOT NULL DEFAULT 0,
+        low_events BIGINT NOT NULL DEFAULT 0,
+        PRIMARY KEY (system_id)
+    ) ENGINE=InnoDB
+    """,
+]
+
+def _rollup_trigger(event, conditions):
+    """Ekleme (+1) veya silme (-1) için özetleri güncelleyen tetikleyici"""
+    row, sign = ('NEW', '+') if event == 'INSERT' else ('OLD', '-')
+    high, medium, low = conditions(row)
+    name = f"trg_defender_information_rollup_{event[0].lower()}"
+    return [
+        f"DROP TRIGGER IF EXISTS {name}",
+        f"""
+        CREATE TRIGGER {name}
+        AFTER {event} ON defender_information
+        FOR EACH ROW
+        BEGIN
+            DECLARE is_high, is_medium, is_low INT DEFAULT 0;
+            SET is_high = {high};
+            SET is_medium = {medium};
+            SET is_low = {low};
+
+            INSERT INTO security_totals (id, total_events, high_events)
+            VALUES (1, {sign}1, {sign}is_high)
+            ON DUPLICATE KEY UPDATE
+                total_events = total_events {sign} 1,
+                high_events = high_events {sign} is_high;
+
+            INSERT INTO security_daily_counts (event_date, event_count)
+            VALUES (DATE({row}.created_at), {sign}1)
+            ON DUPLICATE KEY UPDATE event_count = event_count {sign} 1;
+
+            INSERT INTO security_event_id_counts (event_id, event_count)
+            VALUES ({row}.event_id, {sign}1)
+            ON DUPLICATE KEY UPDATE event_count = event_count {sign} 1;
+
+            IF {row}.system_id IS NOT NULL THEN
+                INSERT INTO security_system_counts
+                    (system_id, total_events, high_events, medium_events, low_events)
+                VALUES ({row}.system_id, {sign}1, {sign}is_high, {sign}is_medium, {sign}is_low)
+                ON DUPLICATE KEY UPDATE
+                    total_events = total_events {sign} 1,
+                    high_events = high_events {sign} is_high,
+                    medium_events = medium_events {sign} is_medium,
+                    low_events = low_events {sign} is_low;
+            END IF;
+        END
+        """,
+    ]
+
+def rollup_triggers(conditions=column_conditions):
+    """Ekleme ve silme tetikleyicileri; conditions(row) -> (yüksek, orta, düşük) SQL ifadeleri"""
+    return _rollup_trigger('INSERT', conditions) + _rollup_trigger('DELETE', conditions)
+
+def rebuild_statements(conditions=column_conditions):
+    """Özetleri defender_information'dan baştan hesaplayan komutlar (tek işlemde çalışır)"""
+    high, medium, low = conditions('di')
+    return [f"DELETE FROM {table}" for table in ROLLUP_TABLES] + [
+        f"""
+        INSERT INTO security_totals (id, total_events, high_events)
+        SELECT 1, COUNT(*), COALESCE(SUM({high}), 0)
+        FROM defender_information di
+        """,
+        """
+        INSERT INTO security_daily_counts (event_date, event_count)
+        SELECT DATE(created_at), COUNT(*)
+        FROM defender_information
+        GROUP BY DATE(created_at)
+        """,
+        """
+        INSERT INTO security_event_id_counts (event_id, event_count)
+        SELECT event_id, COUNT(*)
+        FROM defender_information
+        GROUP BY event_id
+        """,
+        f"""
+        INSERT INTO security_system_counts (system_id, total_events, high_events, medium_events, low_events)
+        SELECT
+            di.system_id,
+            COUNT(*),
+            SUM({high}),
+            SUM({medium}),
+            SUM({low})
+        FROM defender_information di
+        WHERE di.system_id IS NOT NULL
+        GROUP BY di.system_id
+        """,
+    ]
+
+def rebuild(connection):
+    """Özet tablolarını tek bir işlemde baştan hesapla.
+
+    INSERT ... SELECT defender_information satırlarını kilitlediği için bu sırada gelen
+    eklemeler işlem bitene kadar bekler ve özetlere sonradan (bir kez) eklenir.
+    """
+    cursor = connection.cursor()
+    try:
+        connection.start_transaction()
+        for statement in rebuild_statements():
+            cursor.execute(statement)
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Defender güvenlik özet tabloları")
+    parser.add_argument("--rebuild", action="store_true", help="özetleri defender_information'dan baştan hesapla")
+    args = parser.parse_args(argv)
+    if not args.rebuild:
+        parser.print_help()
+        return
+
+    connection = mysql.connector.connect(**DB_CONFIG)
+    try:
+        rebuild(connection)
+        print("Güvenlik özetleri yeniden hesaplandı")
+    finally:
+        connection.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,83 +1,240 @@
-
-
 import socket
 import threading
-import json
+import asyncio
 import time
 from datetime import datetime
 import os
+import sys
+import signal
+import multiprocessing
+from presence_store import (
+    PresenceStore, STATUS_ONLINE, STATUS_OFFLINE, PRESENCE_MMAP_FILE,
+    shard_path, remove_shard_files
+)
+from heartbeat_protocol import HeartbeatSession, ProtocolError
+from timer_wheel import TimerWheel
 
 # Bağlantı kaydı için dosya
 CONNECTION_FILE = "active_connections.json"
 
+# Sunucu ayarları
+SERVER_HOST = '0.0.0.0'
+SERVER_PORT = 5002
+LISTEN_BACKLOG = 1024      # Bağlantı fırtınalarında SYN kuyruğunun taşmaması için
+
+# Sunucu modu: "thread" (istemci başına bir thread) veya "asyncio" (tek event loop)
+SERVER_MODE = "thread"
+
+# 1'den büyükse aynı portu SO_REUSEPORT ile dinleyen bu kadar asyncio worker süreci başlatılır
+SHARD_WORKERS = 1
+
+# Canlılık ayarları: MISSED_HEARTBEATS kadar heartbeat kaçıran istemci KAPALI sayılır
+HEARTBEAT_INTERVAL = 5          # istemcilerin heartbeat aralığı (saniye)
+MISSED_HEARTBEATS = 6           # 6 x 5 sn = 30 sn (app.py'deki eski eşikle aynı)
+LIVENESS_TIMEOUT = HEARTBEAT_INTERVAL * MISSED_HEARTBEATS
+LIVENESS_TICK = 1.0             # zamanlayıcı çarkının tik süresi (saniye)
+OFFLINE_RETENTION = 24 * 3600   # KAPALI kayıtlar presence dosyasında bu kadar tutulur
+
 # Global değişkenler
 connected_clients = {}
+offline_clients = {}            # bağlantısı kopan/süresi dolan istemciler (son durumları)
 client_lock = threading.Lock()
 running = True
 
+# Shard modunda ana sürecin yönettiği worker'lar
+shard_processes = []
+shard_stop_event = None
+
+# Shard worker'ı ana sürecin hâlâ yaşadığını bu aralıkla kontrol eder (saniye)
+PARENT_CHECK_INTERVAL = 1.0
+
+# Canlılık ve KAPALI kayıt temizliği için zamanlayıcı çarkı (client_lock altında kullanılır)
+liveness_wheel = TimerWheel(tick=LIVENESS_TICK, slots=64)
+
+# Durum değişikliği dinleyicileri: fn(computer_name, status, changed_at)
+transition_listeners = []
+
+def _snapshot_clients():
+    """Açık ve kapalı istemcilerin kilit altında alınmış, durumu hazır kopyası"""
+    with client_lock:
+        snapshot = {}
+        for name, data in offline_clients.items():
+            snapshot[name] = dict(data, status=STATUS_OFFLINE)
+        for name, data in connected_clients.items():
+            snapshot[name] = dict(data, status=STATUS_ONLINE)
+        return snapshot
+
+# Heartbeat'ler sadece kirli bayrağını işaretler, dosyalar en fazla FLUSH_INTERVAL'de bir yazılır
+presence_store = PresenceStore(_snapshot_clients, json_path=CONNECTION_FILE)
+
 def save_connections():
-    """Bağlantıları JSON olarak kaydet"""
+    """Bağlantıları hemen JSON (ve sabit kayıtlı dosya) olarak kaydet"""
     try:
-        with client_lock:
-            # Datetime'ları string'e çevir
-            serializable_data = {}
-            for name, data in connected_clients.items():
-                serializable_data[name] = {
-                    'last_seen': data['last_seen'].isoformat(),
-                    'address': str(data['address'])
-                }
-            
-            # JSON olarak kaydet
-            with open(CONNECTION_FILE, 'w') as f:
-                json.dump(serializable_data, f)
-                
-            print(f"Bağlantılar {CONNECTION_FILE} dosyasına kaydedildi: {len(connected_clients)} client")
+        presence_store.flush(force=True)
+        print(f"Bağlantılar {CONNECTION_FILE} dosyasına kaydedildi: {len(connected_clients)} client")
     except Exception as e:
         print(f"Bağlantılar kaydedilirken hata: {e}")
 
+def _log_transition(computer_name, status, changed_at):
+    print(f"Durum değişikliği: {computer_name} -> {status} ({changed_at.isoformat()})")
+
+transition_listeners.append(_log_transition)
+
+def _emit_transitions(transitions):
+    """Durum değişikliklerini dinleyicilere bildir (kilit dışında çağrılmalı)"""
+    for computer_name, status, changed_at in transitions:
+        for listener in transition_listeners:
+            try:
+                listener(computer_name, status, changed_at)
+            except Exception as e:
+                print(f"Durum dinleyicisi hatası: {e}")
+
+def _mark_offline(computer_name, client, now):
+    """client_lock altında: istemciyi KAPALI kayıtlarına taşı"""
+    liveness_wheel.cancel(('liveness', computer_name))
+    offline_clients[computer_name] = {
+        'last_seen': client['last_seen'],
+        'address': client['address'],
+        'status_changed': now
+    }
+    liveness_wheel.schedule(('purge', computer_name), OFFLINE_RETENTION)
+
+def register_client(computer_name, address, close=None):
+    """Yeni bağlantıyı connected_clients sözlüğüne ekle.
+
+    close: süresi dolduğunda bağlantıyı kapatmak için çağrılacak fonksiyon
+    """
+    now = datetime.now()
+    with client_lock:
+        was_online = computer_name in connected_clients
+        offline_clients.pop(computer_name, None)
+        liveness_wheel.cancel(('purge', computer_name))
+        connected_clients[computer_name] = {
+            'last_seen': now,
+            'address': address,
+            'status_changed': connected_clients[computer_name]['status_changed'] if was_online else now,
+            'close': close
+        }
+        liveness_wheel.schedule(('liveness', computer_name), LIVENESS_TIMEOUT)
+        # Bağlı client sayısını logla
+        print(f"Aktif bağlantılar: {len(connected_clients)}")
+    
+    if not was_online:
+        _emit_transitions([(computer_name, STATUS_ONLINE, now)])
+    presence_store.mark_dirty()
+
+def touch_client(computer_name):
+    """Heartbeat alınan istemcinin son görülme zamanını güncelle"""
+    with client_lock:
+        client = connected_clients.get(computer_name)
+        if client is None:
+            return None
+        client['last_seen'] = datetime.now()
+        last_seen = client['last_seen']
+        liveness_wheel.schedule(('liveness', computer_name), LIVENESS_TIMEOUT)
+    
+    presence_store.mark_dirty()
+    return last_seen
+
+def unregister_client(computer_name, close=None):
+    """Kopan istemciyi connected_clients sözlüğünden çıkar.
+
+    close verilirse kayıt sadece aynı bağlantıya aitse silinir; böylece eski bağlantının
+    kapanması aynı isimle yeniden bağlanmış istemciyi silmez.
+    """
+    now = datetime.now()
+    with client_lock:
+        client = connected_clients.get(computer_name)
+        if client is None or (close is not None and client.get('close') is not close):
+            return
+        del connected_clients[computer_name]
+        _mark_offline(computer_name, client, now)
+        print(f"Client kaldırıldı: {computer_name}")
+        print(f"Aktif bağlantılar: {len(connected_clients)}")
+    
+    _emit_transitions([(computer_name, STATUS_OFFLINE, now)])
+    presence_store.mark_dirty()
+
+def expire_clients(now=None):
+    """Zamanlayıcı çarkını ilerlet: heartbeat'i kesilen istemcileri KAPALI yap, eski kayıtları temizle"""
+    expired = []
+    transitions = []
+    with client_lock:
+        for kind, computer_name in liveness_wheel.advance(now):
+            if kind == 'purge':
+                offline_clients.pop(computer_name, None)
+                continue
+            client = connected_clients.pop(computer_name, None)
+            if client is None:
+                continue
+            changed_at = datetime.now()
+            _mark_offline(computer_name, client, changed_at)
+            expired.append((computer_name, client.get('close')))
+            transitions.append((computer_name, STATUS_OFFLINE, changed_at))
+    
+    if not expired and not transitions:
+        return []
+    
+    # Ölü TCP bağlantılarını kapat (recv'de bekleyen handler'lar böylece sonlanır)
+    for computer_name, close in expired:
+        print(f"Heartbeat zaman aşımı ({LIVENESS_TIMEOUT} sn): {computer_name}")
+        if close:
+            try:
+                close()
+            except Exception as e:
+                print(f"Bağlantı kapatılırken hata ({computer_name}): {e}")
+    
+    _emit_transitions(transitions)
+    presence_store.mark_dirty()
+    return [name for name, _ in expired]
+
+def _liveness_loop():
+    """Thread modunda zamanlayıcı çarkını tik aralığıyla ilerlet"""
+    while running:
+        time.sleep(LIVENESS_TICK)
+        expire_clients()
+
+def _on_session_data(session, computer_name, address, close):
+    """Gelen veri işlendikten sonra kayıt/son görülme güncellemesi; güncel adı döndürür"""
+    if computer_name is None:
+        if session.computer_name:
+            print(f"Yeni bağlantı: {session.computer_name} from {address}")
+            register_client(session.computer_name, address, close)
+        return session.computer_name
+    touch_client(computer_name)
+    return computer_name
+
 def handle_client(client_socket, address):
     """İstemci bağlantısını yönet"""
     computer_name = None  # İsim değişkeni tanımla
+    session = HeartbeatSession()
+    
+    def close_connection():
+        # Başka bir thread'den çağrılır: recv'de bekleyen handler'ı uyandırır
+        try:
+            client_socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+    
     try:
-        data = client_socket.recv(1024).decode()
-        computer_name = data.strip()
-        print(f"Yeni bağlantı: {computer_name} from {address}")
-        
-        # Bağlantı onayı gönder
-        client_socket.send("CONNECTED".encode())
-        
-        # Global sözlüğü kilitle ve güncelle
-        with client_lock:
-            connected_clients[computer_name] = {
-                'last_seen': datetime.now(),
-                'address': address
-            }
-            # Bağlı client sayısını ve listesini logla
-            print(f"Aktif bağlantılar ({len(connected_clients)}): {list(connected_clients.keys())}")
-        
-        # Bağlantıları kaydet
-        save_connections()
-        
         while running:
             try:
-                data = client_socket.recv(1024)
+                data = client_socket.recv(4096)
                 if not data:  # Bağlantı koptu
                     raise Exception("Bağlantı kapandı")
                 
-                # Heartbeat yanıtı
-                message = data.decode().strip()
-                print(f"Client mesajı alındı: {computer_name} -> {message}")
-                if message == "HEARTBEAT":
-                    client_socket.send("ALIVE".encode())
-                    print(f"ALIVE yanıtı gönderildi: {computer_name}")
+                # Çerçeveli ve eski protokol için yanıtlar (CONNECTED / ALIVE)
+                reply = session.receive(data)
+                if reply:
+                    client_socket.sendall(reply)
                 
-                with client_lock:
-                    connected_clients[computer_name]['last_seen'] = datetime.now()
-                    print(f"Son görülme zamanı güncellendi: {computer_name} -> {connected_clients[computer_name]['last_seen']}")
-                
-                # Her heartbeat güncellemesinde dosyayı güncelle
-                save_connections()
+                computer_name = _on_session_data(session, computer_name, address, close_connection)
+                if computer_name == "":
+                    break
                     
+            except ProtocolError as e:
+                print(f"Geçersiz mesaj, bağlantı kapatılıyor ({address}): {e}")
+                break
             except Exception as e:
                 print(f"Client {computer_name} bağlantısı koptu: {e}")
                 break
@@ -87,14 +244,7 @@ def handle_client(client_socket, address):
     finally:
         client_socket.close()
         if computer_name:  # Eğer bilgisayar adı tanımlanmışsa
-            with client_lock:
-                if computer_name in connected_clients:
-                    del connected_clients[computer_name]
-                    print(f"Client kaldırıldı: {computer_name}")
-                    print(f"Aktif bağlantılar ({len(connected_clients)}): {list(connected_clients.keys())}")
-            
-            # Bağlantı değişikliklerini kaydet
-            save_connections()
+            unregister_client(computer_name, close_connection)
                     
         print(f"Bağlantı kapatıldı: {address}")
 
@@ -104,9 +254,11 @@ def start_socket_server():
     server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)  # Port yeniden kullanımına izin ver
     
     try:
-        server.bind(('0.0.0.0', 5002))
-        server.listen()
-        print("Soket sunucusu başlatıldı, port: 5002")
+        server.bind((SERVER_HOST, SERVER_PORT))
+        server.listen(LISTEN_BACKLOG)
+        print(f"Soket sunucusu başlatıldı, port: {SERVER_PORT}")
+        presence_store.start()
+        threading.Thread(target=_liveness_loop, daemon=True).start()
         
         # Server'ı bloklama olmadan kapatabilmek için timeout
         server.settimeout(1)
@@ -137,36 +289,231 @@ def start_socket_server():
         except:
             pass
 
+async def handle_client_async(reader, writer):
+    """İstemci bağlantısını event loop üzerinde yönet (asyncio modu)"""
+    address = writer.get_extra_info('peername')
+    computer_name = None
+    session = HeartbeatSession()
+    
+    def close_connection():
+        # Zaman aşımında event loop üzerinden çağrılır
+        writer.close()
+    
+    try:
+        while running:
+            data = await reader.read(4096)
+            if not data:  # Bağlantı koptu
+                break
+            
+            # Heartbeat yanıtı - binlerce istemcide her mesajı loglamıyoruz
+            reply = session.receive(data)
+            if reply:
+                writer.write(reply)
+                await writer.drain()
+            
+            computer_name = _on_session_data(session, computer_name, address, close_connection)
+            if computer_name == "":
+                break
+            
+    except ProtocolError as e:
+        print(f"Geçersiz mesaj, bağlantı kapatılıyor ({address}): {e}")
+    except (ConnectionError, OSError) as e:
+        print(f"Client {computer_name} bağlantısı koptu: {e}")
+    except Exception as e:
+        print(f"İstemci bağlantı hatası: {e}")
+    finally:
+        writer.close()
+        if computer_name:
+            unregister_client(computer_name, close_connection)
+
+def _raise_fd_limit():
+    """Açık dosya tanımlayıcı limitini olabildiğince yükselt (10k+ soket için)"""
+    try:
+        import resource  # Windows'ta yok
+    except ImportError:
+        return
+    try:
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if hard == resource.RLIM_INFINITY or hard > soft:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+            print(f"Dosya tanımlayıcı limiti yükseltildi: {soft} -> {hard}")
+    except (ValueError, OSError) as e:
+        print(f"Dosya tanımlayıcı limiti yükseltilemedi: {e}")
+
+async def _serve_async(reuse_port=False):
+    """asyncio sunucusunu başlat ve running bayrağı kapanana kadar bekle"""
+    options = {'reuse_port': True} if reuse_port else {}
+    server = await asyncio.start_server(
+        handle_client_async,
+        SERVER_HOST,
+        SERVER_PORT,
+        reuse_address=True,
+        backlog=LISTEN_BACKLOG,
+        **options
+    )
+    print(f"Soket sunucusu (asyncio) başlatıldı, port: {SERVER_PORT}")
+    
+    async with server:
+        # stop_socket_server() başka bir thread'den çağrılabilir, bayrağı her tikte kontrol et.
+        # Zamanlayıcı çarkı da event loop üzerinde ilerler, böylece writer'lar aynı thread'de kapanır.
+        while running:
+            await asyncio.sleep(LIVENESS_TICK)
+            expire_clients()
+        
+        # Açık bağlantıları kapat, handler'lar kendi finally bloklarında temizlensin
+        with client_lock:
+            closers = [client.get('close') for client in connected_clients.values()]
+        for close in closers:
+            if close:
+                close()
+        await asyncio.sleep(0.1)
+    
+    print("Soket sunucusu kapatıldı")
+
+def start_async_socket_server(reuse_port=False):
+    """Soket sunucusunu tek bir asyncio event loop ile başlat"""
+    _raise_fd_limit()
+    presence_store.start()
+    try:
+        asyncio.run(_serve_async(reuse_port))
+    except Exception as e:
+        print(f"Soket sunucusu başlatılırken hata: {e}")
+
+def _run_shard(index, stop_event, port):
+    """Shard worker süreci: kendi connected_clients'ını yönetir ve kendi presence dosyasına yazar"""
+    global SERVER_PORT
+    SERVER_PORT = port
+    presence_store.json_path = shard_path(CONNECTION_FILE, index)
+    presence_store.mmap_path = shard_path(PRESENCE_MMAP_FILE, index)
+    
+    # Ana süreç stop_socket_server() çağırdığında veya ana süreç öldüğünde
+    # (SIGKILL, çökme) bu worker da kapanır, port boşta kalan worker'larda tutulmaz
+    parent_pid = os.getppid()
+    
+    def wait_for_stop():
+        while not stop_event.wait(PARENT_CHECK_INTERVAL):
+            if os.getppid() != parent_pid:
+                print(f"Shard worker {index}: ana süreç sonlanmış, kapanılıyor")
+                break
+        stop_socket_server()
+    
+    threading.Thread(target=wait_for_stop, daemon=True).start()
+    try:
+        start_async_socket_server(reuse_port=True)
+    except KeyboardInterrupt:
+        pass
+
+def _start_shard(ctx, index):
+    process = ctx.Process(
+        target=_run_shard,
+        args=(index, shard_stop_event, SERVER_PORT),
+        name=f"heartbeat-shard-{index}"
+    )
+    process.start()
+    return process
+
+def start_sharded_socket_server(workers=SHARD_WORKERS):
+    """Aynı portu SO_REUSEPORT ile dinleyen worker süreçleri başlat ve çökenleri yeniden başlat.
+
+    Her worker connected_clients'ın bir parçasını tutar ve active_connections.shard-N.*
+    dosyalarına yazar; app.py bu dosyaları tek bir görünümde birleştirir.
+    """
+    global shard_stop_event
+    if workers <= 1 or not hasattr(socket, "SO_REUSEPORT"):
+        if workers > 1:
+            print("SO_REUSEPORT bu platformda desteklenmiyor, tek süreçli asyncio modu kullanılıyor")
+        start_async_socket_server()
+        return
+    
+    ctx = multiprocessing.get_context()
+    shard_stop_event = ctx.Event()
+    remove_shard_files(CONNECTION_FILE)
+    remove_shard_files(PRESENCE_MMAP_FILE)
+    # Tek süreçli moddan kalan ana dosyaları boşalt, shard'larla birleşmesinler
+    save_connections()
+    
+    for index in range(workers):
+        shard_processes.append(_start_shard(ctx, index))
+    print(f"{workers} shard worker'ı başlatıldı, port: {SERVER_PORT} (SO_REUSEPORT)")
+    
+    try:
+        while running:
+            time.sleep(1)
+            for index, process in enumerate(shard_processes):
+                if not process.is_alive() and running and not shard_stop_event.is_set():
+                    print(f"Shard worker {index} kapandı (çıkış kodu {process.exitcode}), yeniden başlatılıyor")
+                    shard_processes[index] = _start_shard(ctx, index)
+    finally:
+        shard_stop_event.set()
+        for process in shard_processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+        shard_processes.clear()
+        remove_shard_files(CONNECTION_FILE)
+        remove_shard_files(PRESENCE_MMAP_FILE)
+        print("Tüm shard worker'ları durduruldu")
+
 def stop_socket_server():
     """Soket sunucusunu durdur"""
     global running
     running = False
     print("Soket sunucusu kapatılıyor...")
     
-    # Son bağlantı durumunu kaydet
-    save_connections()
+    # Shard modunda worker süreçlerine de kapanma sinyali gönder
+    if shard_stop_event is not None:
+        shard_stop_event.set()
+    
+    # Yazma thread'ini durdur ve son bağlantı durumunu kaydet
+    try:
+        presence_store.stop()
+    except Exception as e:
+        print(f"Bağlantılar kaydedilirken hata: {e}")
     
     print("Soket sunucusu durduruldu")
 
+def _handle_sigterm(signum, frame):
+    # Servis yöneticisi veya benchmark SIGTERM gönderdiğinde de düzgün kapan (shard'lar dahil)
+    stop_socket_server()
+
 if __name__ == "__main__":
+    # Komut satırından mod seçimi: python socket_server.py --mode asyncio [--port 5002] [--workers 4]
+    mode = SERVER_MODE
+    workers = SHARD_WORKERS
+    if "--mode" in sys.argv:
+        mode = sys.argv[sys.argv.index("--mode") + 1]
+    if "--port" in sys.argv:
+        SERVER_PORT = int(sys.argv[sys.argv.index("--port") + 1])
+    if "--workers" in sys.argv:
+        workers = int(sys.argv[sys.argv.index("--workers") + 1])
+    
     try:
         # Soket sunucusunu başlat
-        socket_thread = threading.Thread(target=start_socket_server)
+        if workers > 1:
+            mode = f"asyncio x {workers} shard"
+            target = lambda: start_sharded_socket_server(workers)
+        elif mode == "asyncio":
+            target = start_async_socket_server
+        else:
+            target = start_socket_server
+        print(f"Sunucu modu: {mode}")
+        signal.signal(signal.SIGTERM, _handle_sigterm)
+        socket_thread = threading.Thread(target=target)
         socket_thread.daemon = False  # Ana program kapanınca thread'in de kapanmasını istemiyoruz
         socket_thread.start()
         
         print("Soket sunucusu çalışıyor. Durdurmak için CTRL+C'ye basın.")
         
-        # Ana program
-        while True:
+        # Ana program (SIGTERM running'i False yapar)
+        while running:
             time.sleep(1)
             
     except KeyboardInterrupt:
         print("Klavye kesintisi algılandı. Kapatılıyor...")
         stop_socket_server()
+    
+    # Thread'in (shard modunda worker'ların) kapanmasını bekle
+    if socket_thread.is_alive():
+        socket_thread.join(timeout=15)
         
-        # Thread'in kapanmasını bekle
-        if socket_thread.is_alive():
-            socket_thread.join(timeout=5)
-            
-        print("Program sonlandırıldı.") 
\ No newline at end of file
+    print("Program sonlandırıldı.") 
\ No newline at end of file
@@ -0,0 +1,190 @@
+"""Yazılım envanteri: bilgisayar başına güncel liste ve değişiklik geçmişi.
+
+İstemci her saat tüm listeyi göndermek yerine son gönderdiği envanterle farkı
+(kurulan, güncellenen, kaldırılan) gönderir; belirli aralıklarla da tam liste
+(full_sync) gönderir ve sunucu farkı kendisi hesaplar. Sunucu güncel durumu
+software_inventory'de, değişiklikleri software_changes'da tutar; depolama ve detay
+sorgusunun maliyeti geçen süreyle değil değişiklik sayısıyla büyür.
+"""
+import hashlib
+
+CHANGE_INSTALLED = 'installed'
+CHANGE_UPDATED = 'updated'
+CHANGE_REMOVED = 'removed'
+
+CREATE_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS software_inventory (
+        system_id INT NOT NULL,
+        software_key CHAR(40) NOT NULL,
+        software_name VARCHAR(255) NOT NULL,
+        version VARCHAR(100),
+        publisher VARCHAR(255),
+        install_date VARCHAR(45),
+        first_seen DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (system_id, software_key)
+    ) ENGINE=InnoDB DEFAULT CHARACTER SET=utf8mb4
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS software_changes (
+        id BIGINT NOT NULL AUTO_INCREMENT,
+        system_id INT NOT NULL,
+        software_name VARCHAR(255) NOT NULL,
+        publisher VARCHAR(255),
+        change_type ENUM('installed', 'updated', 'removed') NOT NULL,
+        old_version VARCHAR(100),
+        new_version VARCHAR(100),
+        created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (id),
+        KEY idx_software_changes_created_at_id (created_at, id),
+        KEY idx_software_changes_system_created (system_id, created_at)
+    ) ENGINE=InnoDB DEFAULT CHARACTER SET=utf8mb4
+    """,
+]
+
+# Eski tam listelerden envanteri doldur: her bilgisayarın son gönderimi (son kayıttan
+# en fazla BACKFILL_WINDOW_MINUTES önceki satırlar) güncel envanter kabul edilir
+BACKFILL_WINDOW_MINUTES = 30
+
+BACKFILL_STATEMENT = f"""
+    INSERT IGNORE INTO software_inventory
+        (system_id, software_key, software_name, version, publisher, install_date, first_seen, updated_at)
+    SELECT
+        s.system_id,
+        SHA1(CONCAT(LOWER(s.software_name), CHAR(31 USING utf8mb4), LOWER(COALESCE(s.publisher, '')))),
+        s.software_name, s.version, s.publisher, s.install_date, s.created_at, s.created_at
+    FROM software_information s
+    JOIN (
+        SELECT system_id, MAX(created_at) as last_sync
+        FROM software_information
+        WHERE system_id IS NOT NULL
+        GROUP BY system_id
+    ) latest ON s.system_id = latest.system_id
+        AND s.created_at >= latest.last_sync - INTERVAL {BACKFILL_WINDOW_MINUTES} MINUTE
+    ORDER BY s.created_at DESC
+"""
+
+def software_key(name, publisher):
+    """Yazılımın bilgisayar içindeki anahtarı (ad + yayıncı, büyük/küçük harf duyarsız).
+
+    BACKFILL_STATEMENT'taki SHA1 ifadesiyle aynı değeri üretir.
+    """
+    raw = f"{name.lower()}\x1f{(publisher or '').lower()}"
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+def _record(item):
+    return {
+        'name': item['name'],
+        'version': item.get('version'),
+        'publisher': item.get('publisher'),
+        'install_date': item.get('install_date'),
+    }
+
+def _differs(current, record):
+    return current['version'] != record['version'] or current['install_date'] != record['install_date']
+
+def diff(current, upserts, removed_keys, full_sync):
+    """Güncel envanter ile gelen kayıtlardan gerçek değişiklikleri hesapla.
+
+    current: anahtar -> kayıt (veritabanındaki), upserts: anahtar -> kayıt (gelen),
+    full_sync ise upserts'te olmayan her şey kaldırılmış sayılır.
+    (değişiklik türü, anahtar, eski kayıt, yeni kayıt) listesi döndürür.
+    """
+    changes = []
+    for key, record in upserts.items():
+        old = current.get(key)
+        if old is None:
+            changes.append((CHANGE_INSTALLED, key, None, record))
+        elif _differs(old, record):
+            changes.append((CHANGE_UPDATED, key, old, record))
+
+    if full_sync:
+        removed_keys = set(current) - set(upserts)
+    for key in removed_keys:
+        if key in current and key not in upserts:
+            changes.append((CHANGE_REMOVED, key, current[key], None))
+    return changes
+
+def _load_current(cursor, system_id, keys=None):
+    if keys is None:
+        cursor.execute("""
+            SELECT software_key, software_name, version, publisher, install_date
+            FROM software_inventory
+            WHERE system_id = %s
+            FOR UPDATE
+        """, (system_id,))
+    elif not keys:
+        return {}
+    else:
+        cursor.execute(f"""
+            SELECT software_key, software_name, version, publisher, install_date
+            FROM software_inventory
+            WHERE system_id = %s AND software_key IN ({', '.join(['%s'] * len(keys))})
+            FOR UPDATE
+        """, (system_id,) + tuple(keys))
+    return {
+        key: {'name': name, 'version': version, 'publisher': publisher, 'install_date': install_date}
+        for key, name, version, publisher, install_date in cursor.fetchall()
+    }
+
+def apply_sync(cursor, system_id, payload):
+    """İstemcinin tam listesini veya farkını envantere uygula (açık bir işlem içinde çağrılır).
+
+    payload: {"full_sync": true, "records": [...]} veya
+             {"installed": [...], "updated": [...], "removed": [{"name", "publisher"}, ...]}
+    """
+    full_sync = bool(payload.get('full_sync'))
+    if full_sync:
+        items = payload.get('records') or []
+        removed = []
+    else:
+        items = (payload.get('installed') or []) + (payload.get('updated') or [])
+        removed = payload.get('removed') or []
+
+    upserts = {}
+    for item in items:
+        record = _record(item)
+        upserts[software_key(record['name'], record['publisher'])] = record
+    removed_keys = {software_key(item['name'], item.get('publisher')) for item in removed}
+
+    # Farkta sadece bahsi geçen anahtarlar okunur
+    current = _load_current(cursor, system_id, None if full_sync else list(set(upserts) | removed_keys))
+    changes = diff(current, upserts, removed_keys, full_sync)
+
+    written = [(system_id, key, new['name'], new['version'], new['publisher'], new['install_date'])
+               for change, key, _old, new in changes if change != CHANGE_REMOVED]
+    if written:
+        cursor.executemany("""
+            INSERT INTO software_inventory
+                (system_id, software_key, software_name, version, publisher, install_date)
+            VALUES (%s, %s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+                software_name = VALUES(software_name),
+                version = VALUES(version),
+                publisher = VALUES(publisher),
+                install_date = VALUES(install_date),
+                updated_at = CURRENT_TIMESTAMP
+        """, written)
+
+    deleted = [(system_id, key) for change, key, _old, _new in changes if change == CHANGE_REMOVED]
+    if deleted:
+        cursor.executemany(
+            "DELETE FROM software_inventory WHERE system_id = %s AND software_key = %s", deleted
+        )
+
+    if changes:
+        cursor.executemany("""
+            INSERT INTO software_changes
+                (system_id, software_name, publisher, change_type, old_version, new_version)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """, [
+            (system_id, (new or old)['name'], (new or old)['publisher'], change,
+             old['version'] if old else None, new['version'] if new else None)
+            for change, _key, old, new in changes
+        ])
+
+    counts = {CHANGE_INSTALLED: 0, CHANGE_UPDATED: 0, CHANGE_REMOVED: 0}
+    for change, _key, _old, _new in changes:
+        counts[change] += 1
+    return dict(counts, written=len(changes))
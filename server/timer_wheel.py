@@ -0,0 +1,56 @@
+import math
+import time
+
+class TimerWheel:
+    """Hashed timer wheel (zamanlayıcı çarkı).
+
+    Her anahtar tek bir slotta durur; schedule/cancel O(1), advance() her tikte
+    sadece o tike düşen slotu dolaşır. Çark turundan uzun süreler 'rounds'
+    sayacıyla tutulur.
+    """
+
+    def __init__(self, tick=1.0, slots=64, clock=time.monotonic):
+        self.tick = tick
+        self.clock = clock
+        self._slots = [dict() for _ in range(slots)]  # anahtar -> kalan tur sayısı
+        self._positions = {}                           # anahtar -> slot indeksi
+        self._current = 0
+        self._last_tick = clock()
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __contains__(self, key):
+        return key in self._positions
+
+    def schedule(self, key, delay):
+        """Anahtarı delay saniye sonra sona erecek şekilde (yeniden) planla"""
+        self.cancel(key)
+        ticks = max(1, math.ceil(delay / self.tick))
+        slot_count = len(self._slots)
+        slot = (self._current + ticks) % slot_count
+        self._slots[slot][key] = (ticks - 1) // slot_count
+        self._positions[key] = slot
+
+    def cancel(self, key):
+        """Planlanmış anahtarı kaldır"""
+        slot = self._positions.pop(key, None)
+        if slot is not None:
+            del self._slots[slot][key]
+
+    def advance(self, now=None):
+        """Geçen tikleri işle ve süresi dolan anahtarların listesini döndür"""
+        now = self.clock() if now is None else now
+        expired = []
+        while now - self._last_tick >= self.tick:
+            self._last_tick += self.tick
+            self._current = (self._current + 1) % len(self._slots)
+            bucket = self._slots[self._current]
+            for key, rounds in list(bucket.items()):
+                if rounds:
+                    bucket[key] = rounds - 1
+                else:
+                    del bucket[key]
+                    del self._positions[key]
+                    expired.append(key)
+        return expired